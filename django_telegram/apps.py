@@ -1,13 +1,17 @@
 from django.apps import AppConfig  # pragma: no cover
 from django.conf import settings  # pragma: no cover
+from django.core.checks import register, Tags  # pragma: no cover
 from django.core.exceptions import ImproperlyConfigured  # pragma: no cover
 
+from django_telegram.bot.query_cache import watch_configured_models  # pragma: no cover
+from django_telegram.checks import check_lookup_indexes  # pragma: no cover
 from django_telegram.configurator import TelegramBotConfigurator  # pragma: no cover
 
 
 class TelegramBotConfig(AppConfig):  # pragma: no cover
     name = 'django_telegram'
     verbose_name = "Django Telegram Bot"
+    default_auto_field = 'django.db.models.AutoField'
 
     def ready(self):
         telegram_settings = getattr(settings, 'TELEGRAM_BOT', None)
@@ -23,3 +27,5 @@ class TelegramBotConfig(AppConfig):  # pragma: no cover
             )
         checker = TelegramBotConfigurator(telegram_settings, settings.MIDDLEWARE)
         checker.run_check()
+        register(check_lookup_indexes, Tags.models)
+        watch_configured_models(telegram_settings)
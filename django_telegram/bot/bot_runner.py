@@ -1,15 +1,67 @@
 import logging
+import multiprocessing
+import os
+from queue import Queue
 
 from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
 from django.utils.module_loading import import_string
-from telegram import ReplyKeyboardRemove
-from telegram.ext import Updater
+from telegram import Bot, ReplyKeyboardRemove
+from telegram.error import TelegramError
+from telegram.ext import CommandHandler, Dispatcher, JobQueue, Updater
+from telegram.utils.request import Request
 
-from django_telegram.bot.constants import LOGGER_NAME
+from django_telegram.bot.chat_state import chat_namespace, ChatStateStore
+from django_telegram.bot.command_catalog import CommandCatalog, JOBS_DESCRIPTION
+from django_telegram.bot.command_pool import CommandPool
 from django_telegram.bot.constants import (
-    SETTINGS_COMMANDS_SUFFIX, SETTINGS_CONVERSATIONS,
-    SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY, SETTINGS_TOKEN,
+    CHAT_STATE_DEFAULT_IDLE_TIMEOUT, CHAT_STATE_DEFAULT_MAX_ENTRIES,
+    CHAT_STATE_DEFAULT_SWEEP_INTERVAL, COMMAND_OUTPUT_LIMIT, COMMAND_POOL_DEFAULT_TIMEOUT,
+    COMMAND_POOL_DEFAULT_WORKERS, JOB_LOCK_DEFAULT_TTL, LOGGER_NAME, METRICS_DEFAULT_LISTEN,
+    METRICS_DEFAULT_PORT, METRICS_PATH, PERSISTENCE_DEFAULT_FLUSH_INTERVAL,
+    PERSISTENCE_DEFAULT_PATH, PERSISTENCE_DJANGO, PERSISTENCE_SQLITE, QUERY_CACHE_DEFAULT_ALIAS,
+    QUERY_CACHE_DEFAULT_MAX_ENTRIES, QUERY_CACHE_DEFAULT_TIMEOUT, SETTINGS_CHAT_STATE,
+    SETTINGS_CHAT_STATE_IDLE_TIMEOUT, SETTINGS_CHAT_STATE_MAX_ENTRIES,
+    SETTINGS_CHAT_STATE_SWEEP_INTERVAL, SETTINGS_COMMAND_LOCK, SETTINGS_COMMAND_LOCK_ALIAS,
+    SETTINGS_COMMAND_LOCK_TTL, SETTINGS_COMMAND_POOL, SETTINGS_COMMAND_POOL_MEMORY_LIMIT,
+    SETTINGS_COMMAND_POOL_OUTPUT_LIMIT, SETTINGS_COMMAND_POOL_TIMEOUT,
+    SETTINGS_COMMAND_POOL_WORKERS, SETTINGS_COMMANDS_SUFFIX, SETTINGS_CONVERSATION_TIMEOUT,
+    SETTINGS_CONVERSATIONS, SETTINGS_DATABASE_ALIAS, SETTINGS_DATABASE_LAG_FUNCTION,
+    SETTINGS_DATABASE_MAX_LAG, SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY, SETTINGS_METRICS,
+    SETTINGS_METRICS_LISTEN, SETTINGS_METRICS_PORT, SETTINGS_PERSISTENCE,
+    SETTINGS_PERSISTENCE_ALIAS, SETTINGS_PERSISTENCE_BACKEND, SETTINGS_PERSISTENCE_FLUSH_INTERVAL,
+    SETTINGS_PERSISTENCE_PATH, SETTINGS_QUERY_CACHE, SETTINGS_QUERY_CACHE_ALIAS,
+    SETTINGS_QUERY_CACHE_MAX_ENTRIES, SETTINGS_QUERY_CACHE_TIMEOUT, SETTINGS_QUERY_TIME_BUDGET,
+    SETTINGS_SHARED_STATE, SETTINGS_SHARED_STATE_ALIAS, SETTINGS_SHARED_STATE_TIMEOUT,
+    SETTINGS_SHUTDOWN_TIMEOUT, SETTINGS_TOKEN, SETTINGS_UI_MODE, SETTINGS_UPDATER,
+    SETTINGS_UPDATER_ALLOWED_UPDATES, SETTINGS_UPDATER_CON_POOL_SIZE,
+    SETTINGS_UPDATER_DROP_PENDING_UPDATES, SETTINGS_UPDATER_POLL_INTERVAL,
+    SETTINGS_UPDATER_READ_TIMEOUT, SETTINGS_UPDATER_TIMEOUT, SETTINGS_UPDATER_WORKERS,
+    SETTINGS_WEBHOOK, SETTINGS_WEBHOOK_CERT, SETTINGS_WEBHOOK_KEY, SETTINGS_WEBHOOK_LISTEN,
+    SETTINGS_WEBHOOK_MAX_CONNECTIONS, SETTINGS_WEBHOOK_PORT, SETTINGS_WEBHOOK_SECRET_TOKEN,
+    SETTINGS_WEBHOOK_URL, SETTINGS_WEBHOOK_URL_PATH, SHARED_STATE_DEFAULT_TIMEOUT,
+    SHUTDOWN_DEFAULT_TIMEOUT, UI_MODE_REPLY, UPDATER_CON_POOL_OVERHEAD,
+    UPDATER_DEFAULT_POLL_INTERVAL, UPDATER_DEFAULT_READ_TIMEOUT, UPDATER_DEFAULT_TIMEOUT,
+    UPDATER_DEFAULT_WORKERS, WEBHOOK_DEFAULT_LISTEN, WEBHOOK_DEFAULT_MAX_CONNECTIONS,
+    WEBHOOK_DEFAULT_PORT,
 )
+from django_telegram.bot.db_routing import ReplicaLagCheck
+from django_telegram.bot.jobs import JobRegistry
+from django_telegram.bot.metrics import QUEUE_DEPTH, start_metrics_server
+from django_telegram.bot.persistence import (
+    DjangoStateBackend, PersistentChatStateStore, SQLiteStateBackend, StatePersistence,
+)
+from django_telegram.bot.query_cache import QueryResultCache
+from django_telegram.bot.renderers.qs2md import render_as_jobs
+from django_telegram.bot.router import ConversationRouter
+from django_telegram.bot.sharding import (
+    check_shard_lock, get_dead_workers, run_shard_worker, ShardingHandler,
+)
+from django_telegram.bot.shared_state import SharedChatStateStore, SharedState
+from django_telegram.bot.shutdown import (
+    InFlightRegistry, ShutdownDrain, stop_receiving, wait_for_stop_signal,
+)
+from django_telegram.bot.webhook import WebhookUpdater
 
 
 class BotRunner(object):  # pragma: no cover
@@ -19,19 +71,259 @@ class BotRunner(object):  # pragma: no cover
         self.suffix = settings.TELEGRAM_BOT[SETTINGS_COMMANDS_SUFFIX]
         self.model_property = settings.TELEGRAM_BOT[SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY]
         self.conv_classes = settings.TELEGRAM_BOT[SETTINGS_CONVERSATIONS]
+        self.query_cache = self.get_query_cache()
+        self.query_time_budget = settings.TELEGRAM_BOT.get(SETTINGS_QUERY_TIME_BUDGET)
+        self.database_alias = settings.TELEGRAM_BOT.get(SETTINGS_DATABASE_ALIAS, DEFAULT_DB_ALIAS)
+        self.replica_lag_check = self.get_replica_lag_check()
+        self.ui_mode = settings.TELEGRAM_BOT.get(SETTINGS_UI_MODE, UI_MODE_REPLY)
+        self.command_pool = self.get_command_pool()
+        self.job_registry = self.get_job_registry()
+        self.conversation_timeout = settings.TELEGRAM_BOT.get(SETTINGS_CONVERSATION_TIMEOUT)
+        self.chat_state_settings = settings.TELEGRAM_BOT.get(SETTINGS_CHAT_STATE) or {}
+        self.persistence_settings = settings.TELEGRAM_BOT.get(SETTINGS_PERSISTENCE) or {}
+        self.persistence = self.get_persistence()
+        self.shared_state = self.get_shared_state()
+        self.webhook_settings = settings.TELEGRAM_BOT.get(SETTINGS_WEBHOOK) or {}
+        self.updater_settings = settings.TELEGRAM_BOT.get(SETTINGS_UPDATER) or {}
+        self.shutdown_timeout = settings.TELEGRAM_BOT.get(
+            SETTINGS_SHUTDOWN_TIMEOUT, SHUTDOWN_DEFAULT_TIMEOUT,
+        )
+        self.in_flight = InFlightRegistry()
+        self.metrics_settings = settings.TELEGRAM_BOT.get(SETTINGS_METRICS)
 
-    def get_conversation_handler(self, conv_class):
+    @staticmethod
+    def get_query_cache():
+        cache_settings = settings.TELEGRAM_BOT.get(SETTINGS_QUERY_CACHE)
+        if not cache_settings:
+            return None
+
+        return QueryResultCache(
+            alias=cache_settings.get(SETTINGS_QUERY_CACHE_ALIAS, QUERY_CACHE_DEFAULT_ALIAS),
+            timeout=cache_settings.get(SETTINGS_QUERY_CACHE_TIMEOUT, QUERY_CACHE_DEFAULT_TIMEOUT),
+            max_entries=cache_settings.get(
+                SETTINGS_QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_DEFAULT_MAX_ENTRIES,
+            ),
+        )
+
+    @staticmethod
+    def get_command_pool():
+        pool_settings = settings.TELEGRAM_BOT.get(SETTINGS_COMMAND_POOL)
+        if not pool_settings:
+            return None
+
+        return CommandPool(
+            workers=pool_settings.get(SETTINGS_COMMAND_POOL_WORKERS, COMMAND_POOL_DEFAULT_WORKERS),
+            timeout=pool_settings.get(SETTINGS_COMMAND_POOL_TIMEOUT, COMMAND_POOL_DEFAULT_TIMEOUT),
+            memory_limit=pool_settings.get(SETTINGS_COMMAND_POOL_MEMORY_LIMIT),
+            output_limit=pool_settings.get(
+                SETTINGS_COMMAND_POOL_OUTPUT_LIMIT, COMMAND_OUTPUT_LIMIT,
+            ),
+        )
+
+    @staticmethod
+    def get_job_registry():
+        lock_settings = settings.TELEGRAM_BOT.get(SETTINGS_COMMAND_LOCK)
+        if not lock_settings:
+            return JobRegistry()
+
+        return JobRegistry(
+            lock_alias=lock_settings.get(SETTINGS_COMMAND_LOCK_ALIAS, QUERY_CACHE_DEFAULT_ALIAS),
+            lock_ttl=lock_settings.get(SETTINGS_COMMAND_LOCK_TTL, JOB_LOCK_DEFAULT_TTL),
+        )
+
+    def get_persistence(self):
+        if not self.persistence_settings:
+            return None
+
+        backend = self.persistence_settings.get(SETTINGS_PERSISTENCE_BACKEND, PERSISTENCE_SQLITE)
+        if backend == PERSISTENCE_SQLITE:
+            state_backend = SQLiteStateBackend(
+                self.persistence_settings.get(SETTINGS_PERSISTENCE_PATH, PERSISTENCE_DEFAULT_PATH),
+            )
+        elif backend == PERSISTENCE_DJANGO:
+            state_backend = DjangoStateBackend(
+                self.persistence_settings.get(SETTINGS_PERSISTENCE_ALIAS, DEFAULT_DB_ALIAS),
+            )
+        else:
+            state_backend = import_string(backend)()
+        return StatePersistence(state_backend, logger=logging.getLogger(LOGGER_NAME))
+
+    @staticmethod
+    def get_shared_state():
+        shared_settings = settings.TELEGRAM_BOT.get(SETTINGS_SHARED_STATE)
+        if not shared_settings:
+            return None
+
+        return SharedState(
+            alias=shared_settings.get(SETTINGS_SHARED_STATE_ALIAS, QUERY_CACHE_DEFAULT_ALIAS),
+            timeout=shared_settings.get(
+                SETTINGS_SHARED_STATE_TIMEOUT, SHARED_STATE_DEFAULT_TIMEOUT,
+            ),
+            logger=logging.getLogger(LOGGER_NAME),
+        )
+
+    @property
+    def persistence_flush_interval(self):
+        return self.persistence_settings.get(
+            SETTINGS_PERSISTENCE_FLUSH_INTERVAL, PERSISTENCE_DEFAULT_FLUSH_INTERVAL,
+        )
+
+    def get_chat_state_store(self, namespace):
+        limits = {
+            'max_entries': self.chat_state_settings.get(
+                SETTINGS_CHAT_STATE_MAX_ENTRIES, CHAT_STATE_DEFAULT_MAX_ENTRIES,
+            ),
+            'idle_timeout': self.chat_state_settings.get(
+                SETTINGS_CHAT_STATE_IDLE_TIMEOUT, CHAT_STATE_DEFAULT_IDLE_TIMEOUT,
+            ),
+        }
+        if self.shared_state:
+            return SharedChatStateStore(self.shared_state, namespace, **limits)
+        if self.persistence:
+            return PersistentChatStateStore(self.persistence, namespace, **limits)
+        return ChatStateStore(**limits)
+
+    @property
+    def chat_state_sweep_interval(self):
+        return self.chat_state_settings.get(
+            SETTINGS_CHAT_STATE_SWEEP_INTERVAL, CHAT_STATE_DEFAULT_SWEEP_INTERVAL,
+        )
+
+    @property
+    def workers(self):
+        return self.updater_settings.get(SETTINGS_UPDATER_WORKERS, UPDATER_DEFAULT_WORKERS)
+
+    @property
+    def request_kwargs(self):
+        return {
+            'con_pool_size': self.updater_settings.get(
+                SETTINGS_UPDATER_CON_POOL_SIZE, self.workers + UPDATER_CON_POOL_OVERHEAD,
+            ),
+            'read_timeout': self.updater_settings.get(
+                SETTINGS_UPDATER_READ_TIMEOUT, UPDATER_DEFAULT_READ_TIMEOUT,
+            ),
+        }
+
+    def get_updater(self):
+        updater_kwargs = {'workers': self.workers, 'request_kwargs': self.request_kwargs}
+        if not self.webhook_settings:
+            return Updater(self.token, **updater_kwargs)
+
+        return WebhookUpdater(
+            self.token,
+            secret_token=self.webhook_settings.get(SETTINGS_WEBHOOK_SECRET_TOKEN),
+            **updater_kwargs,
+        )
+
+    def start_updater(self, updater, logger):
+        updates_kwargs = {
+            'drop_pending_updates': self.updater_settings.get(
+                SETTINGS_UPDATER_DROP_PENDING_UPDATES, False,
+            ),
+            'allowed_updates': self.updater_settings.get(SETTINGS_UPDATER_ALLOWED_UPDATES),
+        }
+        if not self.webhook_settings:
+            updater.start_polling(
+                poll_interval=self.updater_settings.get(
+                    SETTINGS_UPDATER_POLL_INTERVAL, UPDATER_DEFAULT_POLL_INTERVAL,
+                ),
+                timeout=self.updater_settings.get(
+                    SETTINGS_UPDATER_TIMEOUT, UPDATER_DEFAULT_TIMEOUT,
+                ),
+                **updates_kwargs,
+            )
+            return
+
+        listen = self.webhook_settings.get(SETTINGS_WEBHOOK_LISTEN, WEBHOOK_DEFAULT_LISTEN)
+        port = self.webhook_settings.get(SETTINGS_WEBHOOK_PORT, WEBHOOK_DEFAULT_PORT)
+        updater.start_webhook(
+            listen=listen,
+            port=port,
+            url_path=self.webhook_settings.get(SETTINGS_WEBHOOK_URL_PATH, ''),
+            cert=self.webhook_settings.get(SETTINGS_WEBHOOK_CERT),
+            key=self.webhook_settings.get(SETTINGS_WEBHOOK_KEY),
+            webhook_url=self.webhook_settings[SETTINGS_WEBHOOK_URL],
+            max_connections=self.webhook_settings.get(
+                SETTINGS_WEBHOOK_MAX_CONNECTIONS, WEBHOOK_DEFAULT_MAX_CONNECTIONS,
+            ),
+            **updates_kwargs,
+        )
+        logger.info(f'Listening for webhook updates on {listen}:{port}')
+
+    @staticmethod
+    def get_replica_lag_check():
+        max_lag = settings.TELEGRAM_BOT.get(SETTINGS_DATABASE_MAX_LAG)
+        if not max_lag:
+            return None
+
+        lag_check = ReplicaLagCheck(max_lag, logger=logging.getLogger(LOGGER_NAME))
+        lag_function = settings.TELEGRAM_BOT.get(SETTINGS_DATABASE_LAG_FUNCTION)
+        if lag_function:
+            lag_check.lag_function = import_string(lag_function)
+        return lag_check
+
+    def get_conversation(self, conv_class):
         try:
             class_def = import_string(conv_class)
-
-            return class_def(
-                logger=logging.getLogger(LOGGER_NAME),
-                model_datetime_property=self.model_property,
-                suffix=self.suffix,
-            ).get_conversation_handler()
         except ImportError:
             return None
 
+        conversation = class_def(
+            logger=logging.getLogger(LOGGER_NAME),
+            model_datetime_property=self.model_property,
+            suffix=self.suffix,
+        )
+        conversation.set_query_cache(self.query_cache)
+        conversation.set_query_time_budget(self.query_time_budget)
+        conversation.set_database_alias(self.database_alias, self.replica_lag_check)
+        conversation.set_ui_mode(self.ui_mode)
+        conversation.set_command_pool(self.command_pool)
+        conversation.set_job_registry(self.job_registry)
+        conversation.set_conversation_timeout(self.conversation_timeout)
+        conversation.set_persistence(self.persistence)
+        conversation.set_shared_state(self.shared_state)
+        conversation.set_chat_state_store(
+            self.get_chat_state_store(chat_namespace(conversation.entrypoint)),
+        )
+        return conversation
+
+    def get_conversation_handler(self, conv_class):
+        conversation = self.get_conversation(conv_class)
+        if not conversation:
+            return None
+
+        return conversation.get_conversation_handler()
+
+    @property
+    def jobs_command(self):
+        return f'jobs_{self.suffix}' if self.suffix else 'jobs'
+
+    def show_jobs(self, update, context):
+        update.message.reply_text(
+            render_as_jobs(self.job_registry.jobs),
+            parse_mode='markdown',
+            reply_to_message_id=update.message.message_id,
+            api_kwargs={'chat_id': update.message.chat.id},
+        )
+
+    def get_command_catalog(self, conversations):
+        catalog = CommandCatalog.from_conversations(
+            conversations,
+            commands=[(self.jobs_command, JOBS_DESCRIPTION)],
+        )
+        for conversation in conversations:
+            conversation.set_command_catalog(catalog)
+        return catalog
+
+    @staticmethod
+    def register_commands(bot, catalog, logger):
+        try:
+            bot.set_my_commands(catalog.bot_commands)
+        except TelegramError as e:
+            logger.error(f'Bot commands not registered: {str(e)}')
+        else:
+            logger.info(f'    > {len(catalog.bot_commands)} bot commands registered')
+
     @staticmethod
     def error_callback(update, context):
         update.message.reply_text(
@@ -42,20 +334,160 @@ class BotRunner(object):  # pragma: no cover
             api_kwargs={'chat_id': update.message.chat.id},
         )
 
-    def handle(self, *args, **options):
-        updater = Updater(self.token)
-        logger = logging.getLogger(LOGGER_NAME)
-        for conversation in self.conv_classes:
-            logger.info(f'Setting up conversation handler {conversation} ..')
-            handler = self.get_conversation_handler(conversation)
-            if handler:
-                updater.dispatcher.add_handler(handler)
-                logger.info(f'    > {conversation}: registered')
+    def setup_dispatcher(self, dispatcher, logger, register_commands=True):
+        conversations = []
+        conversation_handlers = []
+        for conv_class in self.conv_classes:
+            logger.info(f'Setting up conversation handler {conv_class} ..')
+            conversation = self.get_conversation(conv_class)
+            if conversation:
+                conversation.set_dispatcher(dispatcher)
+                conversations.append(conversation)
+                conversation_handlers.append(conversation.get_conversation_handler())
+                conversation.schedule_materialized_filters(dispatcher.job_queue)
+                conversation.schedule_chat_state_eviction(
+                    dispatcher.job_queue, self.chat_state_sweep_interval,
+                )
+                logger.info(f'    > {conv_class}: registered')
             else:
-                logger.error(f'    > {conversation}: not registered')
-        updater.dispatcher.add_error_handler(self.error_callback)
+                logger.error(f'    > {conv_class}: not registered')
+        dispatcher.add_handler(
+            ConversationRouter(
+                conversation_handlers, shared_state=self.shared_state, in_flight=self.in_flight,
+            ),
+        )
+        dispatcher.add_handler(CommandHandler(self.jobs_command, self.show_jobs))
+        logger.info('Setting up command catalog ..')
+        catalog = self.get_command_catalog(conversations)
+        if register_commands:
+            self.register_commands(dispatcher.bot, catalog, logger)
+        dispatcher.add_error_handler(self.error_callback)
         logger.info('Setting up error handler ..')
-        updater.start_polling()
+        if self.persistence:
+            logger.info('Setting up state persistence ..')
+            self.persistence.schedule_flush(dispatcher.job_queue, self.persistence_flush_interval)
+        self.track_queue_depths(dispatcher)
+
+    def track_queue_depths(self, dispatcher):
+        QUEUE_DEPTH.set_function(dispatcher.update_queue.qsize, queue='updates')
+        if self.command_pool is not None:
+            QUEUE_DEPTH.set_function(lambda: self.command_pool.queued, queue='commands')
+        QUEUE_DEPTH.set_function(self.in_flight.__len__, queue='in_flight')
+
+    def start_metrics(self, logger, offset=0):
+        #  every process serves its own metrics, worker processes of the
+        #  multi-process mode listen on the ports following PORT
+        if self.metrics_settings is None:
+            return None
+
+        listen = self.metrics_settings.get(SETTINGS_METRICS_LISTEN, METRICS_DEFAULT_LISTEN)
+        port = self.metrics_settings.get(SETTINGS_METRICS_PORT, METRICS_DEFAULT_PORT) + offset
+        server = start_metrics_server(listen, port)
+        logger.info(f'Serving metrics on http://{listen}:{port}{METRICS_PATH}')
+        return server
+
+    def flush_state(self, logger):
+        if self.persistence:
+            logger.info(f'Flushed {self.persistence.flush()} state entries')
+
+    def get_shutdown_drain(self, dispatcher, logger):
+        return ShutdownDrain(
+            dispatcher,
+            self.in_flight,
+            timeout=self.shutdown_timeout,
+            job_registry=self.job_registry,
+            command_pool=self.command_pool,
+            logger=logger,
+        )
+
+    @staticmethod
+    def exit_abandoned(logger):
+        #  handlers still running can not be interrupted, their threads would
+        #  keep the process alive past the shutdown timeout
+        logger.error('Connect Reports Bot stopped with abandoned updates!')
+        logging.shutdown()
+        os._exit(1)
+
+    def run_worker(self, index, updates):
+        logger = logging.getLogger(LOGGER_NAME)
+        job_queue = JobQueue()
+        dispatcher = Dispatcher(
+            Bot(self.token, request=Request(**self.request_kwargs)),
+            Queue(),
+            workers=self.workers,
+            job_queue=job_queue,
+        )
+        job_queue.set_dispatcher(dispatcher)
+        self.setup_dispatcher(dispatcher, logger, register_commands=index == 0)
+        self.start_metrics(logger, offset=index + 1)
+        logger.info(f'Connect Reports Bot worker {index} started!')
+        drained = run_shard_worker(
+            dispatcher, updates, drain=self.get_shutdown_drain(dispatcher, logger).run,
+        )
+        self.flush_state(logger)
+        if not drained:
+            self.exit_abandoned(logger)
+        logger.info(f'Connect Reports Bot worker {index} stopped!')
+
+    def handle_processes(self, processes, logger):
+        #  workers are forked with the settings and restored state loaded, each
+        #  one opens its own database connections
+        check_shard_lock(self.job_registry)
+        context = multiprocessing.get_context('fork')
+        queues = [context.Queue() for _ in range(processes)]
+        connections.close_all()
+        workers = [
+            context.Process(
+                target=self.run_worker, args=(index, updates), name=f'telegram_bot_{index}',
+            )
+            for index, updates in enumerate(queues)
+        ]
+        for worker in workers:
+            worker.start()
+
+        updater = self.get_updater()
+        updater.dispatcher.add_handler(ShardingHandler(queues))
+        QUEUE_DEPTH.set_function(updater.dispatcher.update_queue.qsize, queue='updates')
+        for index, updates in enumerate(queues):
+            QUEUE_DEPTH.set_function(updates.qsize, queue=f'shard_{index}')
+        self.start_metrics(logger)
+        self.start_updater(updater, logger)
+        logger.info(f'Connect Reports Bot started with {processes} worker processes!')
+        #  the chats of a dead worker would get no replies, so the bot stops
+        #  and its process manager restarts it with all the workers
+        stopped = wait_for_stop_signal(alive=lambda: not get_dead_workers(workers))
+        for worker in get_dead_workers(workers):
+            logger.error(f'Connect Reports Bot {worker.name} exited with code {worker.exitcode}!')
+        logger.info('Stopping, draining the worker processes ..')
+        stop_receiving(updater)
+        updater.stop()
+        for updates in queues:
+            updates.put(None)
+        for worker in workers:
+            worker.join()
+        if not stopped:
+            logger.error('Connect Reports Bot stopped after a worker process died!')
+            logging.shutdown()
+            os._exit(1)
+        logger.info('Connect Reports Bot stopped!')
+
+    def handle(self, *args, **options):
+        logger = logging.getLogger(LOGGER_NAME)
+        processes = options.get('processes') or 1
+        if processes > 1:
+            return self.handle_processes(processes, logger)
+
+        updater = self.get_updater()
+        self.setup_dispatcher(updater.dispatcher, logger)
+        self.start_metrics(logger)
+        self.start_updater(updater, logger)
         logger.info('Connect Reports Bot started!')
-        updater.idle()
+        wait_for_stop_signal()
+        logger.info(f'Stopping, draining updates for at most {self.shutdown_timeout}s ..')
+        stop_receiving(updater)
+        drained = self.get_shutdown_drain(updater.dispatcher, logger).run()
+        self.flush_state(logger)
+        if not drained:
+            self.exit_abandoned(logger)
+        updater.stop()
         logger.info('Connect Reports Bot stopped!')
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django_telegram.bot.constants import (
+    CHAT_STATE_DEFAULT_IDLE_TIMEOUT, CHAT_STATE_DEFAULT_MAX_ENTRIES,
+)
+
+
+def conversation_namespace(name):
+    return f'conversation:{name}'
+
+
+def chat_namespace(name):
+    return f'chat:{name}'
+
+
+class ChatStateStore(object):
+    def __init__(self, max_entries=CHAT_STATE_DEFAULT_MAX_ENTRIES,
+                 idle_timeout=CHAT_STATE_DEFAULT_IDLE_TIMEOUT):
+        self.max_entries = max_entries
+        self.idle_timeout = idle_timeout
+        #  chat id -> (last access, state), least recently used first
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, chat_id):
+        with self._lock:
+            return chat_id in self._states
+
+    def __len__(self):
+        with self._lock:
+            return len(self._states)
+
+    def _changed(self, chat_id, state):
+        #  hook for stores keeping a copy of the states, None means removed
+        pass
+
+    def get(self, chat_id):
+        with self._lock:
+            entry = self._states.get(chat_id)
+            if entry is None:
+                return None
+            self._states[chat_id] = (time.monotonic(), entry[1])
+            self._states.move_to_end(chat_id)
+        return entry[1]
+
+    def commit(self, chat_id):
+        #  states are changed in place, the conversation commits them once the
+        #  update of the chat was handled
+        with self._lock:
+            entry = self._states.get(chat_id)
+        if entry is not None:
+            self._changed(chat_id, entry[1])
+
+    def set(self, chat_id, state):
+        dropped = []
+        with self._lock:
+            self._states[chat_id] = (time.monotonic(), state)
+            self._states.move_to_end(chat_id)
+            while len(self._states) > self.max_entries:
+                dropped.append(self._states.popitem(last=False)[0])
+        self._changed(chat_id, state)
+        for dropped_id in dropped:
+            self._changed(dropped_id, None)
+
+    def discard(self, chat_id):
+        with self._lock:
+            self._states.pop(chat_id, None)
+        self._changed(chat_id, None)
+
+    def evict_idle(self):
+        idle_since = time.monotonic() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            while self._states:
+                chat_id, (accessed_at, _state) = next(iter(self._states.items()))
+                if accessed_at > idle_since:
+                    break
+                del self._states[chat_id]
+                evicted.append(chat_id)
+        for chat_id in evicted:
+            self._changed(chat_id, None)
+        return evicted
@@ -0,0 +1,45 @@
+from collections import namedtuple
+
+from telegram import BotCommand
+
+from django_telegram.bot.constants import BOT_COMMAND_DESCRIPTION_MAX_LENGTH
+from django_telegram.bot.renderers.qs2md import render_as_commands
+
+CatalogEntry = namedtuple(
+    'CatalogEntry', ['command', 'description', 'saved_filters', 'custom_commands'],
+)
+
+COMMANDS_DESCRIPTION = 'List available commands'
+CANCEL_DESCRIPTION = 'Cancel the current conversation'
+JOBS_DESCRIPTION = 'Running and recent custom commands'
+
+
+class CommandCatalog(object):
+    def __init__(self, entries):
+        self.entries = list(entries)
+        #  rendered once, /commands replies and startup registration reuse them
+        self.messages = render_as_commands(self.entries)
+        self.bot_commands = [
+            BotCommand(entry.command, entry.description[:BOT_COMMAND_DESCRIPTION_MAX_LENGTH])
+            for entry in self.entries
+        ]
+
+    @classmethod
+    def from_conversations(cls, conversations, commands=()):
+        entries = {}
+        for conversation in conversations:
+            entries.setdefault(conversation.entrypoint, CatalogEntry(
+                conversation.entrypoint,
+                conversation.command_description,
+                tuple(conversation.saved_filters),
+                tuple(conversation.custom_commands),
+            ))
+        for conversation in conversations:
+            entries.setdefault(
+                conversation.fallback,
+                CatalogEntry(conversation.fallback, CANCEL_DESCRIPTION, (), ()),
+            )
+        entries.setdefault('commands', CatalogEntry('commands', COMMANDS_DESCRIPTION, (), ()))
+        for command, description in commands:
+            entries.setdefault(command, CatalogEntry(command, description, (), ()))
+        return cls(entries.values())
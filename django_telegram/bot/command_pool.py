@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from django_telegram.bot.constants import (
+    COMMAND_OUTPUT_LIMIT, COMMAND_POOL_DEFAULT_TIMEOUT,
+    COMMAND_POOL_DEFAULT_WORKERS,
+)
+from django_telegram.bot.output_stream import TRUNCATED_MARK
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+CommandResult = namedtuple('CommandResult', ['command', 'returncode', 'output', 'timed_out'])
+
+LAUNCHER_MODULE = 'django_telegram.bot.launcher'
+
+
+class CommandPool(object):
+    def __init__(
+        self,
+        workers=COMMAND_POOL_DEFAULT_WORKERS,
+        timeout=COMMAND_POOL_DEFAULT_TIMEOUT,
+        memory_limit=None,
+        output_limit=COMMAND_OUTPUT_LIMIT,
+    ):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.output_limit = output_limit
+        #  every worker thread waits for one subprocess, so at most
+        #  ``workers`` commands run at a time and the others are queued
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='django-telegram-command',
+        )
+        self._processes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_args(command):
+        return [sys.executable, '-m', 'django', command]
+
+    @staticmethod
+    def _get_env():
+        env = os.environ.copy()
+        settings_module = getattr(settings, 'SETTINGS_MODULE', None)
+        if settings_module:
+            env['DJANGO_SETTINGS_MODULE'] = settings_module
+        return env
+
+    def _get_limited_args(self, command):
+        args = self._get_args(command)
+        if not self.memory_limit or not resource:
+            return args
+        return [
+            args[0], '-m', LAUNCHER_MODULE, str(self.memory_limit * 1024 * 1024), *args[1:],
+        ]
+
+    def _run(self, command, output=None):
+        process = subprocess.Popen(
+            self._get_limited_args(command),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=self._get_env(),
+        )
+        with self._lock:
+            self._processes[process] = command
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(self.timeout, kill)
+        timer.daemon = True
+        timer.start()
+        size = 0
+        tail = ''
+        try:
+            for line in iter(process.stdout.readline, b''):
+                text = line.decode('utf-8', errors='replace')
+                size += len(text)
+                tail = (tail + text)[-self.output_limit:]
+                if output:
+                    output.write(text)
+            process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+            with self._lock:
+                self._processes.pop(process, None)
+
+        if size > self.output_limit:
+            tail = TRUNCATED_MARK + tail
+        if timed_out.is_set():
+            return CommandResult(command, None, tail, True)
+        return CommandResult(command, process.returncode, tail, False)
+
+    def submit(self, command, output=None):
+        return self.executor.submit(self._run, command, output)
+
+    def run(self, command, output=None):
+        return self.submit(command, output).result()
+
+    @property
+    def queued(self):
+        #  commands waiting for a free worker
+        return self.executor._work_queue.qsize()
+
+    def terminate(self):
+        with self._lock:
+            processes = dict(self._processes)
+        for process in processes:
+            process.kill()
+        return list(processes.values())
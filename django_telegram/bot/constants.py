@@ -1,6 +1,8 @@
 BTN_CAPTION_BUILD_QUERY = 'Build Query'
+BTN_CAPTION_PROFILE_QUERY = 'Profile Query'
 BTN_CAPTION_USE_SAVED_FILTER = 'Use Saved Filter'
 BTN_CAPTION_CUSTOM_MGMT = 'Custom Management Command'
+BTN_CAPTION_REFRESH_NOW = 'Refresh now'
 DAYS = 'days'
 WEEKS = 'weeks'
 HOURS = 'hours'
@@ -8,6 +10,23 @@ YES = 'Yes'
 NO = 'No'
 COUNT = 'count'
 SUM = 'sum'
+EXPORT = 'export'
+ONE_SHOT_SAVED_PREFIX = 'saved:'
+HISTOGRAM = 'histogram'
+HISTOGRAM_BUCKETS = {
+    HOURS: ('hour', '%m-%d %H:00'),
+    DAYS: ('day', '%Y-%m-%d'),
+    WEEKS: ('week', '%Y-%m-%d'),
+}
+EXPORT_CSV = 'csv'
+EXPORT_JSONL = 'jsonl'
+EXPORT_CHUNK_SIZE = 2000
+LIST_FIELDS = ('id', 'name', 'status')
+LIST_FORMAT = '- {name} ({id}): {status}\n'
+MESSAGE_MAX_LENGTH = 4096
+BOT_COMMAND_DESCRIPTION_MAX_LENGTH = 256
+UI_MODE_REPLY = 'reply'
+UI_MODE_INLINE = 'inline'
 SETTINGS_TOKEN = 'TOKEN'
 SETTINGS_COMMANDS_SUFFIX = 'COMMANDS_SUFFIX'
 SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY = 'HISTORY_LOOKUP_MODEL_PROPERTY'
@@ -24,4 +43,100 @@ SETTINGS_MW_CONDITIONS_VALUE = 'value'
 SETTINGS_MW_CONDITIONS_FIELD = 'field'
 SETTINGS_MW_MESSAGE = 'message'
 SETTINGS_MW_CONDITIONS_FIELD_VALUE = 'field_value'
+SETTINGS_QUERY_CACHE = 'QUERY_CACHE'
+SETTINGS_QUERY_CACHE_ALIAS = 'ALIAS'
+SETTINGS_QUERY_CACHE_TIMEOUT = 'TIMEOUT'
+SETTINGS_QUERY_CACHE_MAX_ENTRIES = 'MAX_ENTRIES'
+QUERY_CACHE_DEFAULT_ALIAS = 'default'
+QUERY_CACHE_DEFAULT_TIMEOUT = 300
+QUERY_CACHE_DEFAULT_MAX_ENTRIES = 1000
+SETTINGS_QUERY_TIME_BUDGET = 'QUERY_TIME_BUDGET'
+QUERY_BUDGET_WORKERS = 4
+SETTINGS_UI_MODE = 'UI_MODE'
+SETTINGS_COMMAND_POOL = 'COMMAND_POOL'
+SETTINGS_COMMAND_POOL_WORKERS = 'WORKERS'
+SETTINGS_COMMAND_POOL_TIMEOUT = 'TIMEOUT'
+SETTINGS_COMMAND_POOL_MEMORY_LIMIT = 'MEMORY_LIMIT'
+SETTINGS_COMMAND_POOL_OUTPUT_LIMIT = 'OUTPUT_LIMIT'
+COMMAND_POOL_DEFAULT_WORKERS = 2
+COMMAND_POOL_DEFAULT_TIMEOUT = 300
+COMMAND_OUTPUT_LIMIT = 3500
+COMMAND_OUTPUT_EDIT_INTERVAL = 3
+SETTINGS_COMMAND_LOCK = 'COMMAND_LOCK'
+SETTINGS_COMMAND_LOCK_ALIAS = 'ALIAS'
+SETTINGS_COMMAND_LOCK_TTL = 'TTL'
+JOB_LOCK_DEFAULT_TTL = 3600
+JOB_HISTORY_SIZE = 20
+SETTINGS_CONVERSATION_TIMEOUT = 'CONVERSATION_TIMEOUT'
+SETTINGS_CHAT_STATE = 'CHAT_STATE'
+SETTINGS_CHAT_STATE_MAX_ENTRIES = 'MAX_ENTRIES'
+SETTINGS_CHAT_STATE_IDLE_TIMEOUT = 'IDLE_TIMEOUT'
+SETTINGS_CHAT_STATE_SWEEP_INTERVAL = 'SWEEP_INTERVAL'
+CHAT_STATE_DEFAULT_MAX_ENTRIES = 1000
+CHAT_STATE_DEFAULT_IDLE_TIMEOUT = 3600
+CHAT_STATE_DEFAULT_SWEEP_INTERVAL = 300
+SETTINGS_PERSISTENCE = 'PERSISTENCE'
+SETTINGS_PERSISTENCE_BACKEND = 'BACKEND'
+SETTINGS_PERSISTENCE_PATH = 'PATH'
+SETTINGS_PERSISTENCE_ALIAS = 'ALIAS'
+SETTINGS_PERSISTENCE_FLUSH_INTERVAL = 'FLUSH_INTERVAL'
+PERSISTENCE_SQLITE = 'sqlite'
+PERSISTENCE_DJANGO = 'django'
+PERSISTENCE_DEFAULT_PATH = 'telegram_bot_state.sqlite3'
+PERSISTENCE_DEFAULT_FLUSH_INTERVAL = 10
+PERSISTENCE_TABLE = 'django_telegram_state'
+SETTINGS_SHARED_STATE = 'SHARED_STATE'
+SETTINGS_SHARED_STATE_ALIAS = 'ALIAS'
+SETTINGS_SHARED_STATE_TIMEOUT = 'TIMEOUT'
+SHARED_STATE_DEFAULT_TIMEOUT = 86400
+SHARED_STATE_KEY_PREFIX = 'telegram_state'
+SETTINGS_WEBHOOK = 'WEBHOOK'
+SETTINGS_WEBHOOK_LISTEN = 'LISTEN'
+SETTINGS_WEBHOOK_PORT = 'PORT'
+SETTINGS_WEBHOOK_URL_PATH = 'URL_PATH'
+SETTINGS_WEBHOOK_URL = 'URL'
+SETTINGS_WEBHOOK_SECRET_TOKEN = 'SECRET_TOKEN'
+SETTINGS_WEBHOOK_CERT = 'CERT'
+SETTINGS_WEBHOOK_KEY = 'KEY'
+SETTINGS_WEBHOOK_MAX_CONNECTIONS = 'MAX_CONNECTIONS'
+WEBHOOK_DEFAULT_LISTEN = '127.0.0.1'
+WEBHOOK_DEFAULT_PORT = 8443
+WEBHOOK_DEFAULT_MAX_CONNECTIONS = 40
+WEBHOOK_MAX_CONNECTIONS_LIMIT = 100
+WEBHOOK_SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+WEBHOOK_SECRET_TOKEN_PATTERN = r'^[A-Za-z0-9_-]{1,256}$'
+SETTINGS_UPDATER = 'UPDATER'
+SETTINGS_UPDATER_WORKERS = 'WORKERS'
+SETTINGS_UPDATER_CON_POOL_SIZE = 'CON_POOL_SIZE'
+SETTINGS_UPDATER_READ_TIMEOUT = 'READ_TIMEOUT'
+SETTINGS_UPDATER_POLL_INTERVAL = 'POLL_INTERVAL'
+SETTINGS_UPDATER_TIMEOUT = 'TIMEOUT'
+SETTINGS_UPDATER_DROP_PENDING_UPDATES = 'DROP_PENDING_UPDATES'
+SETTINGS_UPDATER_ALLOWED_UPDATES = 'ALLOWED_UPDATES'
+UPDATER_DEFAULT_WORKERS = 4
+UPDATER_CON_POOL_OVERHEAD = 4
+UPDATER_DEFAULT_READ_TIMEOUT = 5.0
+UPDATER_DEFAULT_POLL_INTERVAL = 0.0
+UPDATER_DEFAULT_TIMEOUT = 10
+SETTINGS_SHUTDOWN_TIMEOUT = 'SHUTDOWN_TIMEOUT'
+SHUTDOWN_DEFAULT_TIMEOUT = 30
+SHUTDOWN_POLL_INTERVAL = 0.1
+SHUTDOWN_UPDATE_MESSAGE = (
+    'The bot is restarting and your last message was not handled, please send it again'
+)
+SHUTDOWN_JOB_MESSAGE = 'The bot is restarting, {command} was abandoned'
+SETTINGS_METRICS = 'METRICS'
+SETTINGS_METRICS_LISTEN = 'LISTEN'
+SETTINGS_METRICS_PORT = 'PORT'
+METRICS_DEFAULT_LISTEN = '127.0.0.1'
+METRICS_DEFAULT_PORT = 9464
+METRICS_PATH = '/metrics'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SETTINGS_DATABASE_ALIAS = 'DATABASE_ALIAS'
+SETTINGS_DATABASE_MAX_LAG = 'DATABASE_MAX_LAG'
+SETTINGS_DATABASE_LAG_FUNCTION = 'DATABASE_LAG_FUNCTION'
+LAG_CHECK_INTERVAL = 10
+CACHED_REPLY_MARK = '_cached result_'
+MATERIALIZED_REPLY_MARK = '_as of {refreshed_at}, refresh now?_'
 LOGGER_NAME = 'django_telegram_bot'
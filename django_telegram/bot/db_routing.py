@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from django_telegram.bot.constants import LAG_CHECK_INTERVAL
+
+
+def postgresql_replica_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+
+    #  the last replayed transaction gets older while the primary is idle, a
+    #  replica which replayed all it received is in sync
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 '
+            'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+            'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END',
+        )
+        lag = cursor.fetchone()[0]
+    return float(lag) if lag is not None else None
+
+
+class ReplicaLagCheck(object):
+    def __init__(self, max_lag, lag_function=postgresql_replica_lag,
+                 check_interval=LAG_CHECK_INTERVAL, logger=None):
+        self.max_lag = max_lag
+        self.lag_function = lag_function
+        self.check_interval = check_interval
+        self.logger = logger
+        self._checks = {}
+        self._lock = threading.Lock()
+
+    def _is_lagging(self, alias):
+        try:
+            lag = self.lag_function(alias)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f'Replica lag check of "{alias}" failed: {str(e)}')
+            return True
+        if lag is not None and lag > self.max_lag and self.logger:
+            self.logger.warning(
+                f'Replica "{alias}" lags {lag} seconds, falling back to "{DEFAULT_DB_ALIAS}"',
+            )
+        return lag is not None and lag > self.max_lag
+
+    def resolve(self, alias):
+        if alias == DEFAULT_DB_ALIAS:
+            return alias
+
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lagging = self._checks.get(alias, (None, False))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            lagging = self._is_lagging(alias)
+            with self._lock:
+                self._checks[alias] = (now, lagging)
+
+        return DEFAULT_DB_ALIAS if lagging else alias
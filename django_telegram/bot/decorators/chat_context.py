@@ -1,11 +1,23 @@
 from functools import wraps
 
+from django_telegram.bot.ui import get_update_chat_id
+
 
 def chat_context(func):
     @wraps(func)
     def check_chat_and_exec(self, update, context):
-        if self.chat_id == update.message.chat.id:
-            res = func(self, update, context)
-            return res
+        if update.callback_query:
+            #  stops the button loading indicator in the client
+            update.callback_query.answer()
+        chat_id = get_update_chat_id(update)
+        if chat_id in self.chat_states:
+            self.set_chat_id(chat_id)
+            try:
+                return func(self, update, context)
+            finally:
+                self.chat_states.commit(chat_id)
+
+        #  the chat state was evicted while the conversation was still held
+        return self.expire_conversation(update)
 
     return check_chat_and_exec
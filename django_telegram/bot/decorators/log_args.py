@@ -1,10 +1,12 @@
 from functools import wraps
 
+from django_telegram.bot.ui import get_update_text
+
 
 def log_args(func):
     @wraps(func)
     def log_and_exec(self, update, context):
-        self.logger.info(f'Input: {func.__name__}: {update.message.text}')
+        self.logger.info(f'Input: {func.__name__}: {get_update_text(update)}')
         res = func(self, update, context)
         self.logger.info(f'Output: {func.__name__}: {res}')
         return res
@@ -0,0 +1,12 @@
+from datetime import timedelta
+
+
+def materialized(refresh_every):
+    if not isinstance(refresh_every, timedelta):
+        refresh_every = timedelta(seconds=refresh_every)
+
+    def mark_materialized(func):
+        func.refresh_every = refresh_every
+        return func
+
+    return mark_materialized
@@ -0,0 +1,2 @@
+class InvalidFilter(Exception):
+    pass
@@ -0,0 +1,2 @@
+class InvalidQuery(Exception):
+    pass
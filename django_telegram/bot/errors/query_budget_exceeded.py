@@ -0,0 +1,5 @@
+class QueryBudgetExceeded(Exception):
+    def __init__(self, budget, sql=None):
+        super().__init__(f'Query exceeded budget of {budget} seconds')
+        self.budget = budget
+        self.sql = sql
@@ -0,0 +1,170 @@
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db.models import ForeignObjectRel, Value
+from django.db.models.constants import LOOKUP_SEP
+
+from django_telegram.bot.errors.invalid_filter import InvalidFilter
+
+TERM_SEPARATOR = ','
+VALUE_SEPARATOR = '='
+LIST_SEPARATOR = '|'
+QUOTES = ('"', "'")
+LIST_LOOKUPS = ('in', 'range')
+STRING_LOOKUPS = (
+    'contains', 'icontains', 'startswith', 'istartswith', 'endswith', 'iendswith',
+    'regex', 'iregex',
+)
+BOOLEAN_VALUES = {
+    'true': True, '1': True, 'yes': True,
+    'false': False, '0': False, 'no': False,
+}
+
+
+def _opens_value(current):
+    current = current.strip()
+    return not current or current[-1] in (VALUE_SEPARATOR, LIST_SEPARATOR)
+
+
+def split_unquoted(text, separator, maxsplit=-1):
+    parts = []
+    current = ''
+    quote = None
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+            current += char
+        elif char in QUOTES and _opens_value(current):
+            quote = char
+            current += char
+        elif char == separator and maxsplit != len(parts):
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if quote:
+        raise InvalidFilter(f'Unterminated quote in "{text}"')
+    parts.append(current)
+    return parts
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] in QUOTES and value[-1] == value[0]:
+        return value[1:-1]
+    return value
+
+
+def parse_filters(text):
+    terms = []
+    for term in split_unquoted(text, TERM_SEPARATOR):
+        if not term.strip():
+            continue
+        parts = split_unquoted(term, VALUE_SEPARATOR, maxsplit=1)
+        if len(parts) != 2 or not parts[0].strip():
+            raise InvalidFilter(f'Filter "{term.strip()}" must look like field__lookup=value')
+        terms.append((parts[0].strip(), parts[1].strip()))
+    if not terms:
+        raise InvalidFilter('No filter provided')
+    return terms
+
+
+@lru_cache(maxsize=None)
+def _model_fields(model):
+    fields = {'pk': model._meta.pk}
+    for field in model._meta.get_fields():
+        #  generic foreign keys can't be filtered on, reverse relations can
+        if field.is_relation and field.related_model is None:
+            continue
+        fields[field.name] = field
+        attname = getattr(field, 'attname', None)
+        if attname:
+            fields[attname] = field
+    return fields
+
+
+class FilterCompiler(object):
+    def __init__(self, model):
+        self.model = model
+
+    def _resolve(self, key):
+        model = self.model
+        parts = key.split(LOOKUP_SEP)
+        path = []
+        field = None
+        while parts and parts[0] in _model_fields(model):
+            field = _model_fields(model)[parts[0]]
+            path.append(parts.pop(0))
+            model = field.related_model if field.is_relation else None
+            if model is None:
+                break
+
+        if not path:
+            raise InvalidFilter(f'Unknown field "{key.split(LOOKUP_SEP)[0]}"')
+
+        field, lookup = self._resolve_lookup(key, field, parts, path)
+        return path, field, lookup
+
+    @staticmethod
+    def _resolve_lookup(key, field, parts, path):
+        lookup = 'exact'
+        while parts:
+            name = parts.pop(0)
+            #  lookups of a reverse relation are the ones of its foreign key
+            lookups = field.remote_field if isinstance(field, ForeignObjectRel) else field
+            if not parts and lookups.get_lookup(name) is not None:
+                lookup = name
+                break
+            transform = lookups.get_transform(name)
+            if transform is None:
+                if parts:
+                    raise InvalidFilter(f'Unknown field or lookup "{key}"')
+                raise InvalidFilter(
+                    f'Lookup "{name}" is not supported by {LOOKUP_SEP.join(path)}',
+                )
+            path.append(name)
+            #  values are compared to the transform output, e.g. a date for __date
+            field = transform(Value(None, output_field=field)).output_field
+        return field, lookup
+
+    @staticmethod
+    def _coerce(field, lookup, value, label):
+        if lookup == 'isnull':
+            if value.lower() not in BOOLEAN_VALUES:
+                raise InvalidFilter(f'"{value}" is not a boolean')
+            return BOOLEAN_VALUES[value.lower()]
+
+        if lookup in STRING_LOOKUPS:
+            return value
+
+        if field.is_relation:
+            field = field.target_field
+        try:
+            return field.to_python(value)
+        except ValidationError as e:
+            raise InvalidFilter(f'"{value}" is not valid for {label}: {" ".join(e.messages)}')
+
+    def compile_term(self, key, raw_value):
+        path, field, lookup = self._resolve(key)
+        label = LOOKUP_SEP.join(path)
+        if lookup in LIST_LOOKUPS:
+            values = [
+                self._coerce(field, lookup, _unquote(value), label)
+                for value in split_unquoted(raw_value, LIST_SEPARATOR)
+            ]
+            if lookup == 'range' and len(values) != 2:
+                raise InvalidFilter(f'Range of {key} needs two values separated by "|"')
+            value = values
+        else:
+            value = self._coerce(field, lookup, _unquote(raw_value), label)
+        if lookup != 'exact':
+            path.append(lookup)
+        return LOOKUP_SEP.join(path), value
+
+    def compile(self, text):
+        filters = []
+        for key, raw_value in parse_filters(text):
+            lookup, value = self.compile_term(key, raw_value)
+            filters.append({lookup: value})
+        return filters
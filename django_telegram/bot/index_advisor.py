@@ -0,0 +1,84 @@
+import logging
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import UniqueConstraint
+from django.utils.module_loading import import_string
+
+from django_telegram.bot.constants import (
+    LOGGER_NAME, SETTINGS_COMMANDS_SUFFIX, SETTINGS_CONVERSATIONS,
+    SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY,
+)
+
+INDEXED = 'indexed'
+NOT_INDEXED = 'missing index'
+UNKNOWN_FIELD = 'unknown field'
+ROLE_HISTORY_LOOKUP = 'history lookup'
+ROLE_FILTER = 'filter'
+
+
+def get_configured_conversations(telegram_settings):
+    for conv_class in telegram_settings.get(SETTINGS_CONVERSATIONS, []):
+        try:
+            class_def = import_string(conv_class)
+        except ImportError:
+            continue
+
+        yield class_def(
+            logger=logging.getLogger(LOGGER_NAME),
+            model_datetime_property=telegram_settings.get(SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY),
+            suffix=telegram_settings.get(SETTINGS_COMMANDS_SUFFIX),
+        )
+
+
+def get_indexed_fields(model):
+    #  only the leading column of a composite index helps a lookup on a single field
+    opts = model._meta
+    indexed = {
+        field.name for field in opts.concrete_fields
+        if field.primary_key or field.unique or field.db_index
+    }
+    indexed.update(index.fields[0].lstrip('-') for index in opts.indexes if index.fields)
+    indexed.update(
+        fields[0] for fields in list(opts.index_together) + list(opts.unique_together) if fields
+    )
+    indexed.update(
+        constraint.fields[0] for constraint in opts.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and constraint.fields and constraint.condition is None
+    )
+    return indexed
+
+
+def _field_status(model, field_name, indexed_fields):
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return UNKNOWN_FIELD
+    return INDEXED if field.name in indexed_fields else NOT_INDEXED
+
+
+def index_report(model, history_property, filter_fields=()):
+    indexed_fields = get_indexed_fields(model)
+    fields = [(history_property, ROLE_HISTORY_LOOKUP)]
+    for filter_field in filter_fields:
+        field_name = filter_field.split('__')[0]
+        if field_name not in [name for name, _role in fields]:
+            fields.append((field_name, ROLE_FILTER))
+
+    return [
+        (field_name, role, _field_status(model, field_name, indexed_fields))
+        for field_name, role in fields
+    ]
+
+
+def conversations_index_report(telegram_settings):
+    report = []
+    for conversation in get_configured_conversations(telegram_settings):
+        model = conversation.model
+        if not hasattr(model, '_meta'):
+            continue
+        report.append((
+            conversation,
+            index_report(model, conversation.model_datetime_property, conversation.filter_fields),
+        ))
+    return report
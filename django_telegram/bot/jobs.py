@@ -0,0 +1,103 @@
+import threading
+import uuid
+from collections import deque
+
+from django.core.cache import caches
+from django.utils import timezone
+
+from django_telegram.bot.constants import JOB_HISTORY_SIZE, JOB_LOCK_DEFAULT_TTL
+
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class Job(object):
+    def __init__(self, command, chat_id):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.chat_id = chat_id
+        self.started_at = timezone.now()
+        self.finished_at = None
+        self.success = None
+        self.link = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        if self.success is None:
+            return JOB_RUNNING
+        return JOB_SUCCEEDED if self.success else JOB_FAILED
+
+    @property
+    def duration(self):
+        return (self.finished_at or timezone.now()) - self.started_at
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback):
+        #  called right away when the job is already finished
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _set_done(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class JobRegistry(object):
+    def __init__(self, lock_alias=None, lock_ttl=JOB_LOCK_DEFAULT_TTL, history=JOB_HISTORY_SIZE):
+        self.lock_alias = lock_alias
+        self.lock_ttl = lock_ttl
+        self.running = {}
+        self.finished = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _lock_key(command):
+        return f'django_telegram:job:{command}'
+
+    def start(self, command, chat_id):
+        with self._lock:
+            job = self.running.get(command)
+            if job:
+                return job, False
+
+            job = Job(command, chat_id)
+            #  the cache lock is shared by all bot instances, the ttl releases it
+            #  if the instance running the command dies before finishing it
+            if self.lock_alias and not caches[self.lock_alias].add(
+                self._lock_key(command), job.id, self.lock_ttl,
+            ):
+                return None, False
+
+            self.running[command] = job
+            return job, True
+
+    def finish(self, job, success, link=None):
+        with self._lock:
+            self.running.pop(job.command, None)
+            job.finished_at = timezone.now()
+            job.success = success
+            job.link = link
+            self.finished.appendleft(job)
+
+        if self.lock_alias:
+            cache = caches[self.lock_alias]
+            if cache.get(self._lock_key(job.command)) == job.id:
+                cache.delete(self._lock_key(job.command))
+        job._set_done()
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self.running.values()) + list(self.finished)
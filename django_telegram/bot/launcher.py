@@ -0,0 +1,21 @@
+import resource
+import runpy
+import sys
+
+#  runs ``-m <module>`` or ``-c <code>`` with an address space limit set by the
+#  child itself, preexec_fn is not safe to use from the multithreaded bot
+
+
+def main(argv):
+    limit, mode, target, *args = argv
+    resource.setrlimit(resource.RLIMIT_AS, (int(limit), int(limit)))
+    if mode == '-m':
+        sys.argv = [target] + args
+        runpy.run_module(target, run_name='__main__', alter_sys=True)
+    else:
+        sys.argv = ['-c'] + args
+        exec(compile(target, '<string>', 'exec'), {'__name__': '__main__'})
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main(sys.argv[1:])
@@ -0,0 +1,301 @@
+import bisect
+import logging
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django_telegram.bot.constants import (
+    LOGGER_NAME, METRICS_CONTENT_TYPE, METRICS_DEFAULT_BUCKETS, METRICS_PATH,
+)
+
+REPLY_SENT = 'sent'
+REPLY_FAILED = 'failed'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardOwner(object):
+    pass
+
+
+class _ThreadShards(object):
+    #  every thread records into its own dict, so recording takes no lock and
+    #  only a scrape walks over the dicts of all threads, the dict of a thread
+    #  is folded into the retired totals when the thread ends
+    def __init__(self, merge):
+        self.merge = merge
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        #  reentrant, a finalizer can run while the lock is held
+        self._lock = threading.RLock()
+
+    def get(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            #  the owner lives in the thread local only, it is collected
+            #  together with the other locals of the thread
+            self._local.owner = _ShardOwner()
+            weakref.finalize(self._local.owner, self._retire, shard)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards = [live for live in self._shards if live is not shard]
+            for key, value in shard.items():
+                self._retired[key] = self.merge(self._retired.get(key), value)
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards)
+            totals = dict(self._retired)
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] = self.merge(totals.get(key), value)
+        return totals
+
+
+class Metric(object):
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.TYPE}',
+        ]
+        for suffix, key, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, key, extra)
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._shards = _ThreadShards(lambda total, value: (total or 0) + value)
+
+    def inc(self, amount=1, **labels):
+        shard = self._shards.get()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self):
+        return self._shards.totals()
+
+    def samples(self):
+        return [('', key, (), value) for key, value in sorted(self.values().items())]
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, *args, buckets=METRICS_DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self._shards = _ThreadShards(self._merge)
+
+    @staticmethod
+    def _merge(total, entry):
+        if total is None:
+            return list(entry)
+        return [left + right for left, right in zip(total, list(entry))]
+
+    def observe(self, value, **labels):
+        shard = self._shards.get()
+        key = self._key(labels)
+        #  bucket counts (the last one is +Inf), then sum and count
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [0] * (len(self.buckets) + 3)
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def values(self):
+        return self._shards.totals()
+
+    def samples(self):
+        samples = []
+        for key, entry in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', bound),), cumulative))
+            samples.append(('_sum', key, (), entry[-2]))
+            samples.append(('_count', key, (), entry[-1]))
+        return samples
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer(object):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._functions = {}
+
+    def set_function(self, function, **labels):
+        #  read when scraped, i.e. the size of a queue
+        self._functions[self._key(labels)] = function
+
+    def samples(self):
+        samples = []
+        for key, function in sorted(self._functions.copy().items()):
+            try:
+                value = function()
+            except NotImplementedError:
+                continue
+            except Exception as e:
+                #  one broken gauge does not fail the whole scrape
+                logging.getLogger(LOGGER_NAME).error(
+                    f'Metric {self.name}{_format_labels(self.labelnames, key)} failed: {str(e)}',
+                )
+                continue
+            samples.append(('', key, (), value))
+        return samples
+
+
+class MetricsRegistry(object):
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return ''.join(f'{metric.render()}\n' for metric in self.metrics)
+
+
+class StatementTimer(object):
+    #  django execute wrapper adding up the time spent in the database
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+REGISTRY = MetricsRegistry()
+
+UPDATES = REGISTRY.register(Counter(
+    'telegram_bot_updates_total',
+    'Updates handled by conversation handler and state.',
+    ['handler', 'state'],
+))
+HANDLER_SECONDS = REGISTRY.register(Histogram(
+    'telegram_bot_handler_seconds',
+    'Time spent handling an update.',
+    ['handler'],
+))
+QUERY_SECONDS = REGISTRY.register(Histogram(
+    'telegram_bot_query_seconds',
+    'Database time of a conversation query.',
+    ['conversation'],
+))
+REPLIES = REGISTRY.register(Counter(
+    'telegram_bot_replies_total',
+    'Replies sent to the chats.',
+    ['status'],
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'telegram_bot_queue_depth',
+    'Items waiting in the bot queues.',
+    ['queue'],
+))
+MIDDLEWARE_EVALUATIONS = REGISTRY.register(Counter(
+    'telegram_middleware_evaluations_total',
+    'Responses checked against a middleware rule.',
+    ['view'],
+))
+MIDDLEWARE_TRIGGERS = REGISTRY.register(Counter(
+    'telegram_middleware_triggers_total',
+    'Responses matching a middleware rule.',
+    ['view'],
+))
+MIDDLEWARE_SUPPRESSIONS = REGISTRY.register(Counter(
+    'telegram_middleware_suppressions_total',
+    'Responses not matching the middleware rule of their view.',
+    ['view'],
+))
+MIDDLEWARE_SENDS = REGISTRY.register(Counter(
+    'telegram_middleware_sends_total',
+    'Messages sent by the middleware.',
+    ['status'],
+))
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(listen, port):
+    server = ThreadingHTTPServer((listen, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    return server
@@ -13,6 +13,10 @@ from django_telegram.bot.constants import (
     SETTINGS_MW_CONDITIONS_VALUE, SETTINGS_MW_MESSAGE, SETTINGS_MW_RULES,
     SETTINGS_MW_TRIGGER_CODES, SETTINGS_MW_VIEW,
 )
+from django_telegram.bot.metrics import (
+    MIDDLEWARE_EVALUATIONS, MIDDLEWARE_SENDS, MIDDLEWARE_SUPPRESSIONS,
+    MIDDLEWARE_TRIGGERS, REPLY_FAILED, REPLY_SENT,
+)
 
 
 class TelegramMiddleware:
@@ -36,15 +40,20 @@ class TelegramMiddleware:
             current_config = list(
                 filter(lambda x: x[SETTINGS_MW_VIEW] == view_name, self.configs[SETTINGS_MW_RULES]),
             )[0]
+            MIDDLEWARE_EVALUATIONS.inc(view=view_name)
             try:
                 if self.matches_config(current_config, response):
-                    send_message(
+                    MIDDLEWARE_TRIGGERS.inc(view=view_name)
+                    sent = send_message(
                         f'[{settings.TELEGRAM_BOT["COMMANDS_SUFFIX"]}] '
                         f'{request.resolver_match.view_name} with pk '
                         f'{request.resolver_match.kwargs.get("pk", None)} '
                         f'has ended with {response.status_code} '
                         f'and sends message: {current_config[SETTINGS_MW_MESSAGE]}',
                     )
+                    MIDDLEWARE_SENDS.inc(status=REPLY_SENT if sent else REPLY_FAILED)
+                else:
+                    MIDDLEWARE_SUPPRESSIONS.inc(view=view_name)
             except Exception as e:
                 #  we do not want this to affect any operations
                 logger = logging.getLogger(LOGGER_NAME)
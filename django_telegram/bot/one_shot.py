@@ -0,0 +1,57 @@
+import re
+
+from django_telegram.bot.constants import (
+    COUNT, DAYS, EXPORT, HISTOGRAM, HOURS, ONE_SHOT_SAVED_PREFIX, SUM, WEEKS,
+)
+from django_telegram.bot.errors.invalid_query import InvalidQuery
+from django_telegram.bot.filter_compiler import split_unquoted
+
+PERIOD_REGEXP = r'^(\d+)([hdw])$'
+PERIOD_UNITS = {
+    'h': HOURS,
+    'd': DAYS,
+    'w': WEEKS,
+}
+ONE_SHOT_USAGE = (
+    'Usage: <quantity><h|d|w> [field__lookup=value ...] '
+    f'[{COUNT}|{SUM}:<property>|{HISTOGRAM}:<{HOURS}|{DAYS}|{WEEKS}>|{EXPORT}] '
+    f'or {ONE_SHOT_SAVED_PREFIX}<name> [{EXPORT}]'
+)
+
+
+def _parse_aggregate(token):
+    a_type, _sep, a_property = token.partition(':')
+    if a_type in (COUNT, EXPORT) and not a_property:
+        return a_type, ''
+    if a_type == SUM and a_property:
+        return a_type, a_property
+    if a_type == HISTOGRAM and a_property in (HOURS, DAYS, WEEKS):
+        return a_type, a_property
+    return None
+
+
+def parse_one_shot(text):
+    tokens = [token for token in split_unquoted(' '.join(text.split()), ' ') if token]
+    if not tokens:
+        raise InvalidQuery(ONE_SHOT_USAGE)
+
+    if tokens[0].startswith(ONE_SHOT_SAVED_PREFIX):
+        name = tokens[0][len(ONE_SHOT_SAVED_PREFIX):]
+        if not name or tokens[1:] not in ([], [EXPORT]):
+            raise InvalidQuery(ONE_SHOT_USAGE)
+        return {
+            'saved': name,
+            'export': tokens[1:] == [EXPORT],
+        }
+
+    period = re.match(PERIOD_REGEXP, tokens[0])
+    if not period:
+        raise InvalidQuery(f'Unknown period "{tokens[0]}". {ONE_SHOT_USAGE}')
+
+    aggregate = _parse_aggregate(tokens[-1]) if len(tokens) > 1 else None
+    filter_tokens = tokens[1:-1] if aggregate else tokens[1:]
+    return {
+        'period': (PERIOD_UNITS[period.group(2)], period.group(1)),
+        'filters': ','.join(filter_tokens),
+        'aggregate': aggregate,
+    }
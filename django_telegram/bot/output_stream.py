@@ -0,0 +1,65 @@
+import gzip
+import io
+import tempfile
+import threading
+import time
+
+from django_telegram.bot.constants import COMMAND_OUTPUT_EDIT_INTERVAL, COMMAND_OUTPUT_LIMIT
+
+TRUNCATED_MARK = '... truncated ...\n'
+
+
+class StreamedOutput(io.TextIOBase):
+    def __init__(
+        self,
+        on_progress,
+        limit=COMMAND_OUTPUT_LIMIT,
+        interval=COMMAND_OUTPUT_EDIT_INTERVAL,
+    ):
+        self.on_progress = on_progress
+        self.limit = limit
+        self.interval = interval
+        self.size = 0
+        self.tail = ''
+        #  the full output is kept compressed on disk in case it has to be
+        #  attached as a document, only its tail stays in memory
+        self.log = tempfile.TemporaryFile()
+        self._log_stream = gzip.open(self.log, 'wt', encoding='utf-8')
+        self._progress_at = None
+        self._lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        with self._lock:
+            self._log_stream.write(text)
+            self.size += len(text)
+            self.tail = (self.tail + text)[-self.limit:]
+            now = time.monotonic()
+            #  line buffered and throttled, so the progress message is edited
+            #  at most once per interval and never in the middle of a line
+            progress = '\n' in text and (
+                self._progress_at is None or now - self._progress_at >= self.interval
+            )
+            if progress:
+                self._progress_at = now
+                current = self.text
+        if progress:
+            self.on_progress(current)
+        return len(text)
+
+    @property
+    def overflow(self):
+        return self.size > self.limit
+
+    @property
+    def text(self):
+        return f'{TRUNCATED_MARK}{self.tail}' if self.overflow else self.tail
+
+    def close(self):
+        with self._lock:
+            if not self._log_stream.closed:
+                self._log_stream.close()
+                self.log.seek(0)
+        super().close()
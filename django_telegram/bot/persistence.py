@@ -0,0 +1,251 @@
+import copy
+import datetime
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from enum import Enum
+from importlib import import_module
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from django_telegram.bot.chat_state import ChatStateStore, conversation_namespace
+from django_telegram.bot.constants import PERSISTENCE_TABLE
+from django_telegram.models import StateEntry
+
+TYPE_KEY = '__type__'
+#  values of filters and conversation states which are not plain JSON
+JSON_TYPES = {
+    'datetime': (datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    'date': (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    'time': (datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    'timedelta': (
+        datetime.timedelta,
+        datetime.timedelta.total_seconds,
+        lambda seconds: datetime.timedelta(seconds=seconds),
+    ),
+    'decimal': (Decimal, str, Decimal),
+    'uuid': (uuid.UUID, str, uuid.UUID),
+}
+
+
+def _encode_key(key):
+    return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+
+def _decode_key(key):
+    key = json.loads(key)
+    return tuple(key) if isinstance(key, list) else key
+
+
+def _to_json(value):
+    if isinstance(value, Enum):
+        enum_class = type(value)
+        return {
+            TYPE_KEY: 'enum',
+            'class': f'{enum_class.__module__}:{enum_class.__qualname__}',
+            'value': value.name,
+        }
+    for name, (value_type, encode, _decode) in JSON_TYPES.items():
+        if isinstance(value, value_type):
+            return {TYPE_KEY: name, 'value': encode(value)}
+    raise TypeError(f'{type(value).__name__} can not be persisted')
+
+
+def _enum_member(path, name):
+    module, qualname = path.split(':')
+    enum_class = import_module(module)
+    for attribute in qualname.split('.'):
+        enum_class = getattr(enum_class, attribute)
+    if not isinstance(enum_class, type) or not issubclass(enum_class, Enum):
+        raise ValueError(f'{path} is not an enum')
+    return enum_class[name]
+
+
+def _from_json(value):
+    value_type = value.get(TYPE_KEY)
+    if value_type is None:
+        return value
+    if value_type == 'enum':
+        return _enum_member(value['class'], value['value'])
+    return JSON_TYPES[value_type][2](value['value'])
+
+
+def _encode_value(value):
+    return json.dumps(value, default=_to_json)
+
+
+def _decode_value(value):
+    return json.loads(value, object_hook=_from_json)
+
+
+class StateBackend(object):
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, items):
+        raise NotImplementedError
+
+
+class SQLiteStateBackend(StateBackend):
+    #  a local file owned by the bot, not a django database, so its single
+    #  table is created when the file is opened
+    def __init__(self, path):
+        self.path = path
+        with self._cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {PERSISTENCE_TABLE} ('
+                'namespace VARCHAR(100) NOT NULL, '
+                'state_key VARCHAR(100) NOT NULL, '
+                'state_value TEXT NOT NULL, '
+                'PRIMARY KEY (namespace, state_key))',
+            )
+
+    @contextmanager
+    def _cursor(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection.cursor()
+        finally:
+            connection.close()
+
+    def load(self):
+        with self._cursor() as cursor:
+            cursor.execute(f'SELECT namespace, state_key, state_value FROM {PERSISTENCE_TABLE}')
+            rows = cursor.fetchall()
+        return [
+            (namespace, _decode_key(key), _decode_value(value))
+            for namespace, key, value in rows
+        ]
+
+    def save(self, items):
+        with self._cursor() as cursor:
+            for (namespace, key), value in items.items():
+                encoded_key = _encode_key(key)
+                if value is None:
+                    cursor.execute(
+                        f'DELETE FROM {PERSISTENCE_TABLE} WHERE namespace = ? AND state_key = ?',
+                        [namespace, encoded_key],
+                    )
+                else:
+                    cursor.execute(
+                        f'INSERT OR REPLACE INTO {PERSISTENCE_TABLE} '
+                        '(namespace, state_key, state_value) VALUES (?, ?, ?)',
+                        [namespace, encoded_key, _encode_value(value)],
+                    )
+
+
+class DjangoStateBackend(StateBackend):
+    #  the table is created by the django_telegram migrations
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+
+    @property
+    def entries(self):
+        return StateEntry.objects.using(self.alias)
+
+    def load(self):
+        return [
+            (namespace, _decode_key(key), _decode_value(value))
+            for namespace, key, value in self.entries.values_list(
+                'namespace', 'state_key', 'state_value',
+            )
+        ]
+
+    def save(self, items):
+        with transaction.atomic(using=self.alias):
+            for (namespace, key), value in items.items():
+                entries = self.entries.filter(namespace=namespace, state_key=_encode_key(key))
+                if value is None:
+                    entries.delete()
+                elif not entries.update(state_value=_encode_value(value)):
+                    self.entries.create(
+                        namespace=namespace,
+                        state_key=_encode_key(key),
+                        state_value=_encode_value(value),
+                    )
+
+
+class StatePersistence(object):
+    def __init__(self, backend, logger=None):
+        self.backend = backend
+        self.logger = logger
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._data = {}
+        for namespace, key, value in backend.load():
+            self._data.setdefault(namespace, {})[key] = value
+
+    def get(self, namespace):
+        return dict(self._data.get(namespace, {}))
+
+    def update(self, namespace, key, value):
+        with self._lock:
+            self._pending[(namespace, key)] = value
+
+    def get_conversations(self, name):
+        return self.get(conversation_namespace(name))
+
+    def update_conversation(self, name, key, new_state):
+        self.update(conversation_namespace(name), key, new_state)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            self.backend.save(pending)
+        except Exception as e:
+            with self._lock:
+                #  kept for the next flush unless they changed in the meantime
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+            if self.logger:
+                self.logger.error(f'State flush of {len(pending)} entries failed: {str(e)}')
+            return 0
+        return len(pending)
+
+    def _flush_job(self, context):
+        self.flush()
+
+    def schedule_flush(self, job_queue, interval):
+        job_queue.run_repeating(
+            self._flush_job,
+            interval=interval,
+            first=interval,
+            name='persistence:flush',
+        )
+
+
+class PersistentChatStateStore(ChatStateStore):
+    def __init__(self, persistence, namespace, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.persistence = persistence
+        self.namespace = namespace
+        #  chat id -> state as last handed to the persistence
+        self._persisted = {}
+        restored_at = time.monotonic()
+        for chat_id, state in persistence.get(namespace).items():
+            self._states[chat_id] = (restored_at, state)
+            self._persisted[chat_id] = copy.deepcopy(state)
+
+    def _changed(self, chat_id, state):
+        if chat_id is None:
+            return
+        #  copied on the thread handling the chat, so the flush serializes a
+        #  state which is not changed meanwhile, unchanged states are skipped
+        snapshot = copy.deepcopy(state)
+        with self._lock:
+            if self._persisted.get(chat_id) == snapshot:
+                return
+            if snapshot is None:
+                self._persisted.pop(chat_id, None)
+            else:
+                self._persisted[chat_id] = snapshot
+        self.persistence.update(self.namespace, chat_id, snapshot)
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as WorkerTimeout
+from contextlib import contextmanager
+
+from django.db import connections, OperationalError, transaction
+
+from django_telegram.bot.constants import QUERY_BUDGET_WORKERS
+from django_telegram.bot.errors.query_budget_exceeded import QueryBudgetExceeded
+
+POSTGRESQL_QUERY_CANCELED = '57014'
+MYSQL_QUERY_TIMEOUT = 3024
+
+#  queries of backends without a statement timeout, abandoned ones keep their
+#  worker until they end, so the bot can't pile up threads
+_workers = ThreadPoolExecutor(
+    max_workers=QUERY_BUDGET_WORKERS, thread_name_prefix='django-telegram-query',
+)
+
+
+class StatementRecorder(object):
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql if params is None else f'{sql} -- params: {params}')
+        return execute(sql, params, many, context)
+
+    @property
+    def last_statement(self):
+        return self.statements[-1] if self.statements else None
+
+
+def is_timeout_error(error):
+    cause = error.__cause__
+    if getattr(cause, 'pgcode', None) == POSTGRESQL_QUERY_CANCELED:
+        return True
+    args = getattr(cause, 'args', None) or error.args
+    return bool(args) and args[0] == MYSQL_QUERY_TIMEOUT
+
+
+@contextmanager
+def statement_timeout(connection, seconds):
+    milliseconds = int(seconds * 1000)
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [milliseconds])
+            yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET SESSION max_execution_time = %s', [milliseconds])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SET SESSION max_execution_time = 0')
+
+
+def _run_with_statement_timeout(func, seconds, using):
+    connection = connections[using]
+    recorder = StatementRecorder()
+    try:
+        with connection.execute_wrapper(recorder), statement_timeout(connection, seconds):
+            return func()
+    except OperationalError as e:
+        if is_timeout_error(e):
+            raise QueryBudgetExceeded(seconds, recorder.last_statement) from e
+        raise
+
+
+def _run_in_worker(func, seconds, using):
+    recorder = StatementRecorder()
+    running = {}
+
+    def run():
+        connection = connections[using]
+        running['connection'] = connection
+        try:
+            with connection.execute_wrapper(recorder):
+                return func()
+        finally:
+            connection.close()
+
+    future = _workers.submit(run)
+    try:
+        return future.result(seconds)
+    except WorkerTimeout:
+        #  a query still waiting for a worker is dropped, backends which support
+        #  it get the running statement interrupted, others let it finish unobserved
+        if not future.cancel():
+            db_connection = getattr(running.get('connection'), 'connection', None)
+            if hasattr(db_connection, 'interrupt'):
+                db_connection.interrupt()
+        raise QueryBudgetExceeded(seconds, recorder.last_statement)
+
+
+def run_with_budget(func, seconds, using='default'):
+    if not seconds:
+        return func()
+
+    if connections[using].vendor in ('postgresql', 'mysql'):
+        return _run_with_statement_timeout(func, seconds, using)
+    return _run_in_worker(func, seconds, using)
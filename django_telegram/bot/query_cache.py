@@ -0,0 +1,104 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+
+from django_telegram.bot.constants import (
+    QUERY_CACHE_DEFAULT_ALIAS, SETTINGS_QUERY_CACHE, SETTINGS_QUERY_CACHE_ALIAS,
+)
+from django_telegram.bot.index_advisor import get_configured_conversations
+
+
+class QueryResultCache(object):
+    KEY_PREFIX = 'django_telegram:query'
+
+    def __init__(self, alias='default', timeout=300, max_entries=1000):
+        self.alias = alias
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._watched = set()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def model_label(model):
+        return f'{model.__module__}.{model.__name__}'
+
+    def _generation_key(self, model):
+        return f'{self.KEY_PREFIX}:{self.model_label(model)}:generation'
+
+    def _generation(self, model):
+        #  generation is a random token, so that an evicted generation key
+        #  can never make stale entries reachable again
+        key = self._generation_key(model)
+        generation = self.cache.get(key)
+        if generation is None:
+            self.cache.add(key, uuid4().hex, None)
+            generation = self.cache.get(key)
+        return generation
+
+    def make_key(self, model, spec):
+        digest = hashlib.sha1(
+            json.dumps(spec, sort_keys=True, default=str).encode('utf-8'),
+        ).hexdigest()
+        return f'{self.KEY_PREFIX}:{self.model_label(model)}:{self._generation(model)}:{digest}'
+
+    def get(self, key):
+        value = self.cache.get(key)
+        if value is not None:
+            with self._lock:
+                if key in self._keys:
+                    self._keys.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+        evicted = []
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_entries:
+                evicted.append(self._keys.popitem(last=False)[0])
+        if evicted:
+            self.cache.delete_many(evicted)
+
+    def invalidate(self, model):
+        self.cache.set(self._generation_key(model), uuid4().hex, None)
+
+    def watch(self, model):
+        if model is None or model in self._watched:
+            return
+        self._watched.add(model)
+        #  caches on the same alias share the generations, one receiver is enough
+        dispatch_uid = f'{self.KEY_PREFIX}:{self.alias}:{self.model_label(model)}'
+        post_save.connect(
+            self._on_model_change, sender=model, weak=False, dispatch_uid=dispatch_uid,
+        )
+        post_delete.connect(
+            self._on_model_change, sender=model, weak=False, dispatch_uid=dispatch_uid,
+        )
+
+    def _on_model_change(self, sender, **kwargs):
+        self.invalidate(sender)
+
+
+def watch_configured_models(telegram_settings):
+    #  models are also saved outside of the bot process (admin, views, workers)
+    cache_settings = telegram_settings.get(SETTINGS_QUERY_CACHE)
+    if not cache_settings:
+        return None
+
+    query_cache = QueryResultCache(
+        alias=cache_settings.get(SETTINGS_QUERY_CACHE_ALIAS, QUERY_CACHE_DEFAULT_ALIAS),
+    )
+    for conversation in get_configured_conversations(telegram_settings):
+        query_cache.watch(conversation.model)
+    return query_cache
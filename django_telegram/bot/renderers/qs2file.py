@@ -0,0 +1,49 @@
+import csv
+import gzip
+import json
+import tempfile
+
+from django_telegram.bot.constants import EXPORT_CHUNK_SIZE, EXPORT_CSV, EXPORT_JSONL
+
+
+def _write_csv(stream, rows, fields):
+    writer = csv.DictWriter(stream, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def _write_jsonl(stream, rows, fields):
+    written = 0
+    for row in rows:
+        stream.write(json.dumps(row, default=str))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+WRITERS = {
+    EXPORT_CSV: _write_csv,
+    EXPORT_JSONL: _write_jsonl,
+}
+
+
+def export_as_file(queryset, fields, export_format=EXPORT_CSV, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format not in WRITERS:
+        raise ValueError(f'Export format must be one of {sorted(WRITERS.keys())}')
+
+    #  rows are streamed from the database cursor and compressed on the fly,
+    #  so only one chunk of rows is kept in memory whatever the result size is
+    rows = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    export_file = tempfile.TemporaryFile()
+    try:
+        with gzip.open(export_file, 'wt', encoding='utf-8', newline='') as stream:
+            written = WRITERS[export_format](stream, rows, fields)
+    except Exception:
+        export_file.close()
+        raise
+    export_file.seek(0)
+    return export_file, written
@@ -1,12 +1,120 @@
-def render_as_list(queryset):
+from django_telegram.bot.constants import LIST_FORMAT, MESSAGE_MAX_LENGTH
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+BAR_CHAR = '█'
+HISTOGRAM_BAR_WIDTH = 20
+HISTOGRAM_MAX_BARS = 48
+#  well below the message limit, longer periods are downsampled
+HISTOGRAM_MAX_SPARK_CHARS = 500
+
+
+def render_as_list(queryset, row_format=LIST_FORMAT):
     qs_size = len(queryset)
     if qs_size <= 10:
-        data_string = '\n'.join(['- {name} ({id}): {status}\n'.format(
-            name=i["name"], id=i["id"], status=i["status"],
-        ) for i in queryset])
+        data_string = '\n'.join([row_format.format(**i) for i in queryset])
         return f'``` Total: {qs_size}\n{data_string} ```'
     else:
-        data_string = '\n'.join(['- {name} ({id}): {status}\n'.format(
-            name=i["name"], id=i["id"], status=i["status"],
-        ) for i in queryset[0:9]])
+        data_string = '\n'.join([row_format.format(**i) for i in queryset[0:9]])
         return f'``` Total: {qs_size}\n{data_string}\n- ... and {qs_size - 10} more ...```'
+
+
+def _downsample(buckets, size):
+    #  consecutive buckets are added up, so that at most ``size`` are left
+    step = -(-len(buckets) // size)
+    return [
+        (buckets[i][0], sum(amount for _bucket, amount in buckets[i:i + step]))
+        for i in range(0, len(buckets), step)
+    ], step
+
+
+def _sparkline(buckets, peak):
+    return ''.join(
+        SPARK_CHARS[(len(SPARK_CHARS) - 1) * amount // peak] for _bucket, amount in buckets
+    )
+
+
+def render_as_histogram(buckets, label_format='%Y-%m-%d %H:%M'):
+    total = sum(amount for _bucket, amount in buckets)
+    if len(buckets) > HISTOGRAM_MAX_BARS:
+        buckets, step = _downsample(buckets, HISTOGRAM_MAX_SPARK_CHARS)
+        peak = max([amount for _bucket, amount in buckets] + [1])
+        scale = f'\n1 char = {step} buckets' if step > 1 else ''
+        return f'``` Total: {total}\nPeak: {peak}{scale}\n{_sparkline(buckets, peak)} ```'
+
+    peak = max([amount for _bucket, amount in buckets] + [1])
+    bars = '\n'.join([
+        '{label} | {bar} {amount}'.format(
+            label=bucket.strftime(label_format),
+            bar=BAR_CHAR * -(-HISTOGRAM_BAR_WIDTH * amount // peak),
+            amount=amount,
+        ) for bucket, amount in buckets
+    ])
+    return f'``` Total: {total}\n{_sparkline(buckets, peak)}\n{bars} ```'
+
+
+def _split_lines(lines, limit):
+    chunks = []
+    chunk = ''
+    for line in lines:
+        while len(line) > limit:
+            if chunk:
+                chunks.append(chunk)
+                chunk = ''
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if chunk and len(chunk) + len(line) + 1 > limit:
+            chunks.append(chunk)
+            chunk = ''
+        chunk = f'{chunk}\n{line}' if chunk else line
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def render_as_profile(statements, plan, wall_time, rows, limit=MESSAGE_MAX_LENGTH):
+    lines = [
+        f'Wall time: {wall_time:.3f}s',
+        f'Rows fetched: {rows}',
+        f'DB queries: {len(statements)}',
+        '',
+        'SQL:',
+    ]
+    lines.extend(statements)
+    lines.extend(['', 'Plan:'])
+    lines.extend(plan.splitlines())
+    #  every message is sent as a code block, its markers count towards the limit
+    return [f'``` {chunk} ```' for chunk in _split_lines(lines, limit - 8)]
+
+
+def _format_duration(duration):
+    seconds = int(duration.total_seconds())
+    if seconds < 60:
+        return f'{seconds}s'
+    return f'{seconds // 60}m {seconds % 60}s'
+
+
+def render_as_jobs(jobs):
+    if not jobs:
+        return '``` No jobs ```'
+
+    lines = []
+    for job in jobs:
+        line = f'- `{job.command}` {job.status} {_format_duration(job.duration)}'
+        if job.link:
+            line = f'{line} [result]({job.link})'
+        lines.append(line)
+    return '*Jobs*\n' + '\n'.join(lines)
+
+
+def render_as_commands(entries, limit=MESSAGE_MAX_LENGTH):
+    if not entries:
+        return ['``` No commands ```']
+
+    lines = ['*Available commands*']
+    for entry in entries:
+        lines.append(f'- `/{entry.command}` {entry.description}')
+        if entry.saved_filters:
+            lines.append(f'  saved filters: `{", ".join(entry.saved_filters)}`')
+        if entry.custom_commands:
+            lines.append(f'  custom commands: `{", ".join(entry.custom_commands)}`')
+    return _split_lines(lines, limit)
@@ -0,0 +1,123 @@
+import threading
+import time
+from contextlib import nullcontext
+
+from telegram import MessageEntity, Update
+from telegram.ext import CommandHandler, Handler
+
+from django_telegram.bot.metrics import HANDLER_SECONDS, UPDATES
+from django_telegram.bot.shared_state import ROUTE_NAMESPACE, SharedMapping
+
+
+def get_update_command(update):
+    message = update.effective_message
+    if not message or not message.text or not message.entities:
+        return None
+
+    entity = message.entities[0]
+    if entity.type != MessageEntity.BOT_COMMAND or entity.offset != 0:
+        return None
+    return message.text[1:entity.length].split('@')[0].lower()
+
+
+def get_conversation_key(update):
+    #  matches the default ConversationHandler key (per chat and per user)
+    chat = update.effective_chat
+    user = update.effective_user
+    if chat is None or user is None:
+        return None
+    return chat.id, user.id
+
+
+#  one handler in front of all conversations: entry commands are looked up in
+#  a dict, updates of a chat inside a conversation go straight to the handler
+#  holding its state, so routing does not depend on the conversations count
+class ConversationRouter(Handler):
+    def __init__(self, conversation_handlers, shared_state=None, in_flight=None):
+        super().__init__(callback=None)
+        self.in_flight = in_flight
+        self.conversation_handlers = list(conversation_handlers)
+        self.handlers = {handler.name: handler for handler in self.conversation_handlers}
+        self.entry_points = {}
+        for conversation_handler in self.conversation_handlers:
+            for entry_point in conversation_handler.entry_points:
+                if not isinstance(entry_point, CommandHandler):
+                    continue
+                for command in entry_point.command:
+                    #  shared entry points (/commands) are served by the first handler
+                    self.entry_points.setdefault(command, conversation_handler)
+        #  (chat, user) -> name of the conversation handler holding its state
+        self.shared_state = shared_state
+        if shared_state:
+            self.active = SharedMapping(shared_state, ROUTE_NAMESPACE)
+        else:
+            self.active = {}
+        for conversation_handler in self.conversation_handlers:
+            #  conversations restored from persistence are routed right away
+            for key in conversation_handler.conversations:
+                self.active.setdefault(key, conversation_handler.name)
+        self._lock = threading.Lock()
+
+    def get_active_handler(self, key):
+        with self._lock:
+            conversation_handler = self.handlers.get(self.active.get(key))
+            if conversation_handler and key not in conversation_handler.conversations:
+                #  the conversation was ended out of band (timeout, cancel)
+                del self.active[key]
+                return None
+        return conversation_handler
+
+    def _check(self, conversation_handler, update, key):
+        if conversation_handler is None:
+            return None
+        if self.shared_state:
+            self.shared_state.prefetch(
+                self.shared_state.conversation_keys(conversation_handler.name, key),
+            )
+        check = conversation_handler.check_update(update)
+        if check is None or check is False:
+            return None
+        return conversation_handler, check
+
+    def check_update(self, update):
+        if not isinstance(update, Update):
+            return None
+        key = get_conversation_key(update)
+        if key is None:
+            return None
+
+        if self.shared_state:
+            self.shared_state.begin()
+        return (
+            self._check(self.get_active_handler(key), update, key)
+            or self._check(self.entry_points.get(get_update_command(update)), update, key)
+        )
+
+    @staticmethod
+    def _state_name(conversation_handler, key):
+        state = conversation_handler.conversations.get(key)
+        return getattr(state, 'name', 'entry' if state is None else str(state))
+
+    def handle_update(self, update, dispatcher, check_result, context=None):
+        conversation_handler, check = check_result
+        key = get_conversation_key(update)
+        UPDATES.inc(
+            handler=conversation_handler.name,
+            state=self._state_name(conversation_handler, key),
+        )
+        tracked = self.in_flight.track(key[0]) if self.in_flight is not None else nullcontext()
+        started = time.perf_counter()
+        try:
+            with tracked:
+                return conversation_handler.handle_update(update, dispatcher, check, context)
+        finally:
+            HANDLER_SECONDS.observe(
+                time.perf_counter() - started, handler=conversation_handler.name,
+            )
+            with self._lock:
+                if key in conversation_handler.conversations:
+                    self.active[key] = conversation_handler.name
+                elif self.active.get(key) == conversation_handler.name:
+                    del self.active[key]
+            if self.shared_state:
+                self.shared_state.commit()
@@ -0,0 +1,72 @@
+import signal
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from telegram import Update
+from telegram.ext import Handler
+
+
+def get_update_shard(update, shards):
+    chat = update.effective_chat
+    if chat is None:
+        return 0
+    return hash(chat.id) % shards
+
+
+def check_shard_lock(job_registry):
+    #  a lock held in the memory of one worker does not stop the others from
+    #  running the same custom command
+    lock_alias = job_registry.lock_alias
+    if lock_alias is None or isinstance(caches[lock_alias], (DummyCache, LocMemCache)):
+        raise ImproperlyConfigured(
+            '"COMMAND_LOCK[ALIAS]" must be a cache shared by the processes '
+            'to run the bot with --processes.',
+        )
+
+
+def get_dead_workers(workers):
+    return [worker for worker in workers if not worker.is_alive()]
+
+
+class ShardingHandler(Handler):
+    #  the receiving dispatcher handles updates one by one in a single thread,
+    #  so the updates of a chat reach its worker process in order
+    def __init__(self, queues):
+        super().__init__(self.forward)
+        self.queues = queues
+
+    def check_update(self, update):
+        return isinstance(update, Update)
+
+    def forward(self, update, context):
+        self.queues[get_update_shard(update, len(self.queues))].put(update.to_dict())
+
+
+def run_shard_worker(dispatcher, updates, drain=None):
+    #  the receiver process handles the signals and stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=dispatcher.start, kwargs={'ready': ready}, name='shard_dispatcher',
+    )
+    thread.start()
+    ready.wait()
+    if dispatcher.job_queue:
+        dispatcher.job_queue.start()
+    try:
+        for data in iter(updates.get, None):
+            dispatcher.update_queue.put(Update.de_json(data, dispatcher.bot))
+    finally:
+        if dispatcher.job_queue:
+            dispatcher.job_queue.stop()
+    if drain and not drain():
+        return False
+
+    dispatcher.stop()
+    thread.join()
+    return True
@@ -0,0 +1,176 @@
+import json
+import pickle
+import threading
+import zlib
+from collections.abc import MutableMapping
+
+from django.core.cache import caches
+
+from django_telegram.bot.chat_state import (
+    chat_namespace, ChatStateStore, conversation_namespace,
+)
+from django_telegram.bot.constants import (
+    QUERY_CACHE_DEFAULT_ALIAS, SHARED_STATE_DEFAULT_TIMEOUT, SHARED_STATE_KEY_PREFIX,
+)
+
+ROUTE_NAMESPACE = 'route'
+
+
+def _encode(value):
+    return zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def _decode(payload):
+    return pickle.loads(zlib.decompress(payload)) if payload is not None else None
+
+
+class SharedState(object):
+    def __init__(self, alias=QUERY_CACHE_DEFAULT_ALIAS, timeout=SHARED_STATE_DEFAULT_TIMEOUT,
+                 logger=None):
+        self.alias = alias
+        self.timeout = timeout
+        self.logger = logger
+        self._local = threading.local()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(namespace, key):
+        return f'{SHARED_STATE_KEY_PREFIX}:{namespace}:{json.dumps(key, separators=(",", ":"))}'
+
+    def conversation_keys(self, name, key):
+        return [
+            self.make_key(conversation_namespace(name), list(key)),
+            self.make_key(chat_namespace(name), key[0]),
+        ]
+
+    @staticmethod
+    def _entry(stored):
+        version, payload = stored or (0, None)
+        return {'version': version, 'payload': payload, 'value': _decode(payload)}
+
+    @property
+    def _entries(self):
+        return getattr(self._local, 'entries', None)
+
+    def begin(self):
+        #  entries read while an update is handled are cached locally and
+        #  written back once, when it is done
+        self._local.entries = {}
+
+    def commit(self):
+        entries, self._local.entries = self._entries, None
+        for key, entry in (entries or {}).items():
+            self._write(key, entry)
+
+    def prefetch(self, keys):
+        entries = self._entries
+        if entries is None:
+            return
+        missing = [key for key in keys if key not in entries]
+        if missing:
+            stored = self.cache.get_many(missing)
+            for key in missing:
+                entries[key] = self._entry(stored.get(key))
+
+    def get(self, key):
+        entries = self._entries
+        if entries is None:
+            return self._entry(self.cache.get(key))['value']
+        self.prefetch([key])
+        return entries[key]['value']
+
+    def set(self, key, value):
+        entries = self._entries
+        if entries is None:
+            entry = self._entry(self.cache.get(key))
+            entry['value'] = value
+            self._write(key, entry)
+            return
+        self.prefetch([key])
+        entries[key]['value'] = value
+
+    def delete(self, key):
+        self.set(key, None)
+
+    def _write(self, key, entry):
+        payload = _encode(entry['value']) if entry['value'] is not None else None
+        if payload == entry['payload']:
+            return True
+
+        #  optimistic versioning: only the first writer of a version wins,
+        #  deletions are written as empty versions so numbers are not reused
+        version = entry['version'] + 1
+        if not self.cache.add(f'{key}:{version}', True, self.timeout):
+            if self.logger:
+                self.logger.warning(f'Shared state {key} changed concurrently, update dropped')
+            return False
+        self.cache.set(key, (version, payload), self.timeout)
+        return True
+
+
+class SharedMapping(MutableMapping):
+    def __init__(self, shared_state, namespace):
+        self.shared_state = shared_state
+        self.namespace = namespace
+
+    def _key(self, key):
+        return self.shared_state.make_key(
+            self.namespace, list(key) if isinstance(key, tuple) else key,
+        )
+
+    def __getitem__(self, key):
+        value = self.shared_state.get(self._key(key))
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.shared_state.set(self._key(key), value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.shared_state.delete(self._key(key))
+
+    def __contains__(self, key):
+        return self.shared_state.get(self._key(key)) is not None
+
+    def __iter__(self):
+        #  entries are only reached by key, they expire in the cache
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+
+class SharedChatStateStore(ChatStateStore):
+    def __init__(self, shared_state, namespace, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shared_state = shared_state
+        self.namespace = namespace
+
+    def _key(self, chat_id):
+        return self.shared_state.make_key(self.namespace, chat_id)
+
+    def __contains__(self, chat_id):
+        if chat_id is None:
+            return super().__contains__(chat_id)
+        return self.shared_state.get(self._key(chat_id)) is not None
+
+    def get(self, chat_id):
+        if chat_id is None:
+            return super().get(chat_id)
+        return self.shared_state.get(self._key(chat_id))
+
+    def set(self, chat_id, state):
+        if chat_id is None:
+            return super().set(chat_id, state)
+        self.shared_state.set(self._key(chat_id), state)
+
+    def discard(self, chat_id):
+        if chat_id is None:
+            return super().discard(chat_id)
+        self.shared_state.delete(self._key(chat_id))
@@ -0,0 +1,138 @@
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty
+
+from telegram import Update
+from telegram.error import TelegramError
+
+from django_telegram.bot.constants import (
+    SHUTDOWN_DEFAULT_TIMEOUT, SHUTDOWN_JOB_MESSAGE, SHUTDOWN_POLL_INTERVAL,
+    SHUTDOWN_UPDATE_MESSAGE,
+)
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGABRT)
+
+
+def wait_for_stop_signal(signals=STOP_SIGNALS, alive=None):
+    stop = threading.Event()
+    for signum in signals:
+        signal.signal(signum, lambda signum, frame: stop.set())
+    #  waits in short steps so that the signal handlers get to run, and
+    #  returns False without a signal once ``alive`` fails
+    while not stop.wait(1):
+        if alive and not alive():
+            return False
+    return True
+
+
+def stop_receiving(updater):
+    #  the polling loop ends after its current request, the webhook listener
+    #  right away, updates already received are still handled
+    updater.running = False
+    if updater.httpd:
+        updater.httpd.shutdown()
+        updater.httpd = None
+
+
+class InFlightRegistry(object):
+    def __init__(self):
+        self._chat_ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._chat_ids)
+
+    @property
+    def chat_ids(self):
+        with self._lock:
+            return list(self._chat_ids.values())
+
+    @contextmanager
+    def track(self, chat_id):
+        token = object()
+        with self._lock:
+            self._chat_ids[token] = chat_id
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._chat_ids[token]
+
+
+class ShutdownDrain(object):
+    def __init__(self, dispatcher, in_flight, timeout=SHUTDOWN_DEFAULT_TIMEOUT,
+                 job_registry=None, command_pool=None, logger=None):
+        self.dispatcher = dispatcher
+        self.in_flight = in_flight
+        self.timeout = timeout
+        self.job_registry = job_registry
+        self.command_pool = command_pool
+        self.logger = logger
+
+    @property
+    def drained(self):
+        #  an update is done once the dispatcher marked it, so the queue
+        #  counts both the waiting updates and the one being handled, custom
+        #  commands go on in the background until their job is finished
+        if self.job_registry is not None and self.job_registry.running:
+            return False
+        return not self.dispatcher.update_queue.unfinished_tasks and not len(self.in_flight)
+
+    def wait(self):
+        deadline = time.monotonic() + self.timeout
+        while not self.drained:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(SHUTDOWN_POLL_INTERVAL)
+        return True
+
+    def _drop_queued(self):
+        dropped = []
+        while True:
+            try:
+                update = self.dispatcher.update_queue.get_nowait()
+            except Empty:
+                return dropped
+            self.dispatcher.update_queue.task_done()
+            if isinstance(update, Update):
+                dropped.append(update)
+
+    def _notify(self, chat_id, text):
+        try:
+            self.dispatcher.bot.send_message(chat_id, text)
+        except TelegramError as e:
+            if self.logger:
+                self.logger.warning(f'Shutdown notice to chat {chat_id} not sent: {str(e)}')
+
+    def abandon(self):
+        dropped = self._drop_queued()
+        in_flight = self.in_flight.chat_ids
+        jobs = list(self.job_registry.running.values()) if self.job_registry else []
+        killed = self.command_pool.terminate() if self.command_pool else []
+        if self.logger:
+            self.logger.error(
+                f'Shutdown timeout of {self.timeout}s exceeded: '
+                f'{len(in_flight)} updates in flight, {len(dropped)} queued updates dropped, '
+                f'jobs abandoned: {[job.command for job in jobs]}, '
+                f'commands killed: {killed}',
+            )
+
+        for job in jobs:
+            self._notify(job.chat_id, SHUTDOWN_JOB_MESSAGE.format(command=job.command))
+        job_chat_ids = {job.chat_id for job in jobs}
+        chat_ids = in_flight + [
+            update.effective_chat.id for update in dropped if update.effective_chat
+        ]
+        for chat_id in dict.fromkeys(chat_ids):
+            if chat_id not in job_chat_ids:
+                self._notify(chat_id, SHUTDOWN_UPDATE_MESSAGE)
+
+    def run(self):
+        if self.wait():
+            return True
+
+        self.abandon()
+        return False
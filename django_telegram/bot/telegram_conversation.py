@@ -1,27 +1,57 @@
+import copy
 import operator
 import re
+import threading
+import time
 from abc import ABCMeta
+from contextlib import contextmanager
 from datetime import timedelta
 from enum import Enum
-from functools import reduce
-from io import StringIO
+from functools import partial, reduce
+from string import Formatter
 
 
 import django
 from django.core.management import call_command
-from django.db.models import Q, Sum
+from django.db import connections, DEFAULT_DB_ALIAS, NotSupportedError
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Trunc
 from django.utils import timezone
-from telegram import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from telegram.ext import CommandHandler, ConversationHandler, Filters, MessageHandler
+from telegram import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import (
+    CallbackQueryHandler, CommandHandler, ConversationHandler, Filters, MessageHandler,
+    TypeHandler,
+)
 
+from django_telegram.bot.chat_state import ChatStateStore, conversation_namespace
+from django_telegram.bot.command_catalog import CommandCatalog
 from django_telegram.bot.constants import (
-    BTN_CAPTION_BUILD_QUERY, BTN_CAPTION_CUSTOM_MGMT, BTN_CAPTION_USE_SAVED_FILTER,
-    COUNT, DAYS, HOURS, NO, SUM, WEEKS, YES,
+    BTN_CAPTION_BUILD_QUERY, BTN_CAPTION_CUSTOM_MGMT, BTN_CAPTION_PROFILE_QUERY,
+    BTN_CAPTION_REFRESH_NOW, BTN_CAPTION_USE_SAVED_FILTER, CACHED_REPLY_MARK,
+    COMMAND_OUTPUT_LIMIT, COUNT, DAYS, EXPORT, EXPORT_CHUNK_SIZE, EXPORT_CSV, HISTOGRAM,
+    HISTOGRAM_BUCKETS, HOURS, LIST_FIELDS, LIST_FORMAT, MATERIALIZED_REPLY_MARK, NO, SUM,
+    UI_MODE_INLINE, UI_MODE_REPLY, WEEKS, YES,
 )
 from django_telegram.bot.decorators.chat_context import chat_context
 from django_telegram.bot.decorators.log_args import log_args
+from django_telegram.bot.errors.invalid_filter import InvalidFilter
+from django_telegram.bot.errors.invalid_query import InvalidQuery
+from django_telegram.bot.errors.query_budget_exceeded import QueryBudgetExceeded
 from django_telegram.bot.errors.saved_filter_not_found import SavedFilterNotFound
-from django_telegram.bot.renderers.qs2md import render_as_list
+from django_telegram.bot.filter_compiler import FilterCompiler
+from django_telegram.bot.metrics import (
+    QUERY_SECONDS, REPLIES, REPLY_FAILED, REPLY_SENT, StatementTimer,
+)
+from django_telegram.bot.one_shot import parse_one_shot
+from django_telegram.bot.output_stream import StreamedOutput
+from django_telegram.bot.query_budget import run_with_budget, StatementRecorder
+from django_telegram.bot.renderers.qs2file import export_as_file
+from django_telegram.bot.renderers.qs2md import (
+    render_as_histogram, render_as_list, render_as_profile,
+)
+from django_telegram.bot.shared_state import SharedMapping
+from django_telegram.bot.ui import get_update_chat_id, get_update_text, inline_keyboard
 
 
 class TelegramConversation(object, metaclass=ABCMeta):
@@ -41,19 +71,36 @@ class TelegramConversation(object, metaclass=ABCMeta):
         BUILD_AGGREGATE = 9
         BUILD_AGGREGATE_SUM_PROPERTY = 10
         CUSTOM_MGMT_COMMAND_SELECT = 12
+        SAVED_FILTER_REFRESH = 13
+        BUILD_AGGREGATE_HISTOGRAM_BUCKET = 14
 
     def __init__(self, logger, model_datetime_property, suffix=None):
         if suffix and not re.match(self.SUFFIX_REGEXP, suffix):
             raise ValueError(f'Suffix does not match {self.SUFFIX_REGEXP}')
 
-        self.query_context = {}
         self.name = self.__class__.__name__.lower()
         self.logger = logger
         self.model = object
         self.suffix = suffix
         self.model_datetime_property = model_datetime_property
-        self._default_query_context()
+        self._recorder = threading.local()
         self.chat_id = None
+        self.chat_states = ChatStateStore()
+        self._default_query_context()
+        self.query_cache = None
+        self.command_pool = None
+        self.job_registry = None
+        self.command_catalog = None
+        self.persistence = None
+        self.shared_state = None
+        self.default_query_time_budget = None
+        self.default_database_alias = DEFAULT_DB_ALIAS
+        self.replica_lag_check = None
+        self.default_ui_mode = UI_MODE_REPLY
+        self.default_conversation_timeout = None
+        self.conversation_handler = None
+        self.dispatcher = None
+        self.materialized = {}
         if self.suffix:
             self.entrypoint = f'{self.__class__.__name__.lower()}_{self.suffix}'
             self.fallback = f'cancel_{self.suffix}'
@@ -67,8 +114,105 @@ class TelegramConversation(object, metaclass=ABCMeta):
     def set_fallback_name(self, fallback_name):
         self.fallback = fallback_name
 
+    def set_query_time_budget(self, budget):
+        self.default_query_time_budget = budget
+
+    @property
+    def query_time_budget(self):
+        return self.default_query_time_budget
+
+    def set_database_alias(self, alias, replica_lag_check=None):
+        self.default_database_alias = alias
+        self.replica_lag_check = replica_lag_check
+
+    @property
+    def database_alias(self):
+        return self.default_database_alias
+
+    @property
+    def query_database(self):
+        snapshot = self._query_snapshot
+        if snapshot is not None:
+            return snapshot['database']
+        if self.replica_lag_check:
+            return self.replica_lag_check.resolve(self.database_alias)
+        return self.database_alias
+
+    def set_ui_mode(self, ui_mode):
+        self.default_ui_mode = ui_mode
+
+    @property
+    def ui_mode(self):
+        return self.default_ui_mode
+
+    def set_command_pool(self, command_pool):
+        self.command_pool = command_pool
+
+    def set_job_registry(self, job_registry):
+        self.job_registry = job_registry
+
+    def set_query_cache(self, query_cache):
+        self.query_cache = query_cache
+        if query_cache:
+            query_cache.watch(self.model)
+
+    def set_dispatcher(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    def set_chat_state_store(self, store):
+        self.chat_states = store
+
+    def set_persistence(self, persistence):
+        self.persistence = persistence
+
+    def set_shared_state(self, shared_state):
+        self.shared_state = shared_state
+
+    @property
+    def _query_snapshot(self):
+        return getattr(self._recorder, 'snapshot', None)
+
+    @property
+    def chat_id(self):
+        snapshot = self._query_snapshot
+        if snapshot is not None:
+            return snapshot['chat_id']
+        return self._chat_id
+
+    @chat_id.setter
+    def chat_id(self, chat_id):
+        self._chat_id = chat_id
+
+    def _chat_state(self):
+        snapshot = self._query_snapshot
+        if snapshot is not None:
+            return snapshot['chat_state']
+        #  query context and flow message are kept per chat, so conversations
+        #  held in several chats at the same time do not share them
+        state = self.chat_states.get(self.chat_id)
+        if state is None:
+            state = {'query_context': self._new_query_context(), 'ui_message_id': None}
+            self.chat_states.set(self.chat_id, state)
+        return state
+
+    @property
+    def query_context(self):
+        return self._chat_state()['query_context']
+
+    @query_context.setter
+    def query_context(self, query_context):
+        self._chat_state()['query_context'] = query_context
+
+    @property
+    def ui_message_id(self):
+        return self._chat_state()['ui_message_id']
+
     def _default_query_context(self):
-        self.query_context = {
+        self.query_context = self._new_query_context()
+
+    @staticmethod
+    def _new_query_context():
+        return {
             'mode': '',
             'period': {
                 'uom': '',
@@ -84,7 +228,97 @@ class TelegramConversation(object, metaclass=ABCMeta):
             'custom_command': '',
         }
 
+    def _render(self, data):
+        if type(data) in [django.db.models.query.QuerySet, list]:
+            return render_as_list(data, self.list_format)
+        return f'``` {data} ```'
+
     def _reply(self, update, data, keyboard=None):
+        return self._reply_rendered(update, self._render(data), keyboard)
+
+    def _reply_rendered(self, update, text, keyboard=None):
+        replies = getattr(self._recorder, 'replies', None)
+        if replies is not None and not keyboard:
+            replies.append(text)
+        if update:
+            return self._send(update, text, keyboard)
+        return None
+
+    @contextmanager
+    def _record_replies(self):
+        self._recorder.replies = []
+        try:
+            yield self._recorder.replies
+        finally:
+            self._recorder.replies = None
+
+    @property
+    def _query_cancelled(self):
+        cancelled = getattr(self._recorder, 'cancelled', None)
+        return cancelled is not None and cancelled.is_set()
+
+    def _prompt(self, update, data):
+        if self.ui_mode == UI_MODE_INLINE:
+            self._edit_flow_message(update, self._render(data))
+        else:
+            self._reply(update, data)
+
+    def set_ui_message_id(self, message_id):
+        self._chat_state()['ui_message_id'] = message_id
+
+    def _edit_flow_message(self, update, text, keyboard=None):
+        reply_markup = inline_keyboard(keyboard) if keyboard else None
+        if not self.ui_message_id:
+            message = update.effective_message.reply_text(
+                text,
+                parse_mode='markdown',
+                reply_markup=reply_markup,
+                api_kwargs={'chat_id': self.chat_id},
+            )
+            self.set_ui_message_id(message.message_id)
+            return message
+
+        try:
+            return update.effective_message.bot.edit_message_text(
+                text,
+                chat_id=self.chat_id,
+                message_id=self.ui_message_id,
+                parse_mode='markdown',
+                reply_markup=reply_markup,
+            )
+        except BadRequest as e:
+            #  the same step shown twice, i.e. after an invalid input
+            if 'not modified' not in str(e):
+                raise
+            return None
+
+    def _send(self, update, text, keyboard=None):
+        if self._query_cancelled:
+            return None
+
+        return self._count_reply(self._send_message, update, text, keyboard)
+
+    @staticmethod
+    def _count_reply(send, *args, **kwargs):
+        try:
+            message = send(*args, **kwargs)
+        except TelegramError:
+            REPLIES.inc(status=REPLY_FAILED)
+            raise
+        REPLIES.inc(status=REPLY_SENT)
+        return message
+
+    def _send_message(self, update, text, keyboard=None):
+        if keyboard and self.ui_mode == UI_MODE_INLINE:
+            return self._edit_flow_message(update, text, keyboard)
+
+        if not keyboard and self.ui_message_id:
+            #  inline steps and command progress edit one message in place, the
+            #  first result replaces it and any further result is a new message
+            message = self._edit_flow_message(update, text)
+            self.set_ui_message_id(None)
+            return message
+
         if keyboard:
             reply_keyboard = ReplyKeyboardMarkup(
                 keyboard=keyboard,
@@ -94,31 +328,81 @@ class TelegramConversation(object, metaclass=ABCMeta):
         else:
             reply_keyboard = ReplyKeyboardRemove(selective=True)
 
-        if type(data) in [django.db.models.query.QuerySet, list]:
-            update.message.reply_text(
-                render_as_list(data),
-                parse_mode='markdown',
-                reply_markup=reply_keyboard,
-                reply_to_message_id=update.message.message_id,
-                api_kwargs={'chat_id': self.chat_id},
-            )
-        else:
-            update.message.reply_text(
-                f'``` {data} ```',
-                parse_mode='markdown',
-                reply_markup=reply_keyboard,
-                reply_to_message_id=update.message.message_id,
-                api_kwargs={'chat_id': self.chat_id},
+        return update.effective_message.reply_text(
+            text,
+            parse_mode='markdown',
+            reply_markup=reply_keyboard,
+            reply_to_message_id=update.effective_message.message_id,
+            api_kwargs={'chat_id': self.chat_id},
+        )
+
+    @property
+    def list_fields(self):
+        return LIST_FIELDS
+
+    @property
+    def list_format(self):
+        return LIST_FORMAT
+
+    def _check_list_format(self):
+        formatter = Formatter()
+        format_fields = {
+            field for _text, field, _spec, _conv in formatter.parse(self.list_format) if field
+        }
+        unknown_fields = format_fields - set(self.list_fields)
+        if unknown_fields:
+            raise ValueError(
+                f'List format uses fields {sorted(unknown_fields)} missing in list fields',
             )
 
+    @property
+    def export_fields(self):
+        return self.list_fields
+
+    @property
+    def export_format(self):
+        return EXPORT_CSV
+
+    @property
+    def export_chunk_size(self):
+        return EXPORT_CHUNK_SIZE
+
+    @property
+    def exportable_filters(self):
+        return [
+            s_filter for s_filter in self.saved_filters
+            if callable(getattr(self, f'export_{s_filter}', None))
+        ]
+
+    @property
+    def filter_fields(self):
+        return []
+
     @property
     def saved_filter_regex(self):
-        return f'^({"|".join(self.saved_filters)})$'
+        return f'^({"|".join(self.saved_filters)})( {EXPORT})?$'
 
     @property
     def saved_filters(self):
         return []
 
+    @property
+    def materialized_filters(self):
+        refresh_intervals = {}
+        for s_filter in self.saved_filters:
+            call_method = getattr(self, f'get_{s_filter}', None)
+            refresh_every = getattr(call_method, 'refresh_every', None)
+            if refresh_every:
+                refresh_intervals[s_filter] = refresh_every
+        return refresh_intervals
+
+    @property
+    def command_description(self):
+        return f'{self.name} queries'
+
+    def set_command_catalog(self, catalog):
+        self.command_catalog = catalog
+
     @property
     def custom_commands_regex(self):
         return f'^({"|".join(self.custom_commands)})$'
@@ -167,9 +451,18 @@ class TelegramConversation(object, metaclass=ABCMeta):
     def has_aggregate(self):
         return self.query_context['aggregate']['type'] != ''
 
+    @property
+    def export_selected(self):
+        return self.aggregate_type == EXPORT
+
     def add_query_filter(self, key, value):
         self.query_context['filters'].append({key: value})
 
+    def add_query_filters(self, text):
+        for model_filter in FilterCompiler(self.model).compile(text):
+            for field, field_value in model_filter.items():
+                self.add_query_filter(field, field_value)
+
     @property
     def query_filters(self):
         return self.query_context['filters']
@@ -199,58 +492,342 @@ class TelegramConversation(object, metaclass=ABCMeta):
     def query_period_quantity(self):
         return int(self.query_context['period']['quantity'])
 
+    @property
+    def profile_selected(self):
+        return self.query_mode == BTN_CAPTION_PROFILE_QUERY
+
     @property
     def has_query_filters(self):
         return len(self.query_context['filters']) > 0
 
+    @property
+    def query_spec(self):
+        return {
+            'period': [self.query_period_uom, self.query_context['period']['quantity']],
+            'filters': self.query_filters,
+            'aggregate': self.query_context['aggregate'],
+            'saved': self.saved_filter,
+            'list': [list(self.list_fields), self.list_format],
+        }
+
     def set_chat_id(self, user_id):
+        if self.chat_id is None and user_id is not None and user_id not in self.chat_states:
+            #  a context prepared before any chat is bound is handed to the first one
+            state = self.chat_states.get(None)
+            self.chat_states.discard(None)
+            if state is not None:
+                self.chat_states.set(user_id, state)
         self.chat_id = user_id
+        if user_id is not None:
+            self._chat_state()
 
-    def _end_conversation(self, update):
-        self._reply(update, 'End of conversation')
+    def _release_chat(self):
+        self.chat_states.discard(self.chat_id)
         self.set_chat_id(None)
+
+    def _end_conversation(self, update):
+        if self.ui_mode != UI_MODE_INLINE or self.ui_message_id:
+            self._reply(update, 'End of conversation')
+        #  the chat state is kept for the replies of the last step, it is
+        #  reset by the next entry command or evicted once idle
+        return ConversationHandler.END
+
+    def set_conversation_timeout(self, timeout):
+        self.default_conversation_timeout = timeout
+
+    @property
+    def conversation_timeout(self):
+        return self.default_conversation_timeout
+
+    def timeout_conversation(self, update, context):
+        chat_id = get_update_chat_id(update)
+        if chat_id not in self.chat_states:
+            return ConversationHandler.END
+
+        self.set_chat_id(chat_id)
+        self._reply(update, f'Conversation timed out, send /{self.entrypoint} to start again')
+        self._release_chat()
+        return ConversationHandler.END
+
+    def expire_conversation(self, update):
+        chat_id = get_update_chat_id(update)
+        self.set_chat_id(chat_id)
+        self._reply(update, f'Conversation expired, send /{self.entrypoint} to start again')
+        self._release_chat()
         return ConversationHandler.END
 
+    def _end_evicted_conversations(self, bot, evicted):
+        conversation_handler = self.conversation_handler
+        if conversation_handler is None:
+            return
+
+        #  ends them the way the handler does when a callback returns END
+        evicted = set(evicted)
+        persistence = None
+        if conversation_handler.persistent and conversation_handler.name:
+            persistence = conversation_handler.persistence
+        with conversation_handler._conversations_lock:
+            keys = [key for key in conversation_handler.conversations if key[0] in evicted]
+            for key in keys:
+                del conversation_handler.conversations[key]
+                if persistence:
+                    persistence.update_conversation(conversation_handler.name, key, None)
+
+        for key in keys:
+            try:
+                bot.send_message(
+                    key[0], f'Conversation expired, send /{self.entrypoint} to start again',
+                )
+            except TelegramError as e:
+                self.logger.warning(f'Expiry notice to chat {key[0]} not sent: {str(e)}')
+
+    def _evict_chat_states_job(self, context):
+        evicted = self.chat_states.evict_idle()
+        if evicted:
+            self.logger.info(f'Evicted {len(evicted)} idle chat states of {self.entrypoint}')
+            #  the conversations held by these chats cannot go on without their state
+            self._end_evicted_conversations(context.bot, evicted)
+
+    def schedule_chat_state_eviction(self, job_queue, interval):
+        job_queue.run_repeating(
+            self._evict_chat_states_job,
+            interval=interval,
+            first=interval,
+            name=f'{self.entrypoint}:chat_states',
+        )
+
+    def _run_async(self, func, *args):
+        #  custom commands run on the dispatcher worker threads, so the bot
+        #  goes on handling updates meanwhile
+        if self.dispatcher is None:
+            return func(*args)
+        return self.dispatcher.run_async(func, *args)
+
     def execute_custom_command(self, update, command):
         if command not in self.custom_commands:
             self._reply(update, 'Invalid command')
             return False
 
-        out = StringIO()
+        job = None
+        if self.job_registry:
+            job, started = self.job_registry.start(command, self.chat_id)
+            if not job:
+                self._reply(update, f'{command} is already running on another bot instance')
+                return False
+
+            if not started:
+                self._attach_command_job(update, job)
+                return True
+
+        try:
+            message = self._send_command_message(update, f'Running {command}')
+        except Exception:
+            if job:
+                self.job_registry.finish(job, False)
+            raise
+        if self.command_pool:
+            self._submit_pooled_command(update, self.chat_id, message, command, job)
+        else:
+            self._run_async(self._run_command, update, self.chat_id, message, command, job)
+        return True
+
+    def _attach_command_job(self, update, job):
+        chat_id = self.chat_id
+        self._reply(
+            update,
+            f'{job.command} is already running for {int(job.duration.total_seconds())}s, '
+            'its result will be sent here',
+        )
+
+        def report(job):
+            link = f', result: {job.link}' if job.link else ''
+            try:
+                self._count_reply(
+                    update.effective_message.reply_text,
+                    self._render(f'{job.command} {job.status}{link}'),
+                    parse_mode='markdown',
+                    reply_to_message_id=update.effective_message.message_id,
+                    api_kwargs={'chat_id': chat_id},
+                )
+            except TelegramError as e:
+                self.logger.warning(f'Result of {job.command} not sent to {chat_id}: {str(e)}')
+
+        job.add_done_callback(report)
+
+    def _send_command_message(self, update, text):
+        #  progress and result of a command edit a message of its own, so the
+        #  conversation can go on (or end) while the command runs
+        return self._count_reply(
+            update.effective_message.reply_text,
+            self._render(text),
+            parse_mode='markdown',
+            reply_to_message_id=update.effective_message.message_id,
+            api_kwargs={'chat_id': self.chat_id},
+        )
+
+    def _edit_command_message(self, update, chat_id, message, text):
+        def edit():
+            try:
+                return update.effective_message.bot.edit_message_text(
+                    self._render(text),
+                    chat_id=chat_id,
+                    message_id=message.message_id,
+                    parse_mode='markdown',
+                )
+            except BadRequest as e:
+                if 'not modified' not in str(e):
+                    raise
+                return None
+
+        return self._count_reply(edit)
+
+    def _run_command(self, update, chat_id, message, command, job=None):
+        #  runs on a dispatcher worker thread with a snapshot of the chat, the
+        #  conversation handles other chats meanwhile
+        out = self._get_command_output(update, chat_id, message, command)
         try:
             call_command(command, stderr=out, stdout=out)
-            self._reply(update, f'Result {command}:\n{out.getvalue()}')
-            return True
         except Exception as e:
-            self._reply(update, f'Error {command}:\n{e}')
-            return False
+            return self._finish_command(
+                update, chat_id, message, command, job, out, f'Error {command}', False, e,
+            )
+        return self._finish_command(
+            update, chat_id, message, command, job, out, f'Result {command}', True,
+        )
+
+    def _submit_pooled_command(self, update, chat_id, message, command, job=None):
+        #  the pool threads wait for the subprocesses, the result is sent
+        #  once the command is done without holding a dispatcher thread
+        out = self._get_command_output(
+            update, chat_id, message, command, self.command_pool.output_limit,
+        )
+        future = self.command_pool.submit(command, out)
+        future.add_done_callback(
+            partial(self._pooled_command_done, update, chat_id, message, command, job, out),
+        )
+
+    def _pooled_command_done(self, update, chat_id, message, command, job, out, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            return self._finish_command(
+                update, chat_id, message, command, job, out, f'Error {command}', False, e,
+            )
+
+        if result.timed_out:
+            title = f'Timeout {command} after {self.command_pool.timeout} seconds'
+        elif result.returncode:
+            title = f'Error {command} (exit code {result.returncode})'
+        else:
+            title = f'Result {command} (exit code 0)'
+        success = not result.timed_out and not result.returncode
+        return self._finish_command(update, chat_id, message, command, job, out, title, success)
+
+    def _finish_command(self, update, chat_id, message, command, job, out, title, success,
+                        error=None):
+        reply = None
+        try:
+            reply = self._reply_command_output(
+                update, chat_id, message, command, title, out, error=error,
+            )
+        except Exception as e:
+            self.logger.error(f'Result of {command} not sent: {str(e)}')
+        finally:
+            if job:
+                self.job_registry.finish(job, success, getattr(reply, 'link', None))
+        return success
+
+    def _get_command_output(self, update, chat_id, message, command, limit=COMMAND_OUTPUT_LIMIT):
+        def show_progress(text):
+            try:
+                self._edit_command_message(update, chat_id, message, f'Running {command}:\n{text}')
+            except TelegramError as e:
+                self.logger.warning(f'Progress of {command} not shown: {str(e)}')
+
+        return StreamedOutput(show_progress, limit=limit)
+
+    def _reply_command_output(self, update, chat_id, message, command, title, out, error=None):
+        out.close()
+        with out.log:
+            if not out.overflow:
+                return self._edit_command_message(
+                    update, chat_id, message, f'{title}:\n{out.text}{error or ""}',
+                )
+
+            result = self._edit_command_message(
+                update,
+                chat_id,
+                message,
+                f'{title}, full output attached:\n{out.text}{error or ""}',
+            )
+            update.effective_message.reply_document(
+                document=out.log,
+                filename=f'{command}.log.gz',
+                reply_to_message_id=update.effective_message.message_id,
+                api_kwargs={'chat_id': chat_id},
+            )
+            return result
 
     @log_args
     def show_mode_select(self, update, context):
         self.set_chat_id(update.message.chat.id)
+        try:
+            return self._start_conversation(update)
+        finally:
+            self.chat_states.commit(self.chat_id)
+
+    def _start_conversation(self, update):
         self._default_query_context()
+        self.set_ui_message_id(None)
+        command_args = (update.message.text or '').split(None, 1)[1:]
+        if command_args:
+            return self.run_one_shot(update, command_args[0])
+
         reply_keyboard = [
             [KeyboardButton(text=BTN_CAPTION_BUILD_QUERY)],
+            [KeyboardButton(text=BTN_CAPTION_PROFILE_QUERY)],
             [KeyboardButton(text=BTN_CAPTION_USE_SAVED_FILTER)],
             [KeyboardButton(text=BTN_CAPTION_CUSTOM_MGMT)],
         ]
         self._reply(update, 'How do you want to proceed', reply_keyboard)
         return self.STATUS.MODE_SELECTOR
 
+    def run_one_shot(self, update, text):
+        try:
+            query = parse_one_shot(text)
+            if 'saved' in query:
+                s_filter = f'{query["saved"]} {EXPORT}' if query['export'] else query['saved']
+                if not re.match(self.saved_filter_regex, s_filter):
+                    raise InvalidQuery(f'Unknown saved filter "{s_filter}"')
+                return self._proceed_saved_filter(update, s_filter)
+
+            self.set_query_mode(BTN_CAPTION_BUILD_QUERY)
+            self.set_query_period_uom(query['period'][0])
+            self.set_query_period_quantity(query['period'][1])
+            if query['filters']:
+                self.add_query_filters(query['filters'])
+        except (InvalidQuery, InvalidFilter) as e:
+            self._reply(update, f'Invalid query: {str(e)}')
+            return self._end_conversation(update)
+
+        if query['aggregate']:
+            self.set_aggregate_type(query['aggregate'][0])
+            self.set_aggregate_property(query['aggregate'][1])
+        self.run_query(update)
+        return self._end_conversation(update)
+
     def show_list_of_commands(self, update, context):
         self.set_chat_id(update.message.chat.id)
-        classes = '\n - '.join([
-            f'{cls.__name__.lower()}_{self.suffix}'
-            for cls in TelegramConversation.__subclasses__()
-        ])
-        self._reply(update, f'Available commands:\n - {classes}')
+        catalog = self.command_catalog or CommandCatalog.from_conversations([self])
+        for text in catalog.messages:
+            self._reply_rendered(update, text)
         return ConversationHandler.END
 
     @log_args
     @chat_context
     def get_mode_show_mode_options(self, update, context):
-        self.set_query_mode(update.message.text)
-        if self.query_mode == BTN_CAPTION_BUILD_QUERY:
+        self.set_query_mode(get_update_text(update))
+        if self.query_mode in (BTN_CAPTION_BUILD_QUERY, BTN_CAPTION_PROFILE_QUERY):
             reply_keyboard = [
                 [
                     KeyboardButton(text=DAYS),
@@ -272,6 +849,11 @@ class TelegramConversation(object, metaclass=ABCMeta):
                         for i in self.saved_filters
                     ],
                 ]
+                if self.exportable_filters:
+                    reply_keyboard.append([
+                        KeyboardButton(text=f'{i} {EXPORT}')
+                        for i in self.exportable_filters
+                    ])
                 self._reply(update, 'Please select saved filter', reply_keyboard)
                 return self.STATUS.SAVED_FILTER_SELECT
 
@@ -292,21 +874,21 @@ class TelegramConversation(object, metaclass=ABCMeta):
     @log_args
     @chat_context
     def get_custom_command_and_execute(self, update, context):
-        self.set_custom_command(update.message.text)
+        self.set_custom_command(get_update_text(update))
         self.run_query(update)
         return self._end_conversation(update)
 
     @log_args
     @chat_context
     def get_period_uom_show_quantity(self, update, context):
-        self.set_query_period_uom(update.message.text)
-        self._reply(update, 'Please enter the period quantity')
+        self.set_query_period_uom(get_update_text(update))
+        self._prompt(update, 'Please enter the period quantity')
         return self.STATUS.BUILD_PERIOD_QUANTITY
 
     @log_args
     @chat_context
     def get_quantity_show_yes_no_filters(self, update, context):
-        self.set_query_period_quantity(update.message.text)
+        self.set_query_period_quantity(get_update_text(update))
         reply_keyboard = [
             [KeyboardButton(text=YES)],
             [KeyboardButton(text=NO)],
@@ -317,8 +899,8 @@ class TelegramConversation(object, metaclass=ABCMeta):
     @log_args
     @chat_context
     def get_yes_no_filters_and_proceed(self, update, context):
-        if update.message.text == YES:
-            self._reply(update, 'Provide model filters')
+        if get_update_text(update) == YES:
+            self._prompt(update, 'Provide model filters')
             return self.STATUS.BUILD_FILTERS
         else:
             reply_keyboard = [
@@ -331,14 +913,16 @@ class TelegramConversation(object, metaclass=ABCMeta):
     @log_args
     @chat_context
     def get_yes_no_aggregate_and_proceed(self, update, context):
-        if update.message.text == YES:
+        if get_update_text(update) == YES:
             reply_keyboard = [
                 [
                     KeyboardButton(text=COUNT),
                     KeyboardButton(text=SUM),
+                    KeyboardButton(text=HISTOGRAM),
+                    KeyboardButton(text=EXPORT),
                 ],
             ]
-            self._reply(update, 'Please select the aggregate', reply_keyboard)
+            self._reply(update, 'Please select the aggregate or export', reply_keyboard)
             return self.STATUS.BUILD_AGGREGATE
 
         else:
@@ -348,11 +932,11 @@ class TelegramConversation(object, metaclass=ABCMeta):
     @log_args
     @chat_context
     def get_filters_and_proceed(self, update, context):
-        filters = update.message.text
-        for model_filter in filters.split(','):
-            field = model_filter.split('=')[0]
-            field_value = model_filter.split('=')[1]
-            self.add_query_filter(field, field_value)
+        try:
+            self.add_query_filters(get_update_text(update))
+        except InvalidFilter as e:
+            self._prompt(update, f'Invalid filters: {str(e)}\nProvide model filters')
+            return self.STATUS.BUILD_FILTERS
 
         reply_keyboard = [
             [KeyboardButton(text=YES)],
@@ -364,110 +948,389 @@ class TelegramConversation(object, metaclass=ABCMeta):
     @log_args
     @chat_context
     def get_aggregate_property_and_proceed(self, update, context):
-        self.set_aggregate_property(update.message.text)
+        self.set_aggregate_property(get_update_text(update))
         self.run_query(update)
         return self._end_conversation(update)
 
     @log_args
     @chat_context
     def get_saved_filter_and_proceed(self, update, context):
-        self.set_saved_filter(update.message.text)
-        self.run_query(update)
+        return self._proceed_saved_filter(update, get_update_text(update))
+
+    def _proceed_saved_filter(self, update, s_filter):
+        if s_filter.endswith(f' {EXPORT}'):
+            s_filter = s_filter[:-len(EXPORT) - 1]
+            self.set_aggregate_type(EXPORT)
+        self.set_saved_filter(s_filter)
+        if self.export_selected or self.saved_filter not in self.materialized_filters:
+            self.run_query(update)
+            return self._end_conversation(update)
+
+        if self.saved_filter not in self.materialized:
+            self._run_within_budget(
+                update, self.refresh_materialized_filter, self.saved_filter, update,
+            )
+            return self._end_conversation(update)
+
+        materialized = self.materialized[self.saved_filter]
+        for text in materialized['replies']:
+            self._send(update, text)
+        reply_keyboard = [
+            [KeyboardButton(text=BTN_CAPTION_REFRESH_NOW)],
+            [KeyboardButton(text=NO)],
+        ]
+        self._send(
+            update,
+            MATERIALIZED_REPLY_MARK.format(
+                refreshed_at=materialized['refreshed_at'].strftime('%Y-%m-%d %H:%M:%S %Z'),
+            ),
+            reply_keyboard,
+        )
+        return self.STATUS.SAVED_FILTER_REFRESH
+
+    @log_args
+    @chat_context
+    def get_refresh_and_proceed(self, update, context):
+        if get_update_text(update) == BTN_CAPTION_REFRESH_NOW:
+            self._run_within_budget(
+                update, self.refresh_materialized_filter, self.saved_filter, update,
+            )
         return self._end_conversation(update)
 
+    def refresh_materialized_filter(self, s_filter, update=None):
+        call_method = self._get_saved_filter_method(s_filter)
+        refreshed_at = timezone.now()
+        with self._record_replies() as replies:
+            call_method(update)
+        self.materialized[s_filter] = {
+            'replies': replies,
+            'refreshed_at': refreshed_at,
+        }
+
+    def _refresh_materialized_filter_job(self, context):
+        s_filter = context.job.context
+        try:
+            self.refresh_materialized_filter(s_filter)
+            self.logger.info(f'Materialized filter {self.model.__name__} : {s_filter}')
+        except Exception as e:
+            self.logger.error(
+                f'Materialized filter {self.model.__name__} : {s_filter} failed: {str(e)}',
+            )
+
+    def schedule_materialized_filters(self, job_queue):
+        for s_filter, refresh_every in self.materialized_filters.items():
+            job_queue.run_repeating(
+                self._refresh_materialized_filter_job,
+                interval=refresh_every,
+                first=0,
+                context=s_filter,
+                name=f'{self.entrypoint}:{s_filter}',
+            )
+
     @log_args
     @chat_context
     def get_aggregate_and_proceed(self, update, context):
-        self.set_aggregate_type(update.message.text)
+        self.set_aggregate_type(get_update_text(update))
         if self.aggregate_type == COUNT:
             self.run_query(update)
             return ConversationHandler.END
 
         if self.aggregate_type == SUM:
-            self._reply(update, 'Provide property to aggregate')
+            self._prompt(update, 'Provide property to aggregate')
             return self.STATUS.BUILD_AGGREGATE_SUM_PROPERTY
 
+        if self.aggregate_type == HISTOGRAM:
+            reply_keyboard = [
+                [
+                    KeyboardButton(text=HOURS),
+                    KeyboardButton(text=DAYS),
+                    KeyboardButton(text=WEEKS),
+                ],
+            ]
+            self._reply(update, 'Please select the histogram bucket', reply_keyboard)
+            return self.STATUS.BUILD_AGGREGATE_HISTOGRAM_BUCKET
+
+        if self.aggregate_type == EXPORT:
+            self.run_query(update)
+            return self._end_conversation(update)
+
+        return self._end_conversation(update)
+
+    @log_args
+    @chat_context
+    def get_histogram_bucket_and_proceed(self, update, context):
+        self.set_aggregate_property(get_update_text(update))
+        self.run_query(update)
         return self._end_conversation(update)
 
     def _get_initial_queryset(self):
-        return self.model.objects.all()
+        return self.model.objects.using(self.query_database).all()
 
     def run_query(self, update):
-        if self.saved_filter_selected:
-            self.logger.info(f'Saved filter {self.model.__name__} : {self.saved_filter}')
-            call_method = getattr(self, f'get_{self.saved_filter}', None)
-            if not call_method:
-                raise SavedFilterNotFound(f'{self.saved_filter} not found')
-            call_method(update)
-            return
-
         if self.custom_command_selected:
             self.logger.info(f'Custom command {self.model.__name__} : {self.custom_command}')
             self.execute_custom_command(update, command=self.custom_command)
             return
 
-        self.logger.info(f'Lookup {self.query_context}')
+        self._run_within_budget(update, self._dispatch_query, update)
 
-        history_lookup = {
-            f'{self.model_datetime_property}__gt': timezone.now() - self.query_period_delta,
+    def _run_within_budget(self, update, func, *args):
+        cancelled = threading.Event()
+        #  the query may run in a worker which outlives its budget, it gets its
+        #  own copy of the chat and of the database picked for this query
+        snapshot = {
+            'chat_id': self.chat_id,
+            'chat_state': copy.deepcopy(self._chat_state()),
+            'database': self.query_database,
         }
-        queryset = self._get_initial_queryset().filter(**history_lookup)
 
-        if self.has_query_filters:
-            queryset = queryset.filter(
-                reduce(operator.and_, (Q(**d) for d in self.query_filters)),
+        def run_within_budget():
+            self._recorder.cancelled = cancelled
+            self._recorder.snapshot = snapshot
+            timer = StatementTimer()
+            try:
+                with connections[snapshot['database']].execute_wrapper(timer):
+                    func(*args)
+            finally:
+                self._recorder.cancelled = None
+                self._recorder.snapshot = None
+                QUERY_SECONDS.observe(timer.seconds, conversation=self.entrypoint)
+
+        try:
+            run_with_budget(run_within_budget, self.query_time_budget, snapshot['database'])
+        except QueryBudgetExceeded as e:
+            cancelled.set()
+            self.logger.error(
+                f'Lookup {self.model.__name__} : {self.query_spec} '
+                f'exceeded budget of {e.budget} seconds, SQL: {e.sql}',
             )
+            self._reply(update, f'Query exceeded budget of {e.budget} seconds')
+        finally:
+            #  the flow message may have changed, an abandoned worker's copy is dropped
+            if not cancelled.is_set():
+                self._chat_state().update(snapshot['chat_state'])
+
+    def _dispatch_query(self, update):
+        if self.profile_selected:
+            self.profile_query(update)
+            return
 
-        queryset = queryset.values('id', 'name', 'status')
+        if self.export_selected:
+            self.export_query(update)
+            return
 
-        self.logger.info(f'Resulting queryset: {len(queryset)}')
+        if not self.query_cache:
+            self._run_query(update)
+            return
+
+        cache_key = self.query_cache.make_key(self.model, self.query_spec)
+        replies = self.query_cache.get(cache_key)
+        if replies is not None:
+            self.logger.info(f'Cache hit {self.query_spec}')
+            for text in replies:
+                self._send(update, f'{text}\n{CACHED_REPLY_MARK}')
+            return
+
+        with self._record_replies() as replies:
+            self._run_query(update)
+        #  an empty or cancelled query is run again next time instead of being cached
+        if replies and not self._query_cancelled:
+            self.query_cache.set(cache_key, replies)
+
+    def profile_query(self, update):
+        recorder = StatementRecorder()
+        self._recorder.rows_fetched = 0
+        started = time.perf_counter()
+        try:
+            with connections[self.query_database].execute_wrapper(recorder):
+                if self.export_selected:
+                    self.export_query(update)
+                else:
+                    self._run_query(update)
+            wall_time = time.perf_counter() - started
+            rows = self._recorder.rows_fetched
+        finally:
+            self._recorder.rows_fetched = None
+
+        queryset = self._build_queryset()
+        try:
+            plan = queryset.explain()
+        except NotSupportedError as e:
+            plan = str(e)
+
+        self.logger.info(
+            f'Profile {self.model.__name__} : {self.query_spec} '
+            f'took {wall_time:.3f}s, {len(recorder.statements)} queries',
+        )
+        for text in render_as_profile(recorder.statements, plan, wall_time, rows):
+            self._reply_rendered(update, text)
+
+    def _count_fetched(self, rows):
+        if getattr(self._recorder, 'rows_fetched', None) is not None:
+            self._recorder.rows_fetched += rows
+
+    def export_query(self, update):
+        if self.saved_filter_selected:
+            call_method = getattr(self, f'export_{self.saved_filter}', None)
+            if not call_method:
+                raise SavedFilterNotFound(f'{self.saved_filter} export not found')
+            queryset = call_method()
+        else:
+            queryset = self._build_queryset()
+
+        self.logger.info(f'Export {self.model.__name__} : {self.query_spec}')
+        export_file, rows = export_as_file(
+            queryset,
+            self.export_fields,
+            self.export_format,
+            self.export_chunk_size,
+        )
+        self._count_fetched(rows)
+        with export_file:
+            if self._query_cancelled:
+                return
+
+            if not rows:
+                self._reply(update, self.EMPTY_RESULT)
+                return
+
+            update.effective_message.reply_document(
+                document=export_file,
+                filename=f'{self.model.__name__.lower()}.{self.export_format}.gz',
+                caption=f'Total: {rows}',
+                reply_to_message_id=update.effective_message.message_id,
+                api_kwargs={'chat_id': self.chat_id},
+            )
+
+    def _get_saved_filter_method(self, s_filter):
+        call_method = getattr(self, f'get_{s_filter}', None)
+        if not call_method:
+            raise SavedFilterNotFound(f'{s_filter} not found')
+        return call_method
+
+    def _run_query(self, update):
+        if self.saved_filter_selected:
+            self.logger.info(f'Saved filter {self.model.__name__} : {self.saved_filter}')
+            call_method = self._get_saved_filter_method(self.saved_filter)
+            call_method(update)
+            return
+
+        self.logger.info(f'Lookup {self.query_context}')
+
+        queryset = self._build_queryset()
 
         if self.has_aggregate:
             if self.aggregate_type == COUNT:
-                self._reply(update, len(queryset))
+                self._reply(update, queryset.count())
+                self._count_fetched(1)
                 return
 
             if self.aggregate_type == SUM:
                 queryset = queryset.aggregate(Sum(self.aggregate_property))
+                self._count_fetched(1)
                 self._reply(update, queryset[f'{self.aggregate_property}__sum'])
                 return
 
+            if self.aggregate_type == HISTOGRAM:
+                self._reply_histogram(update, queryset)
+                return
+
+        queryset = queryset.values(*self.list_fields)
+
+        self.logger.info(f'Resulting queryset: {len(queryset)}')
+        self._count_fetched(len(queryset))
+
         if queryset:
             self._reply(update, list(queryset))
         else:
             self._reply(update, self.EMPTY_RESULT)
 
+    def _reply_histogram(self, update, queryset):
+        kind, label_format = HISTOGRAM_BUCKETS[self.aggregate_property]
+        rows = queryset.order_by().annotate(
+            bucket=Trunc(self.model_datetime_property, kind),
+        ).values('bucket').annotate(total=Count('pk')).order_by('bucket')
+        counts = {row['bucket']: row['total'] for row in rows}
+        self._count_fetched(len(counts))
+
+        now = timezone.now()
+        if timezone.is_aware(now):
+            now = timezone.localtime(now)
+        step = timedelta(**{self.aggregate_property: 1})
+        bucket = self._truncate(now - self.query_period_delta, kind)
+        buckets = []
+        while bucket <= now:
+            buckets.append((bucket, counts.get(bucket, 0)))
+            bucket += step
+
+        self._reply_rendered(update, render_as_histogram(buckets, label_format))
+
+    @staticmethod
+    def _truncate(value, kind):
+        value = value.replace(minute=0, second=0, microsecond=0)
+        if kind == 'hour':
+            return value
+        value = value.replace(hour=0)
+        if kind == 'week':
+            value -= timedelta(days=value.weekday())
+        return value
+
+    def _build_queryset(self):
+        history_lookup = {
+            f'{self.model_datetime_property}__gt': timezone.now() - self.query_period_delta,
+        }
+        queryset = self._get_initial_queryset().filter(**history_lookup)
+
+        if self.has_query_filters:
+            queryset = queryset.filter(
+                reduce(operator.and_, (Q(**d) for d in self.query_filters)),
+            )
+
+        return queryset
+
     @log_args
     @chat_context
     def cancel(self, update, context):
         return self._end_conversation(update)
 
+    def _choice_handler(self, pattern, callback):
+        if self.ui_mode == UI_MODE_INLINE:
+            return CallbackQueryHandler(callback, pattern=pattern)
+        return MessageHandler(Filters.regex(pattern), callback)
+
     def get_conversation_handler(self):
+        self._check_list_format()
         modes = "|".join([
             BTN_CAPTION_BUILD_QUERY,
+            BTN_CAPTION_PROFILE_QUERY,
             BTN_CAPTION_USE_SAVED_FILTER,
             BTN_CAPTION_CUSTOM_MGMT,
         ])
         mode_sel_re = f'^({modes})$'
 
-        return ConversationHandler(
+        conversation_handler = ConversationHandler(
+            name=self.entrypoint,
+            persistent=self.persistence is not None,
+            conversation_timeout=self.conversation_timeout,
             entry_points=[
                 CommandHandler(self.entrypoint, self.show_mode_select),
                 CommandHandler('commands', self.show_list_of_commands),
             ],
             states={
                 self.STATUS.MODE_SELECTOR: [
-                    MessageHandler(Filters.regex(mode_sel_re), self.get_mode_show_mode_options),
+                    self._choice_handler(mode_sel_re, self.get_mode_show_mode_options),
                 ],
                 self.STATUS.CUSTOM_MGMT_COMMAND_SELECT: [
-                    MessageHandler(Filters.regex(
+                    self._choice_handler(
                         self.custom_commands_regex,
-                    ), self.get_custom_command_and_execute),
+                        self.get_custom_command_and_execute,
+                    ),
                 ],
                 self.STATUS.BUILD_PERIOD: [
-                    MessageHandler(Filters.regex(
+                    self._choice_handler(
                         f'^({DAYS}|{WEEKS}|{HOURS})$',
-                    ), self.get_period_uom_show_quantity),
+                        self.get_period_uom_show_quantity,
+                    ),
                 ],
                 self.STATUS.BUILD_PERIOD_QUANTITY: [
                     MessageHandler(
@@ -476,14 +1339,14 @@ class TelegramConversation(object, metaclass=ABCMeta):
                     ),
                 ],
                 self.STATUS.BUILD_FILTERS_YES_NO: [
-                    MessageHandler(
-                        Filters.regex(f'^({YES}|{NO})$'),
+                    self._choice_handler(
+                        f'^({YES}|{NO})$',
                         self.get_yes_no_filters_and_proceed,
                     ),
                 ],
                 self.STATUS.BUILD_AGGREGATE_YES_NO: [
-                    MessageHandler(
-                        Filters.regex(f'^({YES}|{NO})$'),
+                    self._choice_handler(
+                        f'^({YES}|{NO})$',
                         self.get_yes_no_aggregate_and_proceed,
                     ),
                 ],
@@ -491,21 +1354,48 @@ class TelegramConversation(object, metaclass=ABCMeta):
                     MessageHandler(Filters.text, self.get_filters_and_proceed),
                 ],
                 self.STATUS.BUILD_AGGREGATE: [
-                    MessageHandler(
-                        Filters.regex(f'^({COUNT}|{SUM})$'),
+                    self._choice_handler(
+                        f'^({COUNT}|{SUM}|{HISTOGRAM}|{EXPORT})$',
                         self.get_aggregate_and_proceed,
                     ),
                 ],
+                self.STATUS.BUILD_AGGREGATE_HISTOGRAM_BUCKET: [
+                    self._choice_handler(
+                        f'^({HOURS}|{DAYS}|{WEEKS})$',
+                        self.get_histogram_bucket_and_proceed,
+                    ),
+                ],
                 self.STATUS.BUILD_AGGREGATE_SUM_PROPERTY: [
                     MessageHandler(Filters.text, self.get_aggregate_property_and_proceed),
                 ],
                 self.STATUS.SAVED_FILTER_SELECT: [
-                    MessageHandler(
-                        Filters.regex(self.saved_filter_regex),
+                    self._choice_handler(
+                        self.saved_filter_regex,
                         self.get_saved_filter_and_proceed,
                     ),
                 ],
+                self.STATUS.SAVED_FILTER_REFRESH: [
+                    self._choice_handler(
+                        f'^({BTN_CAPTION_REFRESH_NOW}|{NO})$',
+                        self.get_refresh_and_proceed,
+                    ),
+                ],
 
             },
             fallbacks=[CommandHandler(self.fallback, self.cancel)],
         )
+        self.conversation_handler = conversation_handler
+        if self.conversation_timeout:
+            conversation_handler.states[ConversationHandler.TIMEOUT] = [
+                TypeHandler(Update, self.timeout_conversation),
+            ]
+        if self.shared_state:
+            conversation_handler.conversations = SharedMapping(
+                self.shared_state, conversation_namespace(self.entrypoint),
+            )
+        if self.persistence:
+            conversation_handler.persistence = self.persistence
+            conversation_handler.conversations = self.persistence.get_conversations(
+                self.entrypoint,
+            )
+        return conversation_handler
@@ -0,0 +1,20 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+def get_update_text(update):
+    if update.callback_query:
+        return update.callback_query.data
+    return update.message.text
+
+
+def get_update_chat_id(update):
+    return update.effective_message.chat.id
+
+
+def inline_keyboard(keyboard):
+    #  the caption is sent back as callback data, so handlers get the same
+    #  input whether the choice was typed, picked from a reply keyboard or inline
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text=button.text, callback_data=button.text) for button in row]
+        for row in keyboard
+    ])
@@ -0,0 +1,88 @@
+import hmac
+import ssl
+
+import tornado.web
+from telegram.error import TelegramError
+from telegram.ext import Updater
+from telegram.ext.utils.webhookhandler import WebhookAppClass, WebhookHandler, WebhookServer
+
+from django_telegram.bot.constants import WEBHOOK_SECRET_TOKEN_HEADER
+
+
+class SecretWebhookHandler(WebhookHandler):
+    def initialize(self, bot, update_queue, secret_token=None):
+        super().initialize(bot, update_queue)
+        self.secret_token = secret_token
+
+    def _validate_post(self):
+        super()._validate_post()
+        if self.secret_token is None:
+            return
+
+        received = self.request.headers.get(WEBHOOK_SECRET_TOKEN_HEADER, '')
+        if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+            raise tornado.web.HTTPError(403)
+
+
+class SecretWebhookApp(WebhookAppClass):
+    def __init__(self, webhook_path, bot, update_queue, secret_token=None):
+        self.shared_objects = {
+            'bot': bot,
+            'update_queue': update_queue,
+            'secret_token': secret_token,
+        }
+        tornado.web.Application.__init__(
+            self, [(rf'{webhook_path}/?', SecretWebhookHandler, self.shared_objects)],
+        )
+
+
+class WebhookUpdater(Updater):
+    #  python-telegram-bot 13 does not check the secret token of the received
+    #  updates and Bot.set_webhook only takes it from 13.13, the listener is
+    #  built here and the token is registered through api_kwargs on any 13.x
+
+    def __init__(self, *args, secret_token=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.secret_token = secret_token
+
+    def start_webhook(self, listen='127.0.0.1', port=80, url_path='', cert=None, key=None,
+                      webhook_url=None, allowed_updates=None, drop_pending_updates=None,
+                      ip_address=None, max_connections=40):
+        if not url_path.startswith('/'):
+            url_path = f'/{url_path}'
+        update_queue = super().start_webhook(
+            listen=listen, port=port, url_path=url_path, cert=cert, key=key,
+        )
+        if update_queue is None:
+            return None
+
+        certificate = open(cert, 'rb') if cert is not None else None
+        try:
+            self.bot.set_webhook(
+                url=webhook_url or self._gen_webhook_url(listen, port, url_path),
+                certificate=certificate,
+                max_connections=max_connections,
+                allowed_updates=allowed_updates,
+                ip_address=ip_address,
+                drop_pending_updates=drop_pending_updates,
+                api_kwargs={'secret_token': self.secret_token} if self.secret_token else None,
+            )
+        finally:
+            if certificate is not None:
+                certificate.close()
+        return update_queue
+
+    def _start_webhook(self, listen, port, url_path, cert, key, bootstrap_retries,
+                       drop_pending_updates, webhook_url, allowed_updates, ready=None,
+                       ip_address=None, max_connections=40):
+        ssl_ctx = None
+        if cert is not None and key is not None:
+            try:
+                ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+                ssl_ctx.load_cert_chain(cert, key)
+            except ssl.SSLError as e:
+                raise TelegramError('Invalid SSL Certificate') from e
+
+        app = SecretWebhookApp(url_path, self.bot, self.update_queue, self.secret_token)
+        self.httpd = WebhookServer(listen, port, app, ssl_ctx)
+        self.httpd.serve_forever(ready=ready)
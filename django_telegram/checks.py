@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Warning
+
+from django_telegram.bot.index_advisor import (
+    conversations_index_report, NOT_INDEXED, ROLE_HISTORY_LOOKUP, UNKNOWN_FIELD,
+)
+
+
+def check_lookup_indexes(app_configs=None, **kwargs):
+    telegram_settings = getattr(settings, 'TELEGRAM_BOT', None)
+    if not isinstance(telegram_settings, dict):
+        return []
+
+    errors = []
+    for conversation, report in conversations_index_report(telegram_settings):
+        model = conversation.model
+        for field_name, role, status in report:
+            if status == UNKNOWN_FIELD:
+                errors.append(Warning(
+                    f'{model._meta.label} has no field "{field_name}" used for {role}.',
+                    obj=conversation.__class__,
+                    id='django_telegram.W001',
+                ))
+            elif status == NOT_INDEXED:
+                errors.append(Warning(
+                    f'{model._meta.label}.{field_name} is used for {role} but is not indexed.',
+                    hint=(
+                        f'Add db_index=True to {field_name} or an index starting with it '
+                        'to the model Meta.indexes.'
+                    ),
+                    obj=conversation.__class__,
+                    id=(
+                        'django_telegram.W002' if role == ROLE_HISTORY_LOOKUP
+                        else 'django_telegram.W003'
+                    ),
+                ))
+    return errors
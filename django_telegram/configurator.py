@@ -1,17 +1,36 @@
+import re
 import warnings
 
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.module_loading import import_string
+from telegram import Update
 
 from django_telegram.bot.constants import (
-    SETTINGS_CHAT_ID, SETTINGS_COMMANDS_SUFFIX,
-    SETTINGS_CONVERSATIONS, SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY,
-    SETTINGS_MW, SETTINGS_MW_CONDITIONS,
-    SETTINGS_MW_CONDITIONS_FIELD, SETTINGS_MW_CONDITIONS_FIELD_VALUE,
-    SETTINGS_MW_CONDITIONS_FUNC, SETTINGS_MW_CONDITIONS_TYPE,
-    SETTINGS_MW_CONDITIONS_VALUE, SETTINGS_MW_MESSAGE,
-    SETTINGS_MW_RULES, SETTINGS_MW_TRIGGER_CODES,
-    SETTINGS_MW_VIEW, SETTINGS_TOKEN,
+    CHAT_STATE_DEFAULT_IDLE_TIMEOUT, PERSISTENCE_DJANGO, PERSISTENCE_SQLITE, SETTINGS_CHAT_ID,
+    SETTINGS_CHAT_STATE, SETTINGS_CHAT_STATE_IDLE_TIMEOUT, SETTINGS_CHAT_STATE_MAX_ENTRIES,
+    SETTINGS_CHAT_STATE_SWEEP_INTERVAL, SETTINGS_COMMAND_LOCK, SETTINGS_COMMAND_LOCK_ALIAS,
+    SETTINGS_COMMAND_LOCK_TTL, SETTINGS_COMMAND_POOL, SETTINGS_COMMAND_POOL_MEMORY_LIMIT,
+    SETTINGS_COMMAND_POOL_OUTPUT_LIMIT, SETTINGS_COMMAND_POOL_TIMEOUT,
+    SETTINGS_COMMAND_POOL_WORKERS, SETTINGS_COMMANDS_SUFFIX, SETTINGS_CONVERSATION_TIMEOUT,
+    SETTINGS_CONVERSATIONS, SETTINGS_DATABASE_ALIAS, SETTINGS_DATABASE_LAG_FUNCTION,
+    SETTINGS_DATABASE_MAX_LAG, SETTINGS_HISTORY_LOOKUP_MODEL_PROPERTY, SETTINGS_METRICS,
+    SETTINGS_METRICS_LISTEN, SETTINGS_METRICS_PORT, SETTINGS_MW, SETTINGS_MW_CONDITIONS,
+    SETTINGS_MW_CONDITIONS_FIELD, SETTINGS_MW_CONDITIONS_FIELD_VALUE, SETTINGS_MW_CONDITIONS_FUNC,
+    SETTINGS_MW_CONDITIONS_TYPE, SETTINGS_MW_CONDITIONS_VALUE, SETTINGS_MW_MESSAGE,
+    SETTINGS_MW_RULES, SETTINGS_MW_TRIGGER_CODES, SETTINGS_MW_VIEW, SETTINGS_PERSISTENCE,
+    SETTINGS_PERSISTENCE_ALIAS, SETTINGS_PERSISTENCE_BACKEND, SETTINGS_PERSISTENCE_FLUSH_INTERVAL,
+    SETTINGS_PERSISTENCE_PATH, SETTINGS_QUERY_CACHE, SETTINGS_QUERY_CACHE_ALIAS,
+    SETTINGS_QUERY_CACHE_MAX_ENTRIES, SETTINGS_QUERY_CACHE_TIMEOUT, SETTINGS_QUERY_TIME_BUDGET,
+    SETTINGS_SHARED_STATE, SETTINGS_SHARED_STATE_ALIAS, SETTINGS_SHARED_STATE_TIMEOUT,
+    SETTINGS_SHUTDOWN_TIMEOUT, SETTINGS_TOKEN, SETTINGS_UI_MODE, SETTINGS_UPDATER,
+    SETTINGS_UPDATER_ALLOWED_UPDATES, SETTINGS_UPDATER_CON_POOL_SIZE,
+    SETTINGS_UPDATER_DROP_PENDING_UPDATES, SETTINGS_UPDATER_POLL_INTERVAL,
+    SETTINGS_UPDATER_READ_TIMEOUT, SETTINGS_UPDATER_TIMEOUT, SETTINGS_UPDATER_WORKERS,
+    SETTINGS_WEBHOOK, SETTINGS_WEBHOOK_CERT, SETTINGS_WEBHOOK_KEY, SETTINGS_WEBHOOK_LISTEN,
+    SETTINGS_WEBHOOK_MAX_CONNECTIONS, SETTINGS_WEBHOOK_PORT, SETTINGS_WEBHOOK_SECRET_TOKEN,
+    SETTINGS_WEBHOOK_URL, SETTINGS_WEBHOOK_URL_PATH, UI_MODE_INLINE, UI_MODE_REPLY,
+    UPDATER_CON_POOL_OVERHEAD, UPDATER_DEFAULT_WORKERS, WEBHOOK_MAX_CONNECTIONS_LIMIT,
+    WEBHOOK_SECRET_TOKEN_PATTERN,
 )
 
 
@@ -132,6 +151,395 @@ class TelegramBotConfigurator(object):
                     f'"{SETTINGS_MW}[{SETTINGS_MW_RULES}]" position "{index}" error: {str(err)}',
                 )
 
+    def _check_query_cache_settings(self):
+        if SETTINGS_QUERY_CACHE not in self.telegram_settings.keys():
+            return
+
+        cache_settings = self.telegram_settings[SETTINGS_QUERY_CACHE]
+        if not isinstance(cache_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_QUERY_CACHE}" object must be a dictionary.',
+            )
+
+        alias = cache_settings.get(SETTINGS_QUERY_CACHE_ALIAS, 'default')
+        if not isinstance(alias, str) or not alias:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_QUERY_CACHE}[{SETTINGS_QUERY_CACHE_ALIAS}]" must be a cache alias.',
+            )
+
+        for key in (SETTINGS_QUERY_CACHE_TIMEOUT, SETTINGS_QUERY_CACHE_MAX_ENTRIES):
+            value = cache_settings.get(key, 1)
+            if not isinstance(value, int) or value <= 0:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_QUERY_CACHE}[{key}]" must be a positive integer.',
+                )
+
+    def _check_query_time_budget(self):
+        budget = self.telegram_settings.get(SETTINGS_QUERY_TIME_BUDGET)
+        if budget is None:
+            return
+
+        if isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_QUERY_TIME_BUDGET}" must be a positive number of seconds.',
+            )
+
+    def _check_shutdown_timeout(self):
+        timeout = self.telegram_settings.get(SETTINGS_SHUTDOWN_TIMEOUT)
+        if timeout is None:
+            return
+
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_SHUTDOWN_TIMEOUT}" must be a positive number of seconds.',
+            )
+
+    def _check_metrics_settings(self):
+        if SETTINGS_METRICS not in self.telegram_settings.keys():
+            return
+
+        metrics_settings = self.telegram_settings[SETTINGS_METRICS]
+        if not isinstance(metrics_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_METRICS}" object must be a dictionary.',
+            )
+
+        listen = metrics_settings.get(SETTINGS_METRICS_LISTEN, 'default')
+        if not isinstance(listen, str) or not listen:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_METRICS}[{SETTINGS_METRICS_LISTEN}]" must be a non empty string.',
+            )
+
+        port = metrics_settings.get(SETTINGS_METRICS_PORT, 1)
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_METRICS}[{SETTINGS_METRICS_PORT}]" must be a port number.',
+            )
+
+    def _check_database_settings(self):
+        alias = self.telegram_settings.get(SETTINGS_DATABASE_ALIAS, 'default')
+        if not isinstance(alias, str) or not alias:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_DATABASE_ALIAS}" must be a database alias.',
+            )
+
+        max_lag = self.telegram_settings.get(SETTINGS_DATABASE_MAX_LAG)
+        if max_lag is None:
+            return
+
+        if isinstance(max_lag, bool) or not isinstance(max_lag, (int, float)) or max_lag <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_DATABASE_MAX_LAG}" must be a positive number of seconds.',
+            )
+
+        if SETTINGS_DATABASE_LAG_FUNCTION in self.telegram_settings.keys():
+            try:
+                import_string(self.telegram_settings[SETTINGS_DATABASE_LAG_FUNCTION])
+            except ImportError:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_DATABASE_LAG_FUNCTION}" function could not be found.',
+                )
+
+    def _check_command_pool_settings(self):
+        if SETTINGS_COMMAND_POOL not in self.telegram_settings.keys():
+            return
+
+        pool_settings = self.telegram_settings[SETTINGS_COMMAND_POOL]
+        if not isinstance(pool_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_COMMAND_POOL}" object must be a dictionary.',
+            )
+
+        for key in (
+            SETTINGS_COMMAND_POOL_WORKERS, SETTINGS_COMMAND_POOL_TIMEOUT,
+            SETTINGS_COMMAND_POOL_MEMORY_LIMIT, SETTINGS_COMMAND_POOL_OUTPUT_LIMIT,
+        ):
+            value = pool_settings.get(key, 1)
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_COMMAND_POOL}[{key}]" must be a positive integer.',
+                )
+
+    def _check_command_lock_settings(self):
+        if SETTINGS_COMMAND_LOCK not in self.telegram_settings.keys():
+            return
+
+        lock_settings = self.telegram_settings[SETTINGS_COMMAND_LOCK]
+        if not isinstance(lock_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_COMMAND_LOCK}" object must be a dictionary.',
+            )
+
+        alias = lock_settings.get(SETTINGS_COMMAND_LOCK_ALIAS, 'default')
+        if not isinstance(alias, str) or not alias:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_COMMAND_LOCK}[{SETTINGS_COMMAND_LOCK_ALIAS}]" must be a cache alias.',
+            )
+
+        ttl = lock_settings.get(SETTINGS_COMMAND_LOCK_TTL, 1)
+        if isinstance(ttl, bool) or not isinstance(ttl, int) or ttl <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_COMMAND_LOCK}[{SETTINGS_COMMAND_LOCK_TTL}]" '
+                'must be a positive integer.',
+            )
+
+    def _check_ui_mode(self):
+        ui_mode = self.telegram_settings.get(SETTINGS_UI_MODE, UI_MODE_REPLY)
+        ui_modes = [UI_MODE_REPLY, UI_MODE_INLINE]
+        if ui_mode not in ui_modes:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UI_MODE}" must be one of "{ui_modes}"',
+            )
+
+    def _check_chat_state_settings(self):
+        timeout = self.telegram_settings.get(SETTINGS_CONVERSATION_TIMEOUT)
+        if timeout is not None and (
+            isinstance(timeout, bool) or not isinstance(timeout, int) or timeout <= 0
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_CONVERSATION_TIMEOUT}" must be a positive number of seconds.',
+            )
+
+        state_settings = self.telegram_settings.get(SETTINGS_CHAT_STATE, {})
+        if not isinstance(state_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_CHAT_STATE}" object must be a dictionary.',
+            )
+
+        for key in (
+            SETTINGS_CHAT_STATE_MAX_ENTRIES, SETTINGS_CHAT_STATE_IDLE_TIMEOUT,
+            SETTINGS_CHAT_STATE_SWEEP_INTERVAL,
+        ):
+            value = state_settings.get(key, 1)
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_CHAT_STATE}[{key}]" must be a positive integer.',
+                )
+
+        #  idle chat states are evicted even while their conversation is still open
+        idle_timeout = state_settings.get(
+            SETTINGS_CHAT_STATE_IDLE_TIMEOUT, CHAT_STATE_DEFAULT_IDLE_TIMEOUT,
+        )
+        if timeout and idle_timeout < timeout:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_CHAT_STATE}[{SETTINGS_CHAT_STATE_IDLE_TIMEOUT}]" must not be '
+                f'shorter than "{SETTINGS_CONVERSATION_TIMEOUT}".',
+            )
+
+    def _check_persistence_settings(self):
+        if SETTINGS_PERSISTENCE not in self.telegram_settings.keys():
+            return
+
+        persistence_settings = self.telegram_settings[SETTINGS_PERSISTENCE]
+        if not isinstance(persistence_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_PERSISTENCE}" object must be a dictionary.',
+            )
+
+        backend = persistence_settings.get(SETTINGS_PERSISTENCE_BACKEND, PERSISTENCE_SQLITE)
+        if backend not in (PERSISTENCE_SQLITE, PERSISTENCE_DJANGO):
+            try:
+                import_string(backend)
+            except ImportError:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_PERSISTENCE}[{SETTINGS_PERSISTENCE_BACKEND}]" must be '
+                    f'"{PERSISTENCE_SQLITE}", "{PERSISTENCE_DJANGO}" '
+                    'or the FQDN of a backend class.',
+                )
+
+        for key in (SETTINGS_PERSISTENCE_PATH, SETTINGS_PERSISTENCE_ALIAS):
+            value = persistence_settings.get(key, 'default')
+            if not isinstance(value, str) or not value:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_PERSISTENCE}[{key}]" must be a non empty string.',
+                )
+
+        interval = persistence_settings.get(SETTINGS_PERSISTENCE_FLUSH_INTERVAL, 1)
+        if isinstance(interval, bool) or not isinstance(interval, int) or interval <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_PERSISTENCE}[{SETTINGS_PERSISTENCE_FLUSH_INTERVAL}]" '
+                'must be a positive integer.',
+            )
+
+    def _check_shared_state_settings(self):
+        if SETTINGS_SHARED_STATE not in self.telegram_settings.keys():
+            return
+
+        shared_settings = self.telegram_settings[SETTINGS_SHARED_STATE]
+        if not isinstance(shared_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_SHARED_STATE}" object must be a dictionary.',
+            )
+
+        alias = shared_settings.get(SETTINGS_SHARED_STATE_ALIAS, 'default')
+        if not isinstance(alias, str) or not alias:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_SHARED_STATE}[{SETTINGS_SHARED_STATE_ALIAS}]" must be a cache alias.',
+            )
+
+        timeout = shared_settings.get(SETTINGS_SHARED_STATE_TIMEOUT, 1)
+        if isinstance(timeout, bool) or not isinstance(timeout, int) or timeout <= 0:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_SHARED_STATE}[{SETTINGS_SHARED_STATE_TIMEOUT}]" '
+                'must be a positive integer.',
+            )
+
+        #  shared state outlives restarts already, and conversation timeouts are
+        #  jobs of the replica which got the last update, they would end
+        #  conversations carried on by another replica
+        for key in (SETTINGS_PERSISTENCE, SETTINGS_CONVERSATION_TIMEOUT):
+            if key in self.telegram_settings.keys():
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_SHARED_STATE}" can not be combined with "{key}".',
+                )
+
+    def _check_webhook_settings(self):
+        if SETTINGS_WEBHOOK not in self.telegram_settings.keys():
+            return
+
+        webhook_settings = self.telegram_settings[SETTINGS_WEBHOOK]
+        if not isinstance(webhook_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}" object must be a dictionary.',
+            )
+
+        url = webhook_settings.get(SETTINGS_WEBHOOK_URL)
+        if not isinstance(url, str) or not url.startswith('https://'):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_URL}]" must be an https URL.',
+            )
+
+        for key in (SETTINGS_WEBHOOK_LISTEN, SETTINGS_WEBHOOK_CERT, SETTINGS_WEBHOOK_KEY):
+            value = webhook_settings.get(key, 'default')
+            if not isinstance(value, str) or not value:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_WEBHOOK}[{key}]" must be a non empty string.',
+                )
+
+        if not isinstance(webhook_settings.get(SETTINGS_WEBHOOK_URL_PATH, ''), str):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_URL_PATH}]" must be a string.',
+            )
+
+        if SETTINGS_WEBHOOK_KEY in webhook_settings and (
+            SETTINGS_WEBHOOK_CERT not in webhook_settings
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_KEY}]" requires '
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_CERT}]".',
+            )
+
+        self._check_webhook_limits(webhook_settings)
+
+    def _check_webhook_limits(self, webhook_settings):
+        port = webhook_settings.get(SETTINGS_WEBHOOK_PORT, 1)
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_PORT}]" must be a port number.',
+            )
+
+        connections = webhook_settings.get(SETTINGS_WEBHOOK_MAX_CONNECTIONS, 1)
+        if isinstance(connections, bool) or not isinstance(connections, int) or not (
+            0 < connections <= WEBHOOK_MAX_CONNECTIONS_LIMIT
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_MAX_CONNECTIONS}]" must be an integer '
+                f'between 1 and {WEBHOOK_MAX_CONNECTIONS_LIMIT}.',
+            )
+
+        secret_token = webhook_settings.get(SETTINGS_WEBHOOK_SECRET_TOKEN, 'default')
+        if not isinstance(secret_token, str) or not re.match(
+            WEBHOOK_SECRET_TOKEN_PATTERN, secret_token,
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_WEBHOOK}[{SETTINGS_WEBHOOK_SECRET_TOKEN}]" must be 1-256 characters, '
+                'only letters, digits, "_" and "-" are allowed.',
+            )
+
+    def _check_updater_settings(self):
+        if SETTINGS_UPDATER not in self.telegram_settings.keys():
+            return
+
+        updater_settings = self.telegram_settings[SETTINGS_UPDATER]
+        if not isinstance(updater_settings, dict):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UPDATER}" object must be a dictionary.',
+            )
+
+        for key in (SETTINGS_UPDATER_WORKERS, SETTINGS_UPDATER_CON_POOL_SIZE):
+            value = updater_settings.get(key, 1)
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_UPDATER}[{key}]" must be a positive integer.',
+                )
+
+        #  each worker running a custom command holds a connection while replying,
+        #  the dispatcher, the updater, the job queue and the startup calls need a few more
+        workers = updater_settings.get(SETTINGS_UPDATER_WORKERS, UPDATER_DEFAULT_WORKERS)
+        pool_size = updater_settings.get(SETTINGS_UPDATER_CON_POOL_SIZE)
+        if pool_size is not None and pool_size < workers + UPDATER_CON_POOL_OVERHEAD:
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_CON_POOL_SIZE}]" must be at least '
+                f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_WORKERS}]" + {UPDATER_CON_POOL_OVERHEAD}.',
+            )
+
+        if not isinstance(updater_settings.get(SETTINGS_UPDATER_DROP_PENDING_UPDATES, False), bool):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_DROP_PENDING_UPDATES}]" must be a boolean.',
+            )
+
+        self._check_updater_timeouts(updater_settings)
+        self._check_updater_allowed_updates(updater_settings)
+
+    def _check_updater_timeouts(self, updater_settings):
+        read_timeout = updater_settings.get(SETTINGS_UPDATER_READ_TIMEOUT, 1)
+        if isinstance(read_timeout, bool) or not isinstance(read_timeout, (int, float)) or (
+            read_timeout <= 0
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_READ_TIMEOUT}]" '
+                'must be a positive number of seconds.',
+            )
+
+        for key in (SETTINGS_UPDATER_POLL_INTERVAL, SETTINGS_UPDATER_TIMEOUT):
+            if key not in updater_settings:
+                continue
+
+            value = updater_settings[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_UPDATER}[{key}]" must be a number of seconds.',
+                )
+            if SETTINGS_WEBHOOK in self.telegram_settings.keys():
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_UPDATER}[{key}]" only applies to polling, '
+                    f'it can not be combined with "{SETTINGS_WEBHOOK}".',
+                )
+
+    def _check_updater_allowed_updates(self, updater_settings):
+        allowed_updates = updater_settings.get(SETTINGS_UPDATER_ALLOWED_UPDATES)
+        if allowed_updates is None:
+            return
+
+        if not isinstance(allowed_updates, list) or any(
+            update_type not in Update.ALL_TYPES for update_type in allowed_updates
+        ):
+            raise ImproperlyConfigured(
+                f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_ALLOWED_UPDATES}]" must be a list of '
+                f'update types from "{Update.ALL_TYPES}".',
+            )
+
+        #  conversations are driven by messages, and by button presses in inline mode
+        required = [Update.MESSAGE]
+        if self.telegram_settings.get(SETTINGS_UI_MODE) == UI_MODE_INLINE:
+            required.append(Update.CALLBACK_QUERY)
+        for update_type in required:
+            if update_type not in allowed_updates:
+                raise ImproperlyConfigured(
+                    f'"{SETTINGS_UPDATER}[{SETTINGS_UPDATER_ALLOWED_UPDATES}]" '
+                    f'must contain "{update_type}".',
+                )
+
     def run_check(self):
         settings_keys = self.telegram_settings.keys()
         if SETTINGS_TOKEN not in settings_keys:
@@ -170,3 +578,17 @@ class TelegramBotConfigurator(object):
 
         # middleware settings
         self._check_mw_settings()
+
+        self._check_query_cache_settings()
+        self._check_query_time_budget()
+        self._check_database_settings()
+        self._check_ui_mode()
+        self._check_command_pool_settings()
+        self._check_command_lock_settings()
+        self._check_chat_state_settings()
+        self._check_persistence_settings()
+        self._check_shared_state_settings()
+        self._check_webhook_settings()
+        self._check_updater_settings()
+        self._check_shutdown_timeout()
+        self._check_metrics_settings()
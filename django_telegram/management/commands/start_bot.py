@@ -1,4 +1,4 @@
-from django.core.management.base import BaseCommand  # pragma: no cover
+from django.core.management.base import BaseCommand, CommandError  # pragma: no cover
 
 from django_telegram.bot.bot_runner import BotRunner  # pragma: no cover
 
@@ -6,6 +6,17 @@ from django_telegram.bot.bot_runner import BotRunner  # pragma: no cover
 class Command(BaseCommand):  # pragma: no cover
     help = "Start Django Telegram bot."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes handling updates, chats are spread over them.',
+        )
+
     def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes must be a positive integer.')
+
         bot_runner = BotRunner()
-        bot_runner.handle()
+        bot_runner.handle(processes=options['processes'])
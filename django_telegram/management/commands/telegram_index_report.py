@@ -0,0 +1,25 @@
+from django.conf import settings  # pragma: no cover
+from django.core.management.base import BaseCommand  # pragma: no cover
+
+from django_telegram.bot.index_advisor import (  # pragma: no cover
+    conversations_index_report, INDEXED,
+)
+
+
+class Command(BaseCommand):  # pragma: no cover
+    help = "Report indexes of the fields looked up by Django Telegram bot conversations."
+
+    def handle(self, *args, **options):
+        report = conversations_index_report(settings.TELEGRAM_BOT)
+        if not report:
+            self.stdout.write('No conversation with a model found.')
+            return
+
+        for conversation, fields in report:
+            self.stdout.write(f'{conversation.model._meta.label} ({conversation.entrypoint})')
+            for field_name, role, status in fields:
+                line = f'  {field_name:<30} {role:<15} {status}'
+                if status == INDEXED:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    self.stdout.write(self.style.WARNING(line))
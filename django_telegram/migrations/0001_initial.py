@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StateEntry',
+            fields=[
+                ('id', models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False, verbose_name='ID',
+                )),
+                ('namespace', models.CharField(max_length=100)),
+                ('state_key', models.CharField(max_length=100)),
+                ('state_value', models.TextField()),
+            ],
+            options={
+                'db_table': 'django_telegram_state',
+                'unique_together': {('namespace', 'state_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import models
+
+from django_telegram.bot.constants import PERSISTENCE_TABLE
+
+
+#  conversation and chat states kept by the ``django`` persistence backend
+class StateEntry(models.Model):
+    namespace = models.CharField(max_length=100)
+    state_key = models.CharField(max_length=100)
+    state_value = models.TextField()
+
+    class Meta:
+        app_label = 'django_telegram'
+        db_table = PERSISTENCE_TABLE
+        unique_together = [('namespace', 'state_key')]
@@ -0,0 +1,9 @@
+from django.http import HttpResponse
+
+from django_telegram.bot.constants import METRICS_CONTENT_TYPE
+from django_telegram.bot.metrics import REGISTRY
+
+
+def metrics(request):
+    #  metrics recorded by the middleware of this process
+    return HttpResponse(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
@@ -3,4 +3,6 @@ INITIAL_QUERY_SET_METHOD = (
     '.TelegramConversation._get_initial_queryset'
 )
 TELEGRAM_REPLY_METHOD = 'telegram.Message.reply_text'
+TELEGRAM_REPLY_DOCUMENT_METHOD = 'telegram.Message.reply_document'
+EXPORT_AS_FILE = 'django_telegram.bot.telegram_conversation.export_as_file'
 DJANGO_CALL_COMMAND = 'django_telegram.bot.telegram_conversation.call_command'
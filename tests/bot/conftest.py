@@ -2,6 +2,7 @@ import django
 import pytest
 from django.conf import settings
 
+from django_telegram.bot.decorators.materialized import materialized
 from django_telegram.bot.telegram_conversation import TelegramConversation
 
 settings.configure()
@@ -64,6 +65,11 @@ class FakeModel(f.FakeModel):
     )
 
 
+class FakeRun(f.FakeModel):
+    model = f.models.ForeignKey(FakeModel, f.models.CASCADE, related_name='runs')
+    duration = f.models.IntegerField()
+
+
 class ConvTest(TelegramConversation):
     def __init__(self, logger, model_datetime_property, suffix=None):
         super().__init__(logger, model_datetime_property, suffix=suffix)
@@ -86,3 +92,37 @@ class ConvTestFiltersCommands(TelegramConversation):
     @property
     def custom_commands(self):
         return ['xx']
+
+
+class ConvTestMaterialized(TelegramConversation):
+    def __init__(self, logger, model_datetime_property, suffix=None):
+        super().__init__(logger, model_datetime_property, suffix=suffix)
+        self.name = 'test'
+        self.model = None
+        self.executions = 0
+
+    @property
+    def saved_filters(self):
+        return [
+            'count',
+            'live',
+        ]
+
+    @materialized(refresh_every=600)
+    def get_count(self, update):
+        self.executions += 1
+        self._reply(update, self.executions)
+
+    def get_live(self, update):
+        self._reply(update, 'live')
+
+
+class ConvTestIndexed(TelegramConversation):
+    def __init__(self, logger, model_datetime_property, suffix=None):
+        super().__init__(logger, model_datetime_property, suffix=suffix)
+        self.name = 'test'
+        self.model = FakeModel
+
+    @property
+    def filter_fields(self):
+        return ['status__in', 'created_at', 'unknown']
@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import pytest
+
+from django_telegram.bot.renderers.qs2file import export_as_file
+
+
+class FakeQuerySet(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.fields = None
+        self.chunk_size = None
+
+    def values(self, *fields):
+        self.fields = fields
+        return self
+
+    def iterator(self, chunk_size=None):
+        self.chunk_size = chunk_size
+        for row in self.rows:
+            yield {field: row[field] for field in self.fields}
+
+
+ROWS = [
+    {'id': 1, 'name': 'first', 'status': 'pending'},
+    {'id': 2, 'name': 'second', 'status': 'failed'},
+]
+
+
+def test_export_as_csv():
+    queryset = FakeQuerySet(ROWS)
+    export_file, rows = export_as_file(queryset, ['id', 'name'], 'csv', 10)
+
+    with export_file:
+        data = gzip.decompress(export_file.read()).decode('utf-8')
+
+    assert rows == 2
+    assert queryset.chunk_size == 10
+    assert data == 'id,name\r\n1,first\r\n2,second\r\n'
+
+
+def test_export_as_jsonl():
+    export_file, rows = export_as_file(FakeQuerySet(ROWS), ['id', 'status'], 'jsonl')
+
+    with export_file:
+        data = gzip.decompress(export_file.read()).decode('utf-8')
+
+    assert rows == 2
+    assert [json.loads(line) for line in data.splitlines()] == [
+        {'id': 1, 'status': 'pending'},
+        {'id': 2, 'status': 'failed'},
+    ]
+
+
+def test_export_unknown_format():
+    with pytest.raises(ValueError):
+        export_as_file(FakeQuerySet(ROWS), ['id'], 'xml')
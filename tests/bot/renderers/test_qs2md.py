@@ -1,4 +1,12 @@
-from django_telegram.bot.renderers.qs2md import render_as_list
+from datetime import datetime, timedelta
+
+from django_telegram.bot.command_catalog import CatalogEntry
+from django_telegram.bot.constants import MESSAGE_MAX_LENGTH
+from django_telegram.bot.jobs import Job
+from django_telegram.bot.renderers.qs2md import (
+    render_as_commands, render_as_histogram, render_as_jobs, render_as_list,
+    render_as_profile,
+)
 
 
 def test_render_as_list_less_10():
@@ -25,3 +33,122 @@ def test_render_as_list_more_10():
 
     assert data.startswith('``` Total: 14')
     assert data.endswith('... and 4 more ...```')
+
+
+def test_render_as_list_custom_format():
+    data = render_as_list([{
+        'pk': 1,
+        'title': 'title',
+    }], '- {pk}: {title}\n')
+
+    assert data == '``` Total: 1\n- 1: title\n ```'
+
+
+def test_render_as_histogram():
+    data = render_as_histogram([
+        (datetime(2026, 1, 1, 0), 0),
+        (datetime(2026, 1, 1, 1), 5),
+        (datetime(2026, 1, 1, 2), 10),
+    ], '%H:00')
+
+    assert data == (
+        '``` Total: 15\n'
+        '▁▄█\n'
+        '00:00 |  0\n'
+        '01:00 | ██████████ 5\n'
+        '02:00 | ████████████████████ 10 ```'
+    )
+
+
+def test_render_as_histogram_sparkline_only():
+    buckets = [(datetime(2026, 1, 1) + timedelta(hours=i), i) for i in range(100)]
+    data = render_as_histogram(buckets)
+
+    assert data.startswith('``` Total: 4950\nPeak: 99\n▁')
+    assert '|' not in data
+
+
+def test_render_as_histogram_long_period_downsampled():
+    #  hourly buckets over a year
+    buckets = [(datetime(2026, 1, 1) + timedelta(hours=i), 1) for i in range(24 * 365)]
+    data = render_as_histogram(buckets)
+
+    assert data.startswith('``` Total: 8760\nPeak: 18\n1 char = 18 buckets\n')
+    assert len(data) < MESSAGE_MAX_LENGTH
+    assert len(data.split('\n')[-1]) == 487 + len(' ```')
+
+
+def test_render_as_profile():
+    data = render_as_profile(['SELECT 1'], 'SCAN t', 0.0123, 5)
+
+    assert data == [
+        '``` Wall time: 0.012s\nRows fetched: 5\nDB queries: 1\n\n'
+        'SQL:\nSELECT 1\n\nPlan:\nSCAN t ```',
+    ]
+
+
+def test_render_as_profile_split():
+    statements = ['SELECT {0}'.format('x' * 30) for _ in range(5)]
+
+    data = render_as_profile(statements, 'SCAN t', 1, 5, limit=80)
+
+    assert len(data) > 1
+    assert all(len(text) <= 80 for text in data)
+    assert all(text.startswith('``` ') and text.endswith(' ```') for text in data)
+    assert sum(text.count('SELECT') for text in data) == 5
+
+
+def test_render_as_profile_long_line():
+    data = render_as_profile(['x' * 200], '', 1, 0, limit=80)
+
+    assert all(len(text) <= 80 for text in data)
+    assert ''.join(data).count('x') == 200
+
+
+def test_render_as_jobs_empty():
+    assert render_as_jobs([]) == '``` No jobs ```'
+
+
+def test_render_as_jobs():
+    running = Job('fix_data', 1)
+    finished = Job('migrate', 1)
+    finished.finished_at = finished.started_at + timedelta(seconds=75)
+    finished.success = True
+    finished.link = 'https://t.me/c/1/2'
+
+    data = render_as_jobs([running, finished])
+
+    assert data == (
+        '*Jobs*\n'
+        '- `fix_data` running 0s\n'
+        '- `migrate` succeeded 1m 15s [result](https://t.me/c/1/2)'
+    )
+
+
+def test_render_as_commands_empty():
+    assert render_as_commands([]) == ['``` No commands ```']
+
+
+def test_render_as_commands():
+    data = render_as_commands([
+        CatalogEntry('orders', 'orders queries', ('failed_24h',), ('fix_orders',)),
+        CatalogEntry('commands', 'List available commands', (), ()),
+    ])
+
+    assert data == [
+        '*Available commands*\n'
+        '- `/orders` orders queries\n'
+        '  saved filters: `failed_24h`\n'
+        '  custom commands: `fix_orders`\n'
+        '- `/commands` List available commands',
+    ]
+
+
+def test_render_as_commands_split():
+    entries = [CatalogEntry(f'command_{i}', 'x' * 50, (), ()) for i in range(10)]
+
+    data = render_as_commands(entries, limit=200)
+
+    assert len(data) > 1
+    assert all(len(chunk) <= 200 for chunk in data)
+    assert data[-1].endswith('`/command_9` ' + 'x' * 50)
@@ -16,3 +16,50 @@ def test_get_conversation_handler_not_found():
     ch = runner.get_conversation_handler('tests.bot.conftest.ConvTest2')
 
     assert ch is None
+
+
+def test_get_updater(mocker):
+    mocker.patch.dict(settings.TELEGRAM_BOT, {
+        'TOKEN': '123:abc',
+        'UPDATER': {'WORKERS': 8, 'CON_POOL_SIZE': 16, 'READ_TIMEOUT': 3},
+    })
+    updater = BotRunner().get_updater()
+
+    assert updater.dispatcher.workers == 8
+    assert updater.bot.request.con_pool_size == 16
+
+
+def test_start_updater_polling(mocker):
+    mocker.patch.dict(settings.TELEGRAM_BOT, {
+        'UPDATER': {'POLL_INTERVAL': 0.5, 'ALLOWED_UPDATES': ['message']},
+    })
+    updater = mocker.Mock()
+    BotRunner().start_updater(updater, mocker.Mock())
+
+    updater.start_polling.assert_called_once_with(
+        poll_interval=0.5,
+        timeout=10,
+        drop_pending_updates=False,
+        allowed_updates=['message'],
+    )
+
+
+def test_start_updater_webhook(mocker):
+    mocker.patch.dict(settings.TELEGRAM_BOT, {
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook', 'URL_PATH': 'hook'},
+        'UPDATER': {'DROP_PENDING_UPDATES': True},
+    })
+    updater = mocker.Mock()
+    BotRunner().start_updater(updater, mocker.Mock())
+
+    updater.start_webhook.assert_called_once_with(
+        listen='127.0.0.1',
+        port=8443,
+        url_path='hook',
+        cert=None,
+        key=None,
+        webhook_url='https://bot.example.com/hook',
+        max_connections=40,
+        drop_pending_updates=True,
+        allowed_updates=None,
+    )
@@ -0,0 +1,50 @@
+from django_telegram.bot.chat_state import ChatStateStore
+
+MONOTONIC = 'django_telegram.bot.chat_state.time.monotonic'
+
+
+def test_get_set():
+    store = ChatStateStore()
+    store.set(1, {'a': 1})
+
+    assert store.get(1) == {'a': 1}
+    assert store.get(2) is None
+    assert 1 in store
+    assert len(store) == 1
+
+
+def test_discard():
+    store = ChatStateStore()
+    store.set(1, {})
+    store.discard(1)
+    store.discard(2)
+
+    assert 1 not in store
+
+
+def test_max_entries_evicts_least_recently_used():
+    store = ChatStateStore(max_entries=2)
+    store.set(1, {})
+    store.set(2, {})
+    store.get(1)
+    store.set(3, {})
+
+    assert 1 in store
+    assert 2 not in store
+    assert 3 in store
+
+
+def test_evict_idle(mocker):
+    monotonic = mocker.patch(MONOTONIC, return_value=100)
+    store = ChatStateStore(idle_timeout=60)
+    store.set(1, {})
+    store.set(2, {})
+    monotonic.return_value = 150
+    store.get(1)
+
+    monotonic.return_value = 170
+    evicted = store.evict_idle()
+
+    assert evicted == [2]
+    assert 1 in store
+    assert 2 not in store
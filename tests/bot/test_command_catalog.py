@@ -0,0 +1,34 @@
+import logging
+
+from django_telegram.bot.command_catalog import (
+    CANCEL_DESCRIPTION, CommandCatalog, COMMANDS_DESCRIPTION,
+)
+from tests.bot.conftest import ConvTest, ConvTestFiltersCommands
+
+
+def test_catalog_from_conversations():
+    log = logging.getLogger()
+    first = ConvTest(log, 'created_at', suffix='dev')
+    second = ConvTestFiltersCommands(log, 'created_at', suffix='dev')
+
+    catalog = CommandCatalog.from_conversations([first, second], commands=[('jobs_dev', 'Jobs')])
+
+    assert [entry.command for entry in catalog.entries] == [
+        'convtest_dev', 'convtestfilterscommands_dev', 'cancel_dev', 'commands', 'jobs_dev',
+    ]
+    assert catalog.entries[1].saved_filters == ('avg_execution_24h',)
+    assert catalog.entries[1].custom_commands == ('xx',)
+    assert catalog.entries[2].description == CANCEL_DESCRIPTION
+    assert catalog.entries[3].description == COMMANDS_DESCRIPTION
+
+
+def test_catalog_bot_commands():
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.name = 'x' * 300
+
+    catalog = CommandCatalog.from_conversations([c])
+
+    assert catalog.bot_commands[0].command == 'convtest_dev'
+    assert len(catalog.bot_commands[0].description) == 256
+    assert catalog.messages[0].startswith('*Available commands*\n- `/convtest_dev` ')
@@ -0,0 +1,166 @@
+import resource
+import sys
+import threading
+import time
+
+import django
+
+from django_telegram.bot import launcher
+from django_telegram.bot.command_pool import CommandPool, TRUNCATED_MARK
+
+
+def _python(mocker, code):
+    mocker.patch.object(CommandPool, '_get_args', return_value=[sys.executable, '-c', code])
+
+
+def test_get_args():
+    assert CommandPool._get_args('migrate') == [sys.executable, '-m', 'django', 'migrate']
+
+
+def test_get_limited_args():
+    assert CommandPool()._get_limited_args('migrate') == [
+        sys.executable, '-m', 'django', 'migrate',
+    ]
+    assert CommandPool(memory_limit=2)._get_limited_args('migrate') == [
+        sys.executable, '-m', 'django_telegram.bot.launcher', str(2 * 1024 * 1024),
+        '-m', 'django', 'migrate',
+    ]
+
+
+def test_launcher(mocker):
+    setrlimit = mocker.patch('django_telegram.bot.launcher.resource.setrlimit')
+    argv = mocker.patch.object(sys, 'argv', [])
+    seen = []
+    mocker.patch('builtins.print', side_effect=seen.append)
+
+    launcher.main(['100', '-c', 'import sys; print(sys.argv)', 'arg'])
+
+    setrlimit.assert_called_once_with(resource.RLIMIT_AS, (100, 100))
+    assert seen == [['-c', 'arg']]
+    assert sys.argv is not argv
+
+
+def test_run_limited_django_command():
+    pool = CommandPool(workers=1, timeout=30, memory_limit=1024)
+
+    result = pool.run('version')
+
+    assert result.returncode == 0
+    assert result.output.strip() == django.get_version()
+
+
+def test_submit(mocker):
+    _python(mocker, 'print("done")')
+    pool = CommandPool(workers=1, timeout=30)
+
+    future = pool.submit('xx')
+
+    assert future.result(timeout=10).output == 'done\n'
+
+
+def test_run_ok(mocker):
+    _python(mocker, 'import sys; print("done"); sys.stderr.write("warn")')
+    pool = CommandPool(workers=1, timeout=30)
+
+    result = pool.run('xx')
+
+    assert result.command == 'xx'
+    assert result.returncode == 0
+    assert result.output == 'done\nwarn'
+    assert result.timed_out is False
+
+
+def test_run_exit_code(mocker):
+    _python(mocker, 'import sys; sys.exit(3)')
+    pool = CommandPool(workers=1, timeout=30)
+
+    assert pool.run('xx').returncode == 3
+
+
+def test_run_timeout(mocker):
+    _python(mocker, 'import sys, time; print("started", flush=True); time.sleep(10)')
+    pool = CommandPool(workers=1, timeout=0.5)
+
+    result = pool.run('xx')
+
+    assert result.timed_out is True
+    assert result.returncode is None
+
+
+def test_run_memory_limit(mocker):
+    _python(mocker, 'data = bytearray(512 * 1024 * 1024)')
+    pool = CommandPool(workers=1, timeout=30, memory_limit=256)
+
+    result = pool.run('xx')
+
+    assert result.returncode != 0
+    assert 'MemoryError' in result.output
+
+
+def test_run_output_truncated(mocker):
+    _python(mocker, 'print("a" * 100 + "end")')
+    pool = CommandPool(workers=1, timeout=30, output_limit=10)
+
+    result = pool.run('xx')
+
+    assert result.output == f'{TRUNCATED_MARK}aaaaaaend\n'
+
+
+def test_run_streams_output(mocker):
+    _python(mocker, 'print("one"); print("two")')
+    pool = CommandPool(workers=1, timeout=30)
+    output = mocker.MagicMock()
+
+    pool.run('xx', output)
+
+    assert [call[0][0] for call in output.write.call_args_list] == ['one\n', 'two\n']
+
+
+def test_terminate(mocker):
+    _python(mocker, 'import time; print("started", flush=True); time.sleep(10)')
+    pool = CommandPool(workers=1, timeout=30)
+    started = []
+
+    class Output(object):
+        def write(self, text):
+            started.append(text)
+
+    results = []
+    runner = threading.Thread(target=lambda: results.append(pool.run('xx', Output())))
+    runner.start()
+    while not started:
+        time.sleep(0.05)
+
+    assert pool.terminate() == ['xx']
+    runner.join(5)
+    assert results[0].returncode != 0
+    assert pool.terminate() == []
+
+
+def test_queued(mocker):
+    _python(mocker, 'import time; print("started", flush=True); time.sleep(10)')
+    pool = CommandPool(workers=1, timeout=30)
+    started = []
+
+    class Output(object):
+        def write(self, text):
+            started.append(text)
+
+    runners = [
+        threading.Thread(target=pool.run, args=(command, Output())) for command in ('xx', 'yy')
+    ]
+    runners[0].start()
+    while not started:
+        time.sleep(0.05)
+    runners[1].start()
+    while not pool.queued:
+        time.sleep(0.05)
+
+    assert pool.queued == 1
+    assert pool.terminate() == ['xx']
+    while len(started) < 2:
+        time.sleep(0.05)
+    assert pool.queued == 0
+    assert pool.terminate() == ['yy']
+    for runner in runners:
+        runner.join(5)
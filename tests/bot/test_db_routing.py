@@ -0,0 +1,77 @@
+import logging
+
+from django_telegram.bot.db_routing import postgresql_replica_lag, ReplicaLagCheck
+
+
+def test_resolve_default_alias():
+    check = ReplicaLagCheck(5, lag_function=lambda alias: 100)
+
+    assert check.resolve('default') == 'default'
+
+
+def test_resolve_replica_in_sync():
+    check = ReplicaLagCheck(5, lag_function=lambda alias: 1)
+
+    assert check.resolve('replica') == 'replica'
+
+
+def test_resolve_replica_lag_unknown():
+    check = ReplicaLagCheck(5, lag_function=lambda alias: None)
+
+    assert check.resolve('replica') == 'replica'
+
+
+def test_resolve_replica_lagging(caplog):
+    check = ReplicaLagCheck(5, lag_function=lambda alias: 10, logger=logging.getLogger())
+
+    with caplog.at_level(logging.WARNING):
+        assert check.resolve('replica') == 'default'
+    assert 'Replica "replica" lags 10 seconds' in caplog.text
+
+
+def test_resolve_lag_check_error():
+    def fail(alias):
+        raise Exception('ERR')
+
+    check = ReplicaLagCheck(5, lag_function=fail, logger=logging.getLogger())
+
+    assert check.resolve('replica') == 'default'
+
+
+def test_resolve_lag_check_interval():
+    calls = []
+
+    def lag(alias):
+        calls.append(alias)
+        return 0
+
+    check = ReplicaLagCheck(5, lag_function=lag, check_interval=60)
+    check.resolve('replica')
+    check.resolve('replica')
+
+    assert calls == ['replica']
+
+
+def test_postgresql_replica_lag_other_vendor():
+    assert postgresql_replica_lag('default') is None
+
+
+def test_postgresql_replica_lag(mocker):
+    connection = mocker.MagicMock(vendor='postgresql')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = [2.5]
+    mocker.patch('django_telegram.bot.db_routing.connections', {'replica': connection})
+
+    assert postgresql_replica_lag('replica') == 2.5
+
+
+def test_postgresql_replica_lag_idle_primary(mocker):
+    connection = mocker.MagicMock(vendor='postgresql')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = [0]
+    mocker.patch('django_telegram.bot.db_routing.connections', {'replica': connection})
+
+    assert postgresql_replica_lag('replica') == 0
+    query = cursor.execute.call_args[0][0]
+    assert 'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0' in query
+    assert query.index('pg_last_wal_replay_lsn()') < query.index('pg_last_xact_replay_timestamp()')
@@ -0,0 +1,116 @@
+from datetime import date, datetime
+
+import pytest
+
+from django_telegram.bot.errors.invalid_filter import InvalidFilter
+from django_telegram.bot.filter_compiler import _model_fields, FilterCompiler, parse_filters
+from tests.bot.conftest import FakeModel, FakeRun
+
+
+def test_parse_filters():
+    assert parse_filters('status=failed, name="a, b=c",note=x=y') == [
+        ('status', 'failed'),
+        ('name', '"a, b=c"'),
+        ('note', 'x=y'),
+    ]
+
+
+def test_parse_filters_apostrophe():
+    assert parse_filters("name=O'Brien") == [('name', "O'Brien")]
+
+
+@pytest.mark.parametrize('text', ['', ' , ', 'status', '=failed', 'name="abc'])
+def test_parse_filters_invalid(text):
+    with pytest.raises(InvalidFilter):
+        parse_filters(text)
+
+
+def test_compile():
+    compiler = FilterCompiler(FakeModel)
+
+    filters = compiler.compile(
+        'status=failed,status__exact=ok,aggr_property__gte=5,status__isnull=no,'
+        'status__in=a|"b|c",created_at__range=2026-01-01|2026-02-01',
+    )
+
+    assert filters == [
+        {'status': 'failed'},
+        {'status': 'ok'},
+        {'aggr_property__gte': 5},
+        {'status__isnull': False},
+        {'status__in': ['a', 'b|c']},
+        {'created_at__range': [datetime(2026, 1, 1), datetime(2026, 2, 1)]},
+    ]
+
+
+def test_compile_pk():
+    compiler = FilterCompiler(FakeModel)
+
+    assert compiler.compile('pk=1,pk__in=2|3') == [{'pk': 1}, {'pk__in': [2, 3]}]
+
+
+@pytest.fixture
+def reverse_relation(mocker):
+    #  fake models aren't installed, so django doesn't list their reverse relations
+    fields = FakeModel._meta.get_fields() + (FakeRun._meta.get_field('model').remote_field,)
+    mocker.patch.object(FakeModel._meta, 'get_fields', return_value=fields)
+    _model_fields.cache_clear()
+    yield
+    _model_fields.cache_clear()
+
+
+def test_compile_relations(reverse_relation):
+    assert FilterCompiler(FakeModel).compile('runs__duration__gt=5,runs=3,runs__isnull=yes') == [
+        {'runs__duration__gt': 5},
+        {'runs': 3},
+        {'runs__isnull': True},
+    ]
+    assert FilterCompiler(FakeRun).compile('model__status=ok,model__isnull=no') == [
+        {'model__status': 'ok'},
+        {'model__isnull': False},
+    ]
+    with pytest.raises(InvalidFilter) as err:
+        FilterCompiler(FakeModel).compile('runs__duration=abc')
+    assert str(err.value).startswith('"abc" is not valid for runs__duration')
+
+
+def test_compile_transforms():
+    compiler = FilterCompiler(FakeModel)
+
+    filters = compiler.compile(
+        'created_at__year=2020,created_at__year__gte=2021,created_at__date=2026-01-02,'
+        'created_at__date__range=2026-01-01|2026-02-01',
+    )
+
+    assert filters == [
+        {'created_at__year': 2020},
+        {'created_at__year__gte': 2021},
+        {'created_at__date': date(2026, 1, 2)},
+        {'created_at__date__range': [date(2026, 1, 1), date(2026, 2, 1)]},
+    ]
+    assert type(filters[2]['created_at__date']) is date
+
+
+def test_compile_string_lookup_not_coerced():
+    compiler = FilterCompiler(FakeModel)
+
+    assert compiler.compile('aggr_property__regex=^1') == [{'aggr_property__regex': '^1'}]
+
+
+@pytest.mark.parametrize(('text', 'error'), [
+    ('statu=x', 'Unknown field "statu"'),
+    ('status__foo=x', 'Lookup "foo" is not supported by status'),
+    ('status__foo__bar=x', 'Unknown field or lookup "status__foo__bar"'),
+    ('aggr_property=abc', '"abc" is not valid for aggr_property'),
+    ('status__isnull=maybe', '"maybe" is not a boolean'),
+    ('created_at__range=2026-01-01', 'Range of created_at__range needs two values'),
+    ('created_at__year=abc', '"abc" is not valid for created_at__year'),
+    ('created_at__foo__gte=1', 'Unknown field or lookup "created_at__foo__gte"'),
+])
+def test_compile_invalid(text, error):
+    compiler = FilterCompiler(FakeModel)
+
+    with pytest.raises(InvalidFilter) as err:
+        compiler.compile(text)
+
+    assert str(err.value).startswith(error)
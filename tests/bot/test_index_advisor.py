@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from django.db.models import Index, Q, UniqueConstraint
+
+from django_telegram.bot.index_advisor import (
+    conversations_index_report, get_configured_conversations, get_indexed_fields,
+    index_report, INDEXED, NOT_INDEXED, ROLE_FILTER, ROLE_HISTORY_LOOKUP, UNKNOWN_FIELD,
+)
+from tests.bot.conftest import ConvTestIndexed, FakeModel
+
+SETTINGS = {
+    'CONVERSATIONS': [
+        'tests.bot.conftest.ConvTest',
+        'tests.bot.conftest.ConvTestIndexed',
+        'tests.bot.conftest.Unknown',
+    ],
+    'COMMANDS_SUFFIX': 'dev',
+    'HISTORY_LOOKUP_MODEL_PROPERTY': 'created_at',
+}
+
+
+def test_get_indexed_fields_fake_model():
+    indexed = get_indexed_fields(FakeModel)
+
+    assert 'created_at' in indexed
+    assert 'status' not in indexed
+
+
+def test_get_indexed_fields_meta():
+    field = SimpleNamespace(name='name', primary_key=False, unique=False, db_index=False)
+    model = SimpleNamespace(_meta=SimpleNamespace(
+        concrete_fields=[field],
+        indexes=[Index(fields=['-updated_at', 'status'], name='ix')],
+        index_together=[('kind', 'status')],
+        unique_together=[],
+        constraints=[
+            UniqueConstraint(fields=['code', 'status'], name='uq'),
+            UniqueConstraint(fields=['partial'], condition=Q(status='a'), name='uq_partial'),
+        ],
+    ))
+
+    assert get_indexed_fields(model) == {'updated_at', 'kind', 'code'}
+
+
+def test_index_report():
+    report = index_report(FakeModel, 'created_at', ['status__in', 'created_at', 'unknown'])
+
+    assert report == [
+        ('created_at', ROLE_HISTORY_LOOKUP, INDEXED),
+        ('status', ROLE_FILTER, NOT_INDEXED),
+        ('unknown', ROLE_FILTER, UNKNOWN_FIELD),
+    ]
+
+
+def test_get_configured_conversations():
+    conversations = list(get_configured_conversations(SETTINGS))
+
+    assert len(conversations) == 2
+    assert conversations[1].model_datetime_property == 'created_at'
+    assert conversations[1].suffix == 'dev'
+
+
+def test_conversations_index_report():
+    report = conversations_index_report(SETTINGS)
+
+    assert len(report) == 1
+    assert isinstance(report[0][0], ConvTestIndexed)
+    assert report[0][1][1] == ('status', ROLE_FILTER, NOT_INDEXED)
@@ -0,0 +1,83 @@
+import threading
+
+from django.core.cache import caches
+
+from django_telegram.bot.jobs import JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, JobRegistry
+
+
+def test_start_and_finish():
+    registry = JobRegistry(history=1)
+
+    job, started = registry.start('xx', 1)
+
+    assert started
+    assert job.status == JOB_RUNNING
+    assert registry.jobs == [job]
+
+    registry.finish(job, True, 'https://t.me/c/1/2')
+
+    assert job.status == JOB_SUCCEEDED
+    assert job.link == 'https://t.me/c/1/2'
+    assert job.wait(0)
+    assert registry.running == {}
+    assert registry.jobs == [job]
+
+    failed, _started = registry.start('xx', 1)
+    registry.finish(failed, False)
+
+    assert failed.status == JOB_FAILED
+    assert registry.jobs == [failed]
+
+
+def test_start_attaches_to_running_job():
+    registry = JobRegistry()
+
+    job, _started = registry.start('xx', 1)
+    attached, started = registry.start('xx', 2)
+
+    assert attached is job
+    assert not started
+
+
+def test_start_locked_by_other_instance():
+    caches['default'].clear()
+    registry = JobRegistry(lock_alias='default', lock_ttl=60)
+    other = JobRegistry(lock_alias='default', lock_ttl=60)
+
+    job, started = registry.start('xx', 1)
+    other_job, other_started = other.start('xx', 1)
+
+    assert started
+    assert other_job is None
+    assert not other_started
+
+    registry.finish(job, True)
+    other_job, other_started = other.start('xx', 1)
+
+    assert other_started
+    other.finish(other_job, True)
+
+
+def test_wait_for_running_job():
+    registry = JobRegistry()
+    job, _started = registry.start('xx', 1)
+
+    finisher = threading.Timer(0.05, registry.finish, args=(job, True))
+    finisher.start()
+
+    assert job.wait(5)
+    assert job.success is True
+
+
+def test_done_callback():
+    registry = JobRegistry()
+    job, _started = registry.start('xx', 1)
+    seen = []
+
+    job.add_done_callback(lambda done: seen.append(('attached', done.status)))
+    assert seen == []
+
+    registry.finish(job, True)
+    job.add_done_callback(lambda done: seen.append(('late', done.status)))
+
+    assert seen == [('attached', JOB_SUCCEEDED), ('late', JOB_SUCCEEDED)]
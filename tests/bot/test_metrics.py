@@ -0,0 +1,168 @@
+import socket
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import Mock
+
+import pytest
+
+from django_telegram.bot.metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, REGISTRY, REPLIES,
+    start_metrics_server, StatementTimer,
+)
+from django_telegram.views import metrics
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_counter():
+    counter = Counter('x_total', 'Things.', ['kind'])
+
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    counter.inc(kind='b"\n')
+
+    assert counter.values() == {('a',): 3, ('b"\n',): 1}
+    assert counter.render() == (
+        '# HELP x_total Things.\n'
+        '# TYPE x_total counter\n'
+        'x_total{kind="a"} 3\n'
+        'x_total{kind="b\\"\\n"} 1'
+    )
+
+
+def test_counter_adds_up_threads():
+    counter = Counter('x_total', 'Things.')
+
+    def record():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.values() == {(): 4000}
+
+
+def test_ended_threads_are_folded():
+    counter = Counter('x_total', 'Things.')
+    histogram = Histogram('x_seconds', 'Time.', buckets=(1,))
+
+    def record():
+        counter.inc()
+        histogram.observe(0.5)
+
+    for _ in range(100):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+
+    assert len(counter._shards._shards) < 5
+    assert len(histogram._shards._shards) < 5
+    assert counter.values() == {(): 100}
+    assert histogram.values() == {(): [100, 0, 50.0, 100]}
+
+
+def test_histogram():
+    histogram = Histogram('x_seconds', 'Time.', ['handler'], buckets=(0.1, 1))
+
+    histogram.observe(0.05, handler='a')
+    histogram.observe(0.5, handler='a')
+    histogram.observe(5, handler='a')
+
+    assert histogram.render() == (
+        '# HELP x_seconds Time.\n'
+        '# TYPE x_seconds histogram\n'
+        'x_seconds_bucket{handler="a",le="0.1"} 1\n'
+        'x_seconds_bucket{handler="a",le="1"} 2\n'
+        'x_seconds_bucket{handler="a",le="+Inf"} 3\n'
+        'x_seconds_sum{handler="a"} 5.55\n'
+        'x_seconds_count{handler="a"} 3'
+    )
+
+
+def test_histogram_time():
+    histogram = Histogram('x_seconds', 'Time.')
+
+    with histogram.time():
+        pass
+
+    assert histogram.values()[()][-1] == 1
+
+
+def test_gauge_skips_unsupported_functions():
+    gauge = Gauge('x_depth', 'Depth.', ['queue'])
+
+    def unsupported():
+        raise NotImplementedError
+
+    gauge.set_function(lambda: 3, queue='a')
+    gauge.set_function(unsupported, queue='b')
+
+    assert gauge.render() == '# HELP x_depth Depth.\n# TYPE x_depth gauge\nx_depth{queue="a"} 3'
+
+
+def test_gauge_skips_failing_functions(caplog):
+    gauge = Gauge('x_depth', 'Depth.', ['queue'])
+
+    def failing():
+        raise AttributeError('queued')
+
+    gauge.set_function(failing, queue='a')
+    gauge.set_function(lambda: 3, queue='b')
+
+    assert gauge.render() == '# HELP x_depth Depth.\n# TYPE x_depth gauge\nx_depth{queue="b"} 3'
+    assert 'Metric x_depth{queue="a"} failed: queued' in caplog.text
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    registry.register(Counter('a_total', 'A.')).inc()
+    registry.register(Counter('b_total', 'B.'))
+
+    assert registry.render() == (
+        '# HELP a_total A.\n# TYPE a_total counter\na_total 1\n'
+        '# HELP b_total B.\n# TYPE b_total counter\n'
+    )
+
+
+def test_statement_timer():
+    timer = StatementTimer()
+    execute = Mock(return_value='result')
+
+    assert timer(execute, 'SELECT 1', None, False, {}) == 'result'
+    execute.assert_called_once_with('SELECT 1', None, False, {})
+    assert timer.seconds > 0
+
+
+def test_metrics_server():
+    REPLIES.inc(status='sent')
+    port = _free_port()
+    server = start_metrics_server('127.0.0.1', port)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+            body = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/other')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert '# TYPE telegram_bot_replies_total counter' in body
+    assert 'telegram_bot_replies_total{status="sent"}' in body
+    assert err.value.code == 404
+
+
+def test_metrics_view():
+    response = metrics(Mock())
+
+    assert response['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    assert response.content.decode() == REGISTRY.render()
@@ -3,6 +3,9 @@ import logging
 from django.conf import settings
 from rest_framework.response import Response
 
+from django_telegram.bot.metrics import (
+    MIDDLEWARE_EVALUATIONS, MIDDLEWARE_SENDS, MIDDLEWARE_SUPPRESSIONS, MIDDLEWARE_TRIGGERS,
+)
 from django_telegram.bot.middleware import TelegramMiddleware
 
 SEND_MSG_F = 'django_telegram.bot.middleware.send_message'
@@ -472,3 +475,55 @@ def test_process_response_exception(django_request, mocker, caplog):
     assert (
         f'TelegramMiddleware rule {expected_config} finished with error: ERR'
     ) in caplog.records[0].message
+
+
+def test_process_response_records_metrics(django_request, mocker):
+    mocker.patch(SEND_MSG_F, side_effect=[True, False])
+
+    settings.TELEGRAM_BOT = {
+        'CONVERSATIONS': [
+            'tests.bot.conftest.ConvTest',
+        ],
+        'TOKEN': 'token',
+        'COMMANDS_SUFFIX': 'dev',
+        'HISTORY_LOOKUP_MODEL_PROPERTY': 'created_at',
+        'MIDDLEWARE': {
+            'CHAT_ID': 123,
+            'RULES': [{
+                'view': 'view',
+                'trigger_codes': [1, 2],
+                'message': 'msg',
+            }],
+        },
+    }
+    response = Response(
+        data={'field': 'value'},
+        headers={'Content-Type': 'application/json'},
+    )
+    response._is_rendered = True
+    response.content = '{"field":"value"}'
+    response.render()
+
+    def get_response(self):
+        return response
+
+    mw = TelegramMiddleware(get_response)
+    before = [
+        MIDDLEWARE_EVALUATIONS.values().get(('view',), 0),
+        MIDDLEWARE_TRIGGERS.values().get(('view',), 0),
+        MIDDLEWARE_SUPPRESSIONS.values().get(('view',), 0),
+        MIDDLEWARE_SENDS.values().get(('sent',), 0),
+        MIDDLEWARE_SENDS.values().get(('failed',), 0),
+    ]
+
+    for status_code in (1, 2, 5):
+        response.status_code = status_code
+        mw(django_request)
+
+    assert [
+        MIDDLEWARE_EVALUATIONS.values()[('view',)],
+        MIDDLEWARE_TRIGGERS.values()[('view',)],
+        MIDDLEWARE_SUPPRESSIONS.values()[('view',)],
+        MIDDLEWARE_SENDS.values()[('sent',)],
+        MIDDLEWARE_SENDS.values()[('failed',)],
+    ] == [value + change for value, change in zip(before, [3, 2, 1, 1, 1])]
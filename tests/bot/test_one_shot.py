@@ -0,0 +1,47 @@
+import pytest
+
+from django_telegram.bot.errors.invalid_query import InvalidQuery
+from django_telegram.bot.one_shot import parse_one_shot
+
+
+def test_parse_one_shot_saved():
+    assert parse_one_shot('saved:count') == {'saved': 'count', 'export': False}
+    assert parse_one_shot(' saved:count  export ') == {'saved': 'count', 'export': True}
+
+
+def test_parse_one_shot_period_only():
+    assert parse_one_shot('12h') == {
+        'period': ('hours', '12'),
+        'filters': '',
+        'aggregate': None,
+    }
+
+
+def test_parse_one_shot_full():
+    assert parse_one_shot('3d status=failed name="a b" count') == {
+        'period': ('days', '3'),
+        'filters': 'status=failed,name="a b"',
+        'aggregate': ('count', ''),
+    }
+
+
+@pytest.mark.parametrize(('text', 'aggregate'), [
+    ('2w sum:amount', ('sum', 'amount')),
+    ('2w histogram:days', ('histogram', 'days')),
+    ('2w export', ('export', '')),
+    ('2w status=sum', None),
+])
+def test_parse_one_shot_aggregates(text, aggregate):
+    assert parse_one_shot(text)['aggregate'] == aggregate
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    'saved:',
+    'saved:count now',
+    '3 days',
+    '3m count',
+])
+def test_parse_one_shot_invalid(text):
+    with pytest.raises(InvalidQuery):
+        parse_one_shot(text)
@@ -0,0 +1,48 @@
+import gzip
+
+from django_telegram.bot.output_stream import StreamedOutput, TRUNCATED_MARK
+
+
+def test_progress_line_buffered():
+    progress = []
+    out = StreamedOutput(progress.append, interval=0)
+
+    out.write('partial')
+    out.write(' line\n')
+    out.write('next\n')
+
+    assert progress == ['partial line\n', 'partial line\nnext\n']
+
+
+def test_progress_throttled():
+    progress = []
+    out = StreamedOutput(progress.append, interval=60)
+
+    out.write('first\n')
+    out.write('second\n')
+
+    assert progress == ['first\n']
+    assert out.text == 'first\nsecond\n'
+
+
+def test_overflow_keeps_tail_and_full_log():
+    out = StreamedOutput(lambda text: None, limit=10, interval=0)
+
+    out.write('0123456789\n')
+    out.write('abc\n')
+    out.close()
+
+    assert out.overflow
+    assert out.text == f'{TRUNCATED_MARK}56789\nabc\n'
+    with gzip.open(out.log, 'rt', encoding='utf-8') as log:
+        assert log.read() == '0123456789\nabc\n'
+
+
+def test_no_overflow():
+    out = StreamedOutput(lambda text: None, limit=10)
+
+    out.write('short\n')
+    out.close()
+
+    assert not out.overflow
+    assert out.text == 'short\n'
@@ -0,0 +1,223 @@
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from telegram import Chat, Message, Update
+from telegram.ext import ConversationHandler
+
+from django_telegram.bot.persistence import (
+    _decode_value, _encode_value, DjangoStateBackend, PersistentChatStateStore,
+    SQLiteStateBackend, StatePersistence,
+)
+from django_telegram.bot.router import ConversationRouter
+from django_telegram.bot.telegram_conversation import TelegramConversation
+from tests.bot import TELEGRAM_REPLY_METHOD
+from tests.bot.conftest import ConvTest
+
+
+class MemoryBackend(object):
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.saved = []
+
+    def load(self):
+        return self.rows
+
+    def save(self, items):
+        self.saved.append(dict(items))
+
+
+class FailingBackend(MemoryBackend):
+    def save(self, items):
+        raise OSError('disk full')
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / 'state.sqlite3'))
+
+    backend.save({
+        ('conversation:test', (1, 5)): TelegramConversation.STATUS.BUILD,
+        ('chat:test', 1): {'query_context': {'mode': 'x'}},
+        ('chat:test', 2): {'query_context': {}},
+    })
+    backend.save({('chat:test', 2): None})
+
+    assert sorted(backend.load(), key=str) == sorted([
+        ('conversation:test', (1, 5), TelegramConversation.STATUS.BUILD),
+        ('chat:test', 1, {'query_context': {'mode': 'x'}}),
+    ], key=str)
+
+
+def test_values_are_json():
+    value = {
+        'state': TelegramConversation.STATUS.BUILD,
+        'filters': [{'created_at__range': [datetime(2026, 1, 1, 10), date(2026, 2, 1)]}],
+        'amount': Decimal('1.5'),
+        'period': timedelta(hours=2),
+    }
+
+    encoded = _encode_value(value)
+
+    assert encoded.startswith('{"state": {"__type__": "enum"')
+    assert _decode_value(encoded) == value
+
+
+def test_decode_rejects_non_enum_classes():
+    with pytest.raises(ValueError):
+        _decode_value('{"__type__": "enum", "class": "os:environ", "value": "PATH"}')
+
+
+def test_values_not_persistable():
+    with pytest.raises(TypeError):
+        _encode_value({'a': object()})
+
+
+def test_django_backend(mocker):
+    entries = mocker.patch.object(
+        DjangoStateBackend, 'entries', new_callable=mocker.PropertyMock,
+    ).return_value
+    mocker.patch('django_telegram.bot.persistence.transaction.atomic')
+    entries.values_list.return_value = [('chat:test', '1', '{"a": 1}')]
+    entries.filter.return_value.update.side_effect = [0, 1]
+    backend = DjangoStateBackend('other')
+
+    assert backend.load() == [('chat:test', 1, {'a': 1})]
+
+    backend.save({
+        ('chat:test', 1): {'a': 2},
+        ('chat:test', 2): {'b': 2},
+        ('chat:test', 3): None,
+    })
+
+    entries.create.assert_called_once_with(
+        namespace='chat:test', state_key='1', state_value='{"a": 2}',
+    )
+    entries.filter.return_value.delete.assert_called_once_with()
+
+
+def test_persistence_restores():
+    persistence = StatePersistence(MemoryBackend([
+        ('conversation:test', (1, 5), TelegramConversation.STATUS.BUILD),
+        ('chat:test', 1, {'a': 1}),
+    ]))
+
+    assert persistence.get_conversations('test') == {(1, 5): TelegramConversation.STATUS.BUILD}
+    assert persistence.get('chat:test') == {1: {'a': 1}}
+    assert persistence.get('chat:other') == {}
+
+
+def test_persistence_batches_writes():
+    backend = MemoryBackend()
+    persistence = StatePersistence(backend)
+
+    persistence.update_conversation('test', (1, 5), TelegramConversation.STATUS.BUILD)
+    persistence.update_conversation('test', (1, 5), TelegramConversation.STATUS.BUILD_PERIOD)
+    persistence.update('chat:test', 1, {'a': 1})
+
+    assert backend.saved == []
+    assert persistence.flush() == 2
+    assert backend.saved == [{
+        ('conversation:test', (1, 5)): TelegramConversation.STATUS.BUILD_PERIOD,
+        ('chat:test', 1): {'a': 1},
+    }]
+    assert persistence.flush() == 0
+
+
+def test_persistence_flush_failure_is_retried(mocker):
+    logger = mocker.Mock()
+    persistence = StatePersistence(FailingBackend(), logger=logger)
+    persistence.update('chat:test', 1, {'a': 1})
+
+    assert persistence.flush() == 0
+
+    persistence.backend = MemoryBackend()
+    assert persistence.flush() == 1
+    assert persistence.backend.saved == [{('chat:test', 1): {'a': 1}}]
+    logger.error.assert_called_once_with('State flush of 1 entries failed: disk full')
+
+
+def test_persistence_schedule_flush(mocker):
+    persistence = StatePersistence(MemoryBackend())
+    job_queue = mocker.Mock()
+
+    persistence.schedule_flush(job_queue, 10)
+
+    job_queue.run_repeating.assert_called_once_with(
+        persistence._flush_job, interval=10, first=10, name='persistence:flush',
+    )
+
+
+def test_persistent_chat_state_store():
+    persistence = StatePersistence(MemoryBackend([('chat:test', 1, {'a': 1})]))
+    store = PersistentChatStateStore(persistence, 'chat:test', max_entries=2)
+
+    assert store.get(1) == {'a': 1}
+    store.set(2, {'b': 2})
+    store.set(None, {})
+    store.set(3, {'c': 3})
+
+    assert persistence._pending == {
+        ('chat:test', 1): None,
+        ('chat:test', 2): None,
+        ('chat:test', 3): {'c': 3},
+    }
+
+
+def test_persistent_chat_state_store_commit():
+    persistence = StatePersistence(MemoryBackend([('chat:test', 1, {'a': 1})]))
+    store = PersistentChatStateStore(persistence, 'chat:test')
+
+    store.get(1)['a'] = 2
+    assert persistence._pending == {}
+
+    store.commit(1)
+    store.get(1)['a'] = 3
+    assert persistence._pending == {('chat:test', 1): {'a': 2}}
+
+    persistence.flush()
+    store.get(1)['a'] = 2
+    store.commit(1)
+    store.commit(2)
+    assert persistence._pending == {}
+
+
+def test_conversation_state_survives_restart(tmp_path, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    path = str(tmp_path / 'state.sqlite3')
+
+    def start():
+        persistence = StatePersistence(SQLiteStateBackend(path))
+        c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+        c.set_persistence(persistence)
+        c.set_chat_state_store(PersistentChatStateStore(persistence, 'chat:convtest_dev'))
+        return persistence, c, c.get_conversation_handler()
+
+    persistence, c, handler = start()
+    update = Update(1)
+    chat = Chat(1, 'user')
+    update.message = Message(1, timezone.now(), chat=chat, text='/convtest_dev')
+    state = c.show_mode_select(update, None)
+    handler._update_state(state, (1, 5))
+    c.set_query_period_uom('weeks')
+    c.chat_states.commit(1)
+    persistence.flush()
+
+    persistence, c, handler = start()
+    router = ConversationRouter([handler])
+
+    assert handler.persistent
+    assert handler.conversations == {(1, 5): TelegramConversation.STATUS.MODE_SELECTOR}
+    assert router.active == {(1, 5): 'convtest_dev'}
+    c.set_chat_id(1)
+    assert c.query_period_uom == 'weeks'
+
+
+def test_conversation_not_persistent():
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+
+    handler = c.get_conversation_handler()
+
+    assert isinstance(handler, ConversationHandler)
+    assert not handler.persistent
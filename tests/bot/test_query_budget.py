@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import OperationalError
+
+from django_telegram.bot.errors.query_budget_exceeded import QueryBudgetExceeded
+from django_telegram.bot.query_budget import (
+    is_timeout_error, run_with_budget, StatementRecorder,
+)
+
+
+class PgError(Exception):
+    pgcode = '57014'
+
+
+def test_run_with_budget_no_budget():
+    assert run_with_budget(lambda: 1, None) == 1
+
+
+def test_run_with_budget_in_worker():
+    assert run_with_budget(lambda: 1, 1) == 1
+
+
+def test_run_with_budget_in_worker_error():
+    def fail():
+        raise ValueError('ERR')
+
+    with pytest.raises(ValueError):
+        run_with_budget(fail, 1)
+
+
+def test_run_with_budget_in_worker_exceeded():
+    with pytest.raises(QueryBudgetExceeded) as err:
+        run_with_budget(lambda: time.sleep(0.5), 0.05)
+
+    assert err.value.budget == 0.05
+    assert str(err.value) == 'Query exceeded budget of 0.05 seconds'
+
+
+def test_run_with_budget_in_worker_pool(mocker):
+    mocker.patch('django_telegram.bot.query_budget._workers', ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+    queued = []
+
+    with pytest.raises(QueryBudgetExceeded):
+        run_with_budget(lambda: release.wait(1), 0.05)
+    #  the only worker is still held, the next query is dropped before it runs
+    with pytest.raises(QueryBudgetExceeded):
+        run_with_budget(lambda: queued.append(1), 0.05)
+    release.set()
+
+    assert run_with_budget(threading.current_thread, 1).name.startswith('ThreadPoolExecutor')
+    assert queued == []
+
+
+def test_run_with_budget_statement_timeout(mocker):
+    connection = mocker.MagicMock(vendor='postgresql', alias='default')
+    mocker.patch('django_telegram.bot.query_budget.connections', {'default': connection})
+    mocker.patch('django_telegram.bot.query_budget.transaction.atomic')
+
+    assert run_with_budget(lambda: 1, 2) == 1
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.execute.assert_called_once_with('SET LOCAL statement_timeout = %s', [2000])
+
+
+def test_run_with_budget_statement_timeout_exceeded(mocker):
+    connection = mocker.MagicMock(vendor='mysql', alias='default')
+    mocker.patch('django_telegram.bot.query_budget.connections', {'default': connection})
+
+    def timeout():
+        raise OperationalError(3024, 'maximum statement execution time exceeded')
+
+    with pytest.raises(QueryBudgetExceeded):
+        run_with_budget(timeout, 1)
+
+    cursor = connection.cursor.return_value.__enter__.return_value
+    assert cursor.execute.call_args_list[-1][0] == ('SET SESSION max_execution_time = 0',)
+
+
+def test_run_with_budget_statement_timeout_other_error(mocker):
+    connection = mocker.MagicMock(vendor='mysql', alias='default')
+    mocker.patch('django_telegram.bot.query_budget.connections', {'default': connection})
+
+    def fail():
+        raise OperationalError(2006, 'server has gone away')
+
+    with pytest.raises(OperationalError):
+        run_with_budget(fail, 1)
+
+
+def test_is_timeout_error():
+    error = OperationalError('canceling statement due to statement timeout')
+    error.__cause__ = PgError()
+
+    assert is_timeout_error(error) is True
+    assert is_timeout_error(OperationalError('other')) is False
+
+
+def test_statement_recorder():
+    recorder = StatementRecorder()
+
+    assert recorder.last_statement is None
+    assert recorder(lambda *args: 'ok', 'SELECT 1', None, False, {}) == 'ok'
+    recorder(lambda *args: 'ok', 'SELECT %s', (2,), False, {})
+    assert recorder.statements == ['SELECT 1', 'SELECT %s -- params: (2,)']
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save
+
+from django_telegram.bot.query_cache import QueryResultCache, watch_configured_models
+from tests.bot.conftest import FakeModel
+
+SPEC = {
+    'period': ['days', '1'],
+    'filters': [{'status': 'failed'}],
+    'aggregate': {'type': 'count', 'property': ''},
+    'saved': '',
+}
+
+
+def test_make_key_is_stable():
+    cache = QueryResultCache()
+
+    assert cache.make_key(FakeModel, SPEC) == cache.make_key(FakeModel, dict(SPEC))
+
+
+def test_make_key_differs_by_spec():
+    cache = QueryResultCache()
+    other_spec = dict(SPEC, saved='count')
+
+    assert cache.make_key(FakeModel, SPEC) != cache.make_key(FakeModel, other_spec)
+
+
+def test_set_get():
+    cache = QueryResultCache()
+    key = cache.make_key(FakeModel, SPEC)
+    cache.set(key, ['``` 10 ```'])
+
+    assert cache.get(key) == ['``` 10 ```']
+
+
+def test_invalidate_changes_key():
+    cache = QueryResultCache()
+    key = cache.make_key(FakeModel, SPEC)
+    cache.set(key, ['``` 10 ```'])
+    cache.invalidate(FakeModel)
+
+    assert cache.make_key(FakeModel, SPEC) != key
+
+
+def test_max_entries():
+    cache = QueryResultCache(max_entries=2)
+    keys = [cache.make_key(FakeModel, dict(SPEC, saved=str(i))) for i in range(3)]
+    for key in keys:
+        cache.set(key, ['x'])
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == ['x']
+    assert cache.get(keys[2]) == ['x']
+
+
+def test_watch_invalidates_on_signals():
+    cache = QueryResultCache()
+    cache.watch(FakeModel)
+
+    key = cache.make_key(FakeModel, SPEC)
+    post_save.send(sender=FakeModel, instance=None, created=True)
+    saved_key = cache.make_key(FakeModel, SPEC)
+    post_delete.send(sender=FakeModel, instance=None)
+
+    assert saved_key != key
+    assert cache.make_key(FakeModel, SPEC) != saved_key
+
+
+def test_watch_none():
+    cache = QueryResultCache()
+    cache.watch(None)
+
+    assert cache._watched == set()
+
+
+def test_watch_configured_models(mocker):
+    conversation = mocker.Mock(model=FakeModel)
+    mocker.patch(
+        'django_telegram.bot.query_cache.get_configured_conversations',
+        return_value=[conversation],
+    )
+
+    cache = watch_configured_models({'QUERY_CACHE': {'ALIAS': 'default'}})
+    key = cache.make_key(FakeModel, SPEC)
+    post_save.send(sender=FakeModel, instance=None, created=True)
+
+    assert cache._watched == {FakeModel}
+    assert cache.make_key(FakeModel, SPEC) != key
+
+
+def test_watch_configured_models_no_cache():
+    assert watch_configured_models({}) is None
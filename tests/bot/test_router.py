@@ -0,0 +1,161 @@
+import logging
+from unittest.mock import Mock
+
+import pytest
+from django.utils import timezone
+from telegram import Chat, Message, MessageEntity, Update, User
+
+from django_telegram.bot.constants import BTN_CAPTION_BUILD_QUERY
+from django_telegram.bot.metrics import HANDLER_SECONDS, UPDATES
+from django_telegram.bot.router import ConversationRouter, get_update_command
+from django_telegram.bot.shutdown import InFlightRegistry
+from django_telegram.bot.telegram_conversation import TelegramConversation
+from tests.bot import TELEGRAM_REPLY_METHOD
+from tests.bot.conftest import ConvTest, ConvTestFiltersCommands
+
+
+def _update(text, chat_id=1, user_id=5):
+    entities = []
+    if text.startswith('/'):
+        entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text.split()[0]))]
+    update = Update(1)
+    update.message = Message(
+        1,
+        timezone.now(),
+        chat=Chat(chat_id, 'private'),
+        from_user=User(user_id, 'user', False),
+        text=text,
+        entities=entities,
+        bot=Mock(username='some_bot'),
+    )
+    return update
+
+
+@pytest.fixture
+def router():
+    log = logging.getLogger()
+    first = ConvTest(log, 'created_at', suffix='dev')
+    second = ConvTestFiltersCommands(log, 'created_at', suffix='dev')
+    second.set_entrypoint_name('second_dev')
+    return ConversationRouter([
+        first.get_conversation_handler(),
+        second.get_conversation_handler(),
+    ])
+
+
+@pytest.fixture
+def dispatcher(mocker):
+    dispatcher = mocker.Mock()
+    dispatcher.bot.defaults = None
+    dispatcher.job_queue = None
+    return dispatcher
+
+
+def _handle(router, dispatcher, update, mocker):
+    check = router.check_update(update)
+    if check is None:
+        return None
+    router.handle_update(update, dispatcher, check, mocker.Mock())
+    return check[0]
+
+
+def test_get_update_command():
+    assert get_update_command(_update('/convtest_dev')) == 'convtest_dev'
+    assert get_update_command(_update('/ConvTest_dev@some_bot 1 day')) == 'convtest_dev'
+    assert get_update_command(_update('hello')) is None
+
+
+def test_router_indexes_entry_points(router):
+    first, second = router.conversation_handlers
+
+    assert router.entry_points['convtest_dev'] is first
+    assert router.entry_points['second_dev'] is second
+    assert router.entry_points['commands'] is first
+
+
+def test_router_routes_entry_command(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    first, second = router.conversation_handlers
+
+    handler = _handle(router, dispatcher, _update('/second_dev'), mocker)
+
+    assert handler is second
+    assert router.active[(1, 5)] == 'second_dev'
+    assert second.conversations[(1, 5)] == TelegramConversation.STATUS.MODE_SELECTOR
+    assert (1, 5) not in first.conversations
+
+
+def test_router_routes_active_conversation(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    second = router.conversation_handlers[1]
+
+    _handle(router, dispatcher, _update('/second_dev'), mocker)
+    handler = _handle(router, dispatcher, _update(BTN_CAPTION_BUILD_QUERY), mocker)
+
+    assert handler is second
+    assert second.conversations[(1, 5)] == TelegramConversation.STATUS.BUILD_PERIOD
+
+
+def test_router_keeps_chats_apart(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    _handle(router, dispatcher, _update('/second_dev'), mocker)
+
+    assert router.check_update(_update(BTN_CAPTION_BUILD_QUERY, chat_id=2)) is None
+
+
+def test_router_ends_conversation(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    _handle(router, dispatcher, _update('/convtest_dev'), mocker)
+    handler = _handle(router, dispatcher, _update('/cancel_dev'), mocker)
+
+    assert handler is router.conversation_handlers[0]
+    assert (1, 5) not in router.active
+
+
+def test_router_drops_conversation_ended_out_of_band(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    first = router.conversation_handlers[0]
+
+    _handle(router, dispatcher, _update('/convtest_dev'), mocker)
+    del first.conversations[(1, 5)]
+
+    assert router.check_update(_update(BTN_CAPTION_BUILD_QUERY)) is None
+    assert (1, 5) not in router.active
+
+
+def test_router_ignores_unknown_updates(router):
+    assert router.check_update(_update('/unknown_dev')) is None
+    assert router.check_update(_update('hello')) is None
+    assert router.check_update(object()) is None
+    assert router.check_update(Update(1)) is None
+
+
+def test_router_tracks_in_flight_updates(dispatcher, mocker):
+    in_flight = InFlightRegistry()
+    seen = []
+    conversation = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    router = ConversationRouter([conversation.get_conversation_handler()], in_flight=in_flight)
+    mocker.patch(
+        TELEGRAM_REPLY_METHOD, side_effect=lambda *args, **kwargs: seen.append(in_flight.chat_ids),
+    )
+
+    _handle(router, dispatcher, _update('/convtest_dev'), mocker)
+
+    assert seen and seen[0] == [1]
+    assert len(in_flight) == 0
+
+
+def test_router_records_metrics(router, dispatcher, mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    entries = UPDATES.values().get(('second_dev', 'entry'), 0)
+    selections = UPDATES.values().get(('second_dev', 'MODE_SELECTOR'), 0)
+    handled = HANDLER_SECONDS.values().get(('second_dev',), [0])[-1]
+
+    _handle(router, dispatcher, _update('/second_dev'), mocker)
+    _handle(router, dispatcher, _update(BTN_CAPTION_BUILD_QUERY), mocker)
+
+    assert UPDATES.values()[('second_dev', 'entry')] == entries + 1
+    assert UPDATES.values()[('second_dev', 'MODE_SELECTOR')] == selections + 1
+    assert HANDLER_SECONDS.values()[('second_dev',)][-1] == handled + 2
@@ -0,0 +1,109 @@
+import queue
+import threading
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from telegram import Chat, Message, Update, User
+from telegram.ext import Dispatcher, ExtBot, TypeHandler
+
+from django_telegram.bot.jobs import JobRegistry
+from django_telegram.bot.sharding import (
+    check_shard_lock, get_dead_workers, get_update_shard, run_shard_worker, ShardingHandler,
+)
+
+
+def _update(chat_id, update_id=1, text='hello'):
+    update = Update(update_id)
+    update.message = Message(
+        update_id,
+        timezone.now(),
+        chat=Chat(chat_id, 'private'),
+        from_user=User(5, 'user', False),
+        text=text,
+    )
+    return update
+
+
+def test_get_update_shard():
+    assert get_update_shard(_update(7), 4) == 3
+    assert get_update_shard(_update(-1001234567), 4) == hash(-1001234567) % 4
+    assert get_update_shard(Update(1), 4) == 0
+
+
+def test_sharding_handler_keeps_chats_together(mocker):
+    queues = [queue.Queue() for _ in range(3)]
+    handler = ShardingHandler(queues)
+    dispatcher = mocker.Mock()
+    dispatcher.bot.defaults = None
+
+    for update_id, chat_id in enumerate([1, 2, 1, 4, 1], start=1):
+        update = _update(chat_id, update_id)
+        assert handler.check_update(update)
+        handler.handle_update(update, dispatcher, True, mocker.Mock())
+
+    assert [data['update_id'] for data in queues[1].queue] == [1, 3, 4, 5]
+    assert [data['update_id'] for data in queues[2].queue] == [2]
+    assert queues[0].empty()
+    assert not handler.check_update(object())
+
+
+def test_run_shard_worker_dispatches_in_order(mocker):
+    mocker.patch('signal.signal')
+    mocker.patch.object(ExtBot, 'get_me', return_value=User(123, 'bot', True, username='bot'))
+    dispatcher = Dispatcher(ExtBot('123:abc'), queue.Queue(), workers=1)
+    received = []
+    dispatcher.add_handler(TypeHandler(Update, lambda update, context: received.append(update)))
+    updates = queue.Queue()
+    for update_id in range(1, 4):
+        updates.put(_update(1, update_id, text=f'message {update_id}').to_dict())
+    updates.put(None)
+
+    worker = threading.Thread(target=run_shard_worker, args=(dispatcher, updates))
+    worker.start()
+    worker.join(10)
+
+    assert not worker.is_alive()
+    assert [update.message.text for update in received] == [
+        'message 1', 'message 2', 'message 3',
+    ]
+    assert not dispatcher.running
+
+
+def test_run_shard_worker_drains_before_stopping(mocker):
+    mocker.patch('signal.signal')
+    mocker.patch.object(ExtBot, 'get_me', return_value=User(123, 'bot', True, username='bot'))
+    dispatcher = Dispatcher(ExtBot('123:abc'), queue.Queue(), workers=1)
+    updates = queue.Queue()
+    updates.put(None)
+    drain = mocker.Mock(return_value=False)
+
+    assert run_shard_worker(dispatcher, updates, drain=drain) is False
+    drain.assert_called_once_with()
+    assert dispatcher.running
+    dispatcher.stop()
+
+
+@pytest.mark.parametrize('lock_alias', (None, 'default'))
+def test_check_shard_lock_not_shared(lock_alias):
+    with pytest.raises(ImproperlyConfigured) as e:
+        check_shard_lock(JobRegistry(lock_alias=lock_alias))
+
+    assert str(e.value) == (
+        '"COMMAND_LOCK[ALIAS]" must be a cache shared by the processes '
+        'to run the bot with --processes.'
+    )
+
+
+def test_check_shard_lock_shared(mocker):
+    mocker.patch('django_telegram.bot.sharding.caches', {'redis': mocker.Mock()})
+
+    check_shard_lock(JobRegistry(lock_alias='redis'))
+
+
+def test_get_dead_workers(mocker):
+    alive = mocker.Mock(**{'is_alive.return_value': True})
+    dead = mocker.Mock(**{'is_alive.return_value': False})
+
+    assert get_dead_workers([alive, dead]) == [dead]
+    assert get_dead_workers([alive]) == []
@@ -0,0 +1,181 @@
+import logging
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import caches
+from django.utils import timezone
+from telegram import Chat, Message, MessageEntity, Update, User
+
+from django_telegram.bot.chat_state import chat_namespace
+from django_telegram.bot.constants import BTN_CAPTION_BUILD_QUERY
+from django_telegram.bot.router import ConversationRouter
+from django_telegram.bot.shared_state import (
+    SharedChatStateStore, SharedMapping, SharedState,
+)
+from django_telegram.bot.telegram_conversation import TelegramConversation
+from tests.bot import TELEGRAM_REPLY_METHOD
+from tests.bot.conftest import ConvTest
+
+KEY = SharedState.make_key('chat:test', 1)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    caches['default'].clear()
+
+
+def test_make_key():
+    assert SharedState.make_key('conversation:test', [1, 5]) == (
+        'telegram_state:conversation:test:[1,5]'
+    )
+
+
+def test_write_through_outside_update():
+    shared = SharedState()
+
+    shared.set(KEY, {'a': 1})
+    shared.set(KEY, {'a': 2})
+
+    assert shared.get(KEY) == {'a': 2}
+    assert caches['default'].get(KEY)[0] == 2
+
+
+def test_update_reads_and_writes_once(mocker):
+    shared = SharedState()
+    shared.set(KEY, {'a': 1})
+    cache = caches['default']
+    get_many = mocker.spy(cache, 'get_many')
+    set_value = mocker.spy(cache, 'set')
+
+    shared.begin()
+    state = shared.get(KEY)
+    state['a'] = 2
+    shared.get(KEY)
+    shared.commit()
+
+    assert get_many.call_count == 1
+    assert set_value.call_count == 1
+    assert shared.get(KEY) == {'a': 2}
+
+
+def test_unchanged_entries_are_not_written(mocker):
+    shared = SharedState()
+    shared.set(KEY, {'a': 1})
+    set_value = mocker.spy(caches['default'], 'set')
+
+    shared.begin()
+    shared.get(KEY)
+    shared.commit()
+
+    assert not set_value.called
+
+
+def test_concurrent_update_is_dropped():
+    logger = Mock()
+    replica_a = SharedState()
+    replica_b = SharedState(logger=logger)
+    replica_a.set(KEY, {'a': 1})
+
+    replica_a.begin()
+    replica_a.set(KEY, {'a': 'from a'})
+    replica_b.begin()
+    replica_b.set(KEY, {'a': 'from b'})
+    replica_a.commit()
+    replica_b.commit()
+
+    assert replica_a.get(KEY) == {'a': 'from a'}
+    logger.warning.assert_called_once_with(
+        f'Shared state {KEY} changed concurrently, update dropped',
+    )
+
+
+def test_delete_keeps_versions():
+    shared = SharedState()
+    shared.set(KEY, {'a': 1})
+    shared.delete(KEY)
+
+    assert shared.get(KEY) is None
+
+    shared.set(KEY, {'a': 3})
+    assert shared.get(KEY) == {'a': 3}
+    assert caches['default'].get(KEY)[0] == 3
+
+
+def test_shared_mapping():
+    mapping = SharedMapping(SharedState(), 'conversation:test')
+
+    mapping[(1, 5)] = TelegramConversation.STATUS.BUILD
+
+    assert (1, 5) in mapping
+    assert mapping[(1, 5)] == TelegramConversation.STATUS.BUILD
+    assert mapping.get((2, 5)) is None
+    assert list(mapping) == []
+    assert len(mapping) == 0
+    del mapping[(1, 5)]
+    assert (1, 5) not in mapping
+    with pytest.raises(KeyError):
+        del mapping[(1, 5)]
+
+
+def test_shared_chat_state_store():
+    shared = SharedState()
+    store = SharedChatStateStore(shared, 'chat:test')
+
+    store.set(1, {'a': 1})
+    store.set(None, {'b': 2})
+
+    assert 1 in store
+    assert store.get(1) == {'a': 1}
+    assert shared.get(KEY) == {'a': 1}
+    assert store.get(None) == {'b': 2}
+    assert None in store
+    store.discard(1)
+    store.discard(None)
+    assert 1 not in store
+    assert None not in store
+
+
+def _replica():
+    shared = SharedState()
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_shared_state(shared)
+    c.set_chat_state_store(SharedChatStateStore(shared, chat_namespace(c.entrypoint)))
+    return c, ConversationRouter([c.get_conversation_handler()], shared_state=shared)
+
+
+def _update(text):
+    entities = []
+    if text.startswith('/'):
+        entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text))]
+    update = Update(1)
+    update.message = Message(
+        1,
+        timezone.now(),
+        chat=Chat(1, 'private'),
+        from_user=User(5, 'user', False),
+        text=text,
+        entities=entities,
+        bot=Mock(username='some_bot'),
+    )
+    return update
+
+
+def test_conversation_moves_between_replicas(mocker):
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    dispatcher = Mock()
+    dispatcher.bot.defaults = None
+    replica_a, router_a = _replica()
+    replica_b, router_b = _replica()
+
+    update = _update('/convtest_dev')
+    router_a.handle_update(update, dispatcher, router_a.check_update(update), Mock())
+    update = _update(BTN_CAPTION_BUILD_QUERY)
+    check = router_b.check_update(update)
+    router_b.handle_update(update, dispatcher, check, Mock())
+
+    assert check[0] is router_b.conversation_handlers[0]
+    assert router_a.conversation_handlers[0].conversations[(1, 5)] == (
+        TelegramConversation.STATUS.BUILD_PERIOD
+    )
+    replica_a.set_chat_id(1)
+    assert replica_a.query_mode == BTN_CAPTION_BUILD_QUERY
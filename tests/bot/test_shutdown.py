@@ -0,0 +1,165 @@
+import queue
+import threading
+from unittest.mock import Mock
+
+from django.utils import timezone
+from telegram import Chat, Message, Update, User
+from telegram.error import TelegramError
+
+from django_telegram.bot.jobs import JobRegistry
+from django_telegram.bot.shutdown import (
+    InFlightRegistry, ShutdownDrain, stop_receiving, wait_for_stop_signal,
+)
+
+
+def _update(chat_id, update_id=1):
+    update = Update(update_id)
+    update.message = Message(
+        update_id,
+        timezone.now(),
+        chat=Chat(chat_id, 'private'),
+        from_user=User(5, 'user', False),
+        text='hello',
+    )
+    return update
+
+
+def _dispatcher():
+    dispatcher = Mock()
+    dispatcher.update_queue = queue.Queue()
+    return dispatcher
+
+
+def test_in_flight_registry():
+    in_flight = InFlightRegistry()
+
+    with in_flight.track(1):
+        with in_flight.track(1):
+            assert len(in_flight) == 2
+            assert in_flight.chat_ids == [1, 1]
+    assert len(in_flight) == 0
+
+
+def test_stop_receiving():
+    updater = Mock()
+    httpd = updater.httpd
+
+    stop_receiving(updater)
+
+    assert updater.running is False
+    httpd.shutdown.assert_called_once_with()
+    assert updater.httpd is None
+
+
+def test_wait_for_stop_signal_until_not_alive(mocker):
+    mocker.patch('signal.signal')
+    mocker.patch('threading.Event.wait', return_value=False)
+    alive = mocker.Mock(side_effect=[True, True, False])
+
+    assert wait_for_stop_signal(alive=alive) is False
+    assert alive.call_count == 3
+
+
+def test_wait_for_stop_signal_stopped(mocker):
+    signal = mocker.patch('signal.signal')
+    mocker.patch('threading.Event.wait', side_effect=[False, True])
+    alive = mocker.Mock(return_value=True)
+
+    assert wait_for_stop_signal(alive=alive) is True
+    alive.assert_called_once_with()
+    assert signal.call_count == 3
+
+
+def test_drain_waits_for_in_flight_update():
+    in_flight = InFlightRegistry()
+    drain = ShutdownDrain(_dispatcher(), in_flight, timeout=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def handle():
+        with in_flight.track(1):
+            started.set()
+            release.wait()
+
+    handler = threading.Thread(target=handle)
+    handler.start()
+    started.wait()
+    assert not drain.drained
+    threading.Timer(0.2, release.set).start()
+
+    assert drain.run() is True
+    handler.join()
+
+
+def test_drain_waits_for_queued_updates():
+    dispatcher = _dispatcher()
+    dispatcher.update_queue.put(_update(1))
+    drain = ShutdownDrain(dispatcher, InFlightRegistry(), timeout=0.2)
+
+    assert drain.wait() is False
+
+    dispatcher.update_queue.get()
+    dispatcher.update_queue.task_done()
+    assert drain.wait() is True
+
+
+def test_drain_abandons_after_timeout():
+    dispatcher = _dispatcher()
+    dispatcher.update_queue.put(_update(2, 1))
+    dispatcher.update_queue.put(_update(3, 2))
+    dispatcher.update_queue.put(_update(2, 3))
+    in_flight = InFlightRegistry()
+    job_registry = JobRegistry()
+    job, _started = job_registry.start('xx', 1)
+    command_pool = Mock()
+    command_pool.terminate.return_value = ['xx']
+    logger = Mock()
+    drain = ShutdownDrain(
+        dispatcher,
+        in_flight,
+        timeout=0.1,
+        job_registry=job_registry,
+        command_pool=command_pool,
+        logger=logger,
+    )
+
+    with in_flight.track(1), in_flight.track(4):
+        assert drain.run() is False
+
+    assert dispatcher.update_queue.empty()
+    assert dispatcher.update_queue.unfinished_tasks == 0
+    command_pool.terminate.assert_called_once_with()
+    logger.error.assert_called_once_with(
+        'Shutdown timeout of 0.1s exceeded: 2 updates in flight, 3 queued updates dropped, '
+        "jobs abandoned: ['xx'], commands killed: ['xx']",
+    )
+    assert [c.args for c in dispatcher.bot.send_message.call_args_list] == [
+        (1, 'The bot is restarting, xx was abandoned'),
+        (4, 'The bot is restarting and your last message was not handled, please send it again'),
+        (2, 'The bot is restarting and your last message was not handled, please send it again'),
+        (3, 'The bot is restarting and your last message was not handled, please send it again'),
+    ]
+
+
+def test_drain_notice_not_sent():
+    dispatcher = _dispatcher()
+    dispatcher.bot.send_message.side_effect = TelegramError('blocked')
+    in_flight = InFlightRegistry()
+    logger = Mock()
+    drain = ShutdownDrain(dispatcher, in_flight, timeout=0.1, logger=logger)
+
+    with in_flight.track(1):
+        drain.abandon()
+
+    logger.warning.assert_called_once_with('Shutdown notice to chat 1 not sent: blocked')
+
+
+def test_drain_waits_for_running_jobs():
+    job_registry = JobRegistry()
+    job, _started = job_registry.start('xx', 1)
+    drain = ShutdownDrain(_dispatcher(), InFlightRegistry(), timeout=0.2, job_registry=job_registry)
+
+    assert drain.wait() is False
+
+    job_registry.finish(job, True)
+    assert drain.wait() is True
@@ -1,20 +1,42 @@
 import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from queue import Queue
 
 import pytest
 from django.utils import timezone
 from django_mock_queries.query import MockModel, MockSet
-from telegram import Chat, Message, Update
-from telegram.ext import ConversationHandler
+from telegram import (
+    CallbackQuery, Chat, InlineKeyboardMarkup, Message, MessageEntity, Update, User,
+)
+from telegram.error import TelegramError
+from telegram.ext import CallbackQueryHandler, ConversationHandler, Dispatcher, MessageHandler
 
 
+from django_telegram.bot.chat_state import ChatStateStore
+from django_telegram.bot.command_catalog import CommandCatalog
+from django_telegram.bot.command_pool import CommandPool, CommandResult
 from django_telegram.bot.constants import (
-    BTN_CAPTION_BUILD_QUERY, BTN_CAPTION_CUSTOM_MGMT, BTN_CAPTION_USE_SAVED_FILTER,
-    COUNT, NO, SUM, WEEKS, YES,
+    BTN_CAPTION_BUILD_QUERY, BTN_CAPTION_CUSTOM_MGMT, BTN_CAPTION_PROFILE_QUERY,
+    BTN_CAPTION_REFRESH_NOW, BTN_CAPTION_USE_SAVED_FILTER, CACHED_REPLY_MARK, COUNT, EXPORT,
+    HISTOGRAM, HOURS, MESSAGE_MAX_LENGTH, NO, SUM, UI_MODE_INLINE, WEEKS, YES,
 )
+from django_telegram.bot.db_routing import ReplicaLagCheck
+from django_telegram.bot.errors.query_budget_exceeded import QueryBudgetExceeded
 from django_telegram.bot.errors.saved_filter_not_found import SavedFilterNotFound
+from django_telegram.bot.jobs import JobRegistry
+from django_telegram.bot.metrics import QUERY_SECONDS, REPLIES
+from django_telegram.bot.query_cache import QueryResultCache
 from django_telegram.bot.telegram_conversation import TelegramConversation
-from tests.bot import DJANGO_CALL_COMMAND, INITIAL_QUERY_SET_METHOD, TELEGRAM_REPLY_METHOD
-from tests.bot.conftest import ConvTest, ConvTestFiltersCommands, FakeModel
+from tests.bot import (
+    DJANGO_CALL_COMMAND, EXPORT_AS_FILE, INITIAL_QUERY_SET_METHOD,
+    TELEGRAM_REPLY_DOCUMENT_METHOD, TELEGRAM_REPLY_METHOD,
+)
+from tests.bot.conftest import (
+    ConvTest, ConvTestFiltersCommands, ConvTestMaterialized, FakeModel,
+)
 
 
 def test_conversation_handler():
@@ -25,7 +47,7 @@ def test_conversation_handler():
     entry_point = handler.entry_points[0]
     fallback = handler.fallbacks[0]
 
-    assert len(handler.states) == 10
+    assert len(handler.states) == 12
     assert entry_point.command == [f'{c.__class__.__name__.lower()}_dev']
     assert fallback.command == ['cancel_dev']
 
@@ -38,7 +60,7 @@ def test_conversation_handler_no_suffix():
     entry_point = handler.entry_points[0]
     fallback = handler.fallbacks[0]
 
-    assert len(handler.states) == 10
+    assert len(handler.states) == 12
     assert entry_point.command == [c.__class__.__name__.lower()]
     assert fallback.command == ['cancel']
 
@@ -53,7 +75,7 @@ def test_conversation_handler_custom_fb_and_entry():
     entry_point = handler.entry_points[0]
     fallback = handler.fallbacks[0]
 
-    assert len(handler.states) == 10
+    assert len(handler.states) == 12
     assert entry_point.command == ['test_start']
     assert fallback.command == ['test_end']
 
@@ -77,6 +99,167 @@ def test_cancel(mocker):
     assert data == ConversationHandler.END
 
 
+def test_conversation_handler_timeout():
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.set_conversation_timeout(600)
+
+    handler = c.get_conversation_handler()
+
+    assert handler.conversation_timeout == 600
+    assert handler.states[ConversationHandler.TIMEOUT][0].callback == c.timeout_conversation
+
+
+def test_timeout_conversation(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    c.set_query_mode(BTN_CAPTION_BUILD_QUERY)
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat)
+    message.chat = chat
+    update.message = message
+    data = c.timeout_conversation(update, None)
+
+    assert data == ConversationHandler.END
+    assert mock.call_args[0] == (
+        '``` Conversation timed out, send /convtest_dev to start again ```',
+    )
+    assert 1 not in c.chat_states
+    assert c.chat_id is None
+
+
+def test_timeout_conversation_released_chat(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat)
+    message.chat = chat
+    update.message = message
+
+    assert c.timeout_conversation(update, None) == ConversationHandler.END
+    assert not mock.called
+
+
+def test_query_context_per_chat(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    def update_from(chat_id, text):
+        update = Update(1)
+        chat = Chat(chat_id, 'user')
+        message = Message(1, timezone.now(), chat=chat, text=text)
+        message.chat = chat
+        update.message = message
+        return update
+
+    c.show_mode_select(update_from(1, '/convtest_dev'), None)
+    c.show_mode_select(update_from(2, '/convtest_dev'), None)
+    c.get_mode_show_mode_options(update_from(1, BTN_CAPTION_BUILD_QUERY), None)
+    c.get_mode_show_mode_options(update_from(2, BTN_CAPTION_USE_SAVED_FILTER), None)
+    c.get_period_uom_show_quantity(update_from(1, WEEKS), None)
+
+    assert c.query_mode == BTN_CAPTION_BUILD_QUERY
+    assert c.query_period_uom == WEEKS
+    c.set_chat_id(2)
+    assert c.query_mode == BTN_CAPTION_USE_SAVED_FILTER
+    assert c.query_period_uom == ''
+
+
+def test_evict_chat_states_job(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.set_chat_state_store(ChatStateStore(idle_timeout=60))
+    monotonic = mocker.patch('django_telegram.bot.chat_state.time.monotonic', return_value=100)
+    c.set_chat_id(1)
+    monotonic.return_value = 200
+
+    c._evict_chat_states_job(mocker.Mock())
+
+    assert 1 not in c.chat_states
+
+
+def test_evict_chat_states_job_ends_conversations(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.set_chat_state_store(ChatStateStore(idle_timeout=60))
+    handler = c.get_conversation_handler()
+    handler.conversations[(1, 5)] = c.STATUS.MODE_SELECTOR
+    handler.conversations[(2, 5)] = c.STATUS.MODE_SELECTOR
+    monotonic = mocker.patch('django_telegram.bot.chat_state.time.monotonic', return_value=100)
+    c.set_chat_id(1)
+    monotonic.return_value = 150
+    c.set_chat_id(2)
+    monotonic.return_value = 200
+    context = mocker.Mock()
+
+    c._evict_chat_states_job(context)
+
+    assert (1, 5) not in handler.conversations
+    assert (2, 5) in handler.conversations
+    context.bot.send_message.assert_called_once_with(
+        1, 'Conversation expired, send /convtest_dev to start again',
+    )
+
+
+def test_evict_chat_states_job_ends_persistent_conversations(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.set_persistence(mocker.Mock(**{'get_conversations.return_value': {}}))
+    c.set_chat_state_store(ChatStateStore(idle_timeout=60))
+    handler = c.get_conversation_handler()
+    handler.conversations[(1, 5)] = c.STATUS.MODE_SELECTOR
+    monotonic = mocker.patch('django_telegram.bot.chat_state.time.monotonic', return_value=100)
+    c.set_chat_id(1)
+    monotonic.return_value = 200
+
+    c._evict_chat_states_job(mocker.Mock())
+
+    assert handler.conversations == {}
+    handler.persistence.update_conversation.assert_called_once_with(
+        'convtest_dev', (1, 5), None,
+    )
+
+
+def test_evicted_chat_state_expires_conversation(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    reply = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    c.set_chat_id(1)
+    c.chat_states.evict_idle()
+    c.chat_states.discard(1)
+
+    update = Update(1)
+    update.message = Message(1, timezone.now(), chat=Chat(1, 'user'), text='/cancel_dev')
+
+    assert c.cancel(update, None) == ConversationHandler.END
+    assert reply.call_args[0] == (
+        '``` Conversation expired, send /convtest_dev to start again ```',
+    )
+    assert 1 not in c.chat_states
+
+
+def test_schedule_chat_state_eviction(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    job_queue = mocker.Mock()
+
+    c.schedule_chat_state_eviction(job_queue, 300)
+
+    job_queue.run_repeating.assert_called_once_with(
+        c._evict_chat_states_job, interval=300, first=300, name='convtest_dev:chat_states',
+    )
+
+
 def test_show_mode_select(mocker):
     log = logging.getLogger()
     c = ConvTest(log, 'created_at', suffix='dev')
@@ -210,6 +393,27 @@ def test_show_list_of_commands(mocker):
     assert data == ConversationHandler.END
 
 
+def test_show_list_of_commands_from_catalog(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    other = ConvTestFiltersCommands(log, 'created_at', suffix='dev')
+    c.set_command_catalog(CommandCatalog.from_conversations([c, other]))
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='/commands')
+    message.chat = chat
+    update.message = message
+    data = c.show_list_of_commands(update, None)
+
+    assert data == ConversationHandler.END
+    assert mock.call_count == 1
+    assert '`/convtestfilterscommands_dev`' in mock.call_args[0][0]
+    assert 'saved filters: `avg_execution_24h`' in mock.call_args[0][0]
+
+
 def test_get_custom_command_and_execute(mocker):
     log = logging.getLogger()
     c = ConvTest(log, 'created_at', suffix='dev')
@@ -256,25 +460,36 @@ def test_get_quantity_show_yes_no_filters(mocker):
     assert c.query_period_quantity == 10
 
 
+def _command_update(mocker, chat_id=1):
+    bot = mocker.MagicMock()
+    chat = Chat(chat_id, 'user')
+    update = Update(1)
+    update.message = Message(1, timezone.now(), chat=chat, text='xx', bot=bot)
+    return update, bot
+
+
+def _command_result(bot):
+    return bot.edit_message_text.call_args[0][0]
+
+
 def test_execute_command_exception(mocker):
     log = logging.getLogger()
     c = ConvTestFiltersCommands(log, 'created_at', suffix='dev')
     c.set_chat_id(1)
-    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    update, bot = _command_update(mocker)
+    mock = mocker.patch(
+        TELEGRAM_REPLY_METHOD, return_value=Message(42, timezone.now(), chat=Chat(1, 'user')),
+    )
     mocker.patch(
         DJANGO_CALL_COMMAND,
         side_effect=Exception('ERROR'),
     )
 
-    update = Update(1)
-    chat = Chat(1, 'user')
-    message = Message(1, timezone.now(), chat=chat, text='10')
-    message.chat = chat
-    update.message = message
     data = c.execute_custom_command(update, 'xx')
-    assert mock.called
-    assert mock.call_args[0] == ("``` Error xx:\nERROR ```",)
-    assert data is False
+    assert mock.call_args[0] == ('``` Running xx ```',)
+    assert _command_result(bot) == '``` Error xx:\nERROR ```'
+    assert bot.edit_message_text.call_args[1]['message_id'] == 42
+    assert data is True
     assert c.query_context == {
         'mode': '',
         'period': {
@@ -296,21 +511,18 @@ def test_execute_custom_command(mocker):
     log = logging.getLogger()
     c = ConvTestFiltersCommands(log, 'created_at', suffix='dev')
     c.set_chat_id(1)
-    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    update, bot = _command_update(mocker)
+    mocker.patch(
+        TELEGRAM_REPLY_METHOD, return_value=Message(42, timezone.now(), chat=Chat(1, 'user')),
+    )
     mocker.patch(
         DJANGO_CALL_COMMAND,
         return_value=True,
     )
 
-    update = Update(1)
-    chat = Chat(1, 'user')
-    message = Message(1, timezone.now(), chat=chat, text='10')
-    message.chat = chat
-    update.message = message
     data = c.execute_custom_command(update, 'xx')
 
-    assert mock.called
-    assert mock.call_args[0] != (f'``` {TelegramConversation.EMPTY_RESULT} ```',)
+    assert _command_result(bot) == '``` Result xx:\n ```'
     assert data is True
     assert c.query_context == {
         'mode': '',
@@ -333,21 +545,17 @@ def test_execute_custom_command_raise_exception(mocker):
     log = logging.getLogger()
     c = ConvTest(log, 'created_at', suffix='dev')
     c.set_chat_id(1)
+    update, bot = _command_update(mocker)
     mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
-    mocker.patch(
+    call_command = mocker.patch(
         DJANGO_CALL_COMMAND,
         side_effect=Exception('error'),
     )
 
-    update = Update(1)
-    chat = Chat(1, 'user')
-    message = Message(1, timezone.now(), chat=chat, text='10')
-    message.chat = chat
-    update.message = message
     data = c.execute_custom_command(update, 'command')
 
-    assert mock.called
-    assert mock.call_args[0] != (f'``` {TelegramConversation.EMPTY_RESULT} ```',)
+    assert mock.call_args[0] == ('``` Invalid command ```',)
+    assert not call_command.called
     assert data is False
     assert c.query_context == {
         'mode': '',
@@ -443,6 +651,7 @@ def test_get_yes_no_aggregate_and_proceed(mocker):
 def test_get_filters_and_proceed(mocker):
     log = logging.getLogger()
     c = ConvTest(log, 'created_at', suffix='dev')
+    c.model = FakeModel
     c.set_chat_id(1)
     c.set_query_period_uom(WEEKS)
     c.set_query_period_quantity(10)
@@ -687,9 +896,945 @@ def test_get_saved_filter_and_proceed_no_user(mocker):
     update = Update(1)
     update.message = message
     data = c.get_saved_filter_and_proceed(update, None)
-    assert data is None
+    assert data == ConversationHandler.END
 
 
 def test_invalid_suffix():
     with pytest.raises(ValueError):
         ConvTest(object, 'created_at', '-dev')
+
+
+def test_run_query_cached(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_query_cache(QueryResultCache())
+    c.set_chat_id(1)
+    c.set_saved_filter('cached_count')
+    saved_filter = mocker.MagicMock(side_effect=lambda update: c._reply(update, 10))
+    c.get_cached_count = saved_filter
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='cached_count')
+    message.chat = chat
+    update.message = message
+
+    c.run_query(update)
+    assert mock.call_args[0] == ('``` 10 ```',)
+
+    c.run_query(update)
+    assert mock.call_args[0] == (f'``` 10 ```\n{CACHED_REPLY_MARK}',)
+    assert saved_filter.call_count == 1
+
+
+def test_run_query_empty_not_cached(mocker):
+    log = logging.getLogger()
+    c = ConvTest(log, 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_query_cache(QueryResultCache())
+    c.set_chat_id(1)
+    c.set_saved_filter('empty_count')
+    saved_filter = mocker.MagicMock()
+    c.get_empty_count = saved_filter
+    cache_set = mocker.spy(c.query_cache, 'set')
+
+    update = Update(1)
+    c.run_query(update)
+    c.run_query(update)
+
+    assert saved_filter.call_count == 2
+    cache_set.assert_not_called()
+
+
+def test_run_query_records_metrics(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_saved_filter('cached_count')
+    c.get_cached_count = mocker.MagicMock(side_effect=lambda update: c._reply(update, 10))
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    observe = mocker.patch.object(QUERY_SECONDS, 'observe')
+    sent = REPLIES.values().get(('sent',), 0)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    update.message = Message(1, timezone.now(), chat=chat, text='cached_count')
+
+    c.run_query(update)
+
+    observe.assert_called_once_with(mocker.ANY, conversation='convtest_dev')
+    assert REPLIES.values()[('sent',)] == sent + 1
+
+
+def test_send_failure_counted(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    mocker.patch(TELEGRAM_REPLY_METHOD, side_effect=TelegramError('blocked'))
+    failed = REPLIES.values().get(('failed',), 0)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    update.message = Message(1, timezone.now(), chat=chat, text='x')
+
+    with pytest.raises(TelegramError):
+        c._send(update, 'text')
+    assert REPLIES.values()[('failed',)] == failed + 1
+
+
+def test_materialized_filters():
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+
+    assert c.materialized_filters == {'count': timedelta(seconds=600)}
+
+
+def test_schedule_materialized_filters(mocker):
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+    job_queue = mocker.MagicMock()
+    c.schedule_materialized_filters(job_queue)
+
+    job_queue.run_repeating.assert_called_once_with(
+        c._refresh_materialized_filter_job,
+        interval=timedelta(seconds=600),
+        first=0,
+        context='count',
+        name='convtestmaterialized_dev:count',
+    )
+
+
+def test_refresh_materialized_filter_job():
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+
+    class JobContext(object):
+        class job(object):
+            context = 'count'
+
+    c._refresh_materialized_filter_job(JobContext)
+
+    assert c.materialized['count']['replies'] == ['``` 1 ```']
+
+
+def test_get_saved_filter_and_proceed_materialized(mocker):
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.refresh_materialized_filter('count')
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='count')
+    message.chat = chat
+    update.message = message
+
+    data = c.get_saved_filter_and_proceed(update, None)
+
+    assert data == TelegramConversation.STATUS.SAVED_FILTER_REFRESH
+    assert mock.call_args_list[0][0] == ('``` 1 ```',)
+    assert c.executions == 1
+
+    message = Message(1, timezone.now(), chat=chat, text=BTN_CAPTION_REFRESH_NOW)
+    message.chat = chat
+    update.message = message
+    data = c.get_refresh_and_proceed(update, None)
+
+    assert data == ConversationHandler.END
+    assert c.executions == 2
+    assert c.materialized['count']['replies'] == ['``` 2 ```']
+
+
+def test_get_saved_filter_and_proceed_not_materialized_yet(mocker):
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='count')
+    message.chat = chat
+    update.message = message
+
+    data = c.get_saved_filter_and_proceed(update, None)
+
+    assert data == ConversationHandler.END
+    assert mock.call_args_list[0][0] == ('``` 1 ```',)
+    assert 'count' in c.materialized
+
+
+def test_materialized_filter_refresh_exceeds_budget(mocker):
+    c = ConvTestMaterialized(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_time_budget(0.05)
+    budget = mocker.patch(
+        'django_telegram.bot.telegram_conversation.run_with_budget',
+        side_effect=QueryBudgetExceeded(0.05, 'SELECT 1'),
+    )
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    update.message = Message(1, timezone.now(), chat=chat, text='count')
+    c.get_saved_filter_and_proceed(update, None)
+
+    assert 'count' not in c.materialized
+    c.refresh_materialized_filter('count')
+    c.set_chat_id(1)
+    c.set_saved_filter('count')
+    update.message = Message(2, timezone.now(), chat=chat, text=BTN_CAPTION_REFRESH_NOW)
+    c.get_refresh_and_proceed(update, None)
+
+    assert budget.call_count == 2
+    assert budget.call_args[0][1:] == (0.05, 'default')
+    assert [call[0] for call in mock.call_args_list] == [
+        ('``` Query exceeded budget of 0.05 seconds ```',),
+        ('``` End of conversation ```',),
+        ('``` Query exceeded budget of 0.05 seconds ```',),
+        ('``` End of conversation ```',),
+    ]
+
+
+class ConvTestListFields(ConvTest):
+    @property
+    def list_fields(self):
+        return ['pk', 'title']
+
+    @property
+    def list_format(self):
+        return '- {title} [{pk}]\n'
+
+
+def test_list_fields_query(mocker):
+    c = ConvTestListFields(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    c.set_query_period_uom(WEEKS)
+    c.set_query_period_quantity(1)
+
+    fake_data = MockSet()
+    fake_data.add(MockModel(pk=1, title='title', created_at=timezone.now()))
+    mocker.patch(INITIAL_QUERY_SET_METHOD, return_value=fake_data)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=NO)
+    message.chat = chat
+    update.message = message
+
+    c.run_query(update)
+
+    assert mock.call_args[0] == ('``` Total: 1\n- title [1]\n ```',)
+
+
+def test_list_format_unknown_fields():
+    class ConvTestWrongFormat(ConvTestListFields):
+        @property
+        def list_format(self):
+            return '- {title} {status}\n'
+
+    c = ConvTestWrongFormat(logging.getLogger(), 'created_at', suffix='dev')
+
+    with pytest.raises(ValueError):
+        c.get_conversation_handler()
+
+
+def test_get_aggregate_and_proceed_export(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_period_uom(WEEKS)
+    c.set_query_period_quantity(1)
+
+    export_file = mocker.MagicMock()
+    mock_export = mocker.patch(EXPORT_AS_FILE, return_value=(export_file, 2))
+    mocker.patch(INITIAL_QUERY_SET_METHOD, return_value=MockSet())
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    mock_document = mocker.patch(TELEGRAM_REPLY_DOCUMENT_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=EXPORT)
+    message.chat = chat
+    update.message = message
+
+    data = c.get_aggregate_and_proceed(update, None)
+
+    assert data == ConversationHandler.END
+    assert mock_export.call_args[0][1:] == (('id', 'name', 'status'), 'csv', 2000)
+    assert mock_document.call_args[1]['document'] == export_file
+    assert mock_document.call_args[1]['caption'] == 'Total: 2'
+
+
+def test_export_empty(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_period_uom(WEEKS)
+    c.set_query_period_quantity(1)
+    c.set_aggregate_type(EXPORT)
+
+    mocker.patch(EXPORT_AS_FILE, return_value=(mocker.MagicMock(), 0))
+    mocker.patch(INITIAL_QUERY_SET_METHOD, return_value=MockSet())
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    mock_document = mocker.patch(TELEGRAM_REPLY_DOCUMENT_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=EXPORT)
+    message.chat = chat
+    update.message = message
+
+    c.run_query(update)
+
+    assert mock.call_args[0] == (f'``` {TelegramConversation.EMPTY_RESULT} ```',)
+    mock_document.assert_not_called()
+
+
+def test_get_saved_filter_and_proceed_export(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    exported = MockSet()
+    c.export_avg_execution_24h = lambda: exported
+
+    mock_export = mocker.patch(EXPORT_AS_FILE, return_value=(mocker.MagicMock(), 1))
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    mock_document = mocker.patch(TELEGRAM_REPLY_DOCUMENT_METHOD, return_value=None)
+
+    assert c.exportable_filters == ['avg_execution_24h']
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=f'avg_execution_24h {EXPORT}')
+    message.chat = chat
+    update.message = message
+
+    data = c.get_saved_filter_and_proceed(update, None)
+
+    assert data == ConversationHandler.END
+    assert mock_export.call_args[0][0] == exported
+    assert mock_document.called
+
+
+def test_export_saved_filter_not_exportable(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_saved_filter('avg_execution_24h')
+    c.set_aggregate_type(EXPORT)
+
+    with pytest.raises(SavedFilterNotFound):
+        c.run_query(None)
+
+
+def test_get_histogram_bucket_and_proceed(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_period_uom(HOURS)
+    c.set_query_period_quantity(2)
+    c.set_aggregate_type(HISTOGRAM)
+
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    queryset = mocker.MagicMock()
+    grouped = queryset.order_by.return_value.annotate.return_value.values.return_value
+    grouped.annotate.return_value.order_by.return_value = [
+        {'bucket': now - timedelta(hours=1), 'total': 3},
+        {'bucket': now, 'total': 1},
+    ]
+    mocker.patch.object(c, '_build_queryset', return_value=queryset)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=HOURS)
+    message.chat = chat
+    update.message = message
+
+    data = c.get_histogram_bucket_and_proceed(update, None)
+
+    assert data == ConversationHandler.END
+    assert c.aggregate_property == HOURS
+    histogram = mock.call_args_list[0][0][0]
+    assert histogram.startswith('``` Total: 4\n')
+    assert len(histogram.splitlines()) == 5
+
+
+def test_histogram_hours_over_long_period(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_period_uom(WEEKS)
+    c.set_query_period_quantity(26)
+    c.set_aggregate_type(HISTOGRAM)
+
+    queryset = mocker.MagicMock()
+    grouped = queryset.order_by.return_value.annotate.return_value.values.return_value
+    grouped.annotate.return_value.order_by.return_value = []
+    mocker.patch.object(c, '_build_queryset', return_value=queryset)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    update.message = Message(1, timezone.now(), chat=Chat(1, 'user'), text=HOURS)
+    c.get_histogram_bucket_and_proceed(update, None)
+
+    assert len(mock.call_args_list[0][0][0]) < MESSAGE_MAX_LENGTH
+
+
+def test_get_aggregate_and_proceed_histogram(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=HISTOGRAM)
+    message.chat = chat
+    update.message = message
+
+    data = c.get_aggregate_and_proceed(update, None)
+
+    assert mock.call_args[0] == ('``` Please select the histogram bucket ```',)
+    assert data == TelegramConversation.STATUS.BUILD_AGGREGATE_HISTOGRAM_BUCKET
+
+
+def test_truncate():
+    value = datetime(2026, 10, 15, 13, 45, 12)
+
+    assert TelegramConversation._truncate(value, 'hour') == datetime(2026, 10, 15, 13)
+    assert TelegramConversation._truncate(value, 'day') == datetime(2026, 10, 15)
+    assert TelegramConversation._truncate(value, 'week') == datetime(2026, 10, 12)
+
+
+def test_run_query_exceeds_budget(mocker, caplog):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    c.set_chat_id(1)
+    c.set_query_time_budget(0.05)
+    c.set_saved_filter('slow')
+
+    def slow_filter(update):
+        time.sleep(0.3)
+        c._reply(update, 'late')
+
+    c.get_slow = slow_filter
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='slow')
+    message.chat = chat
+    update.message = message
+
+    with caplog.at_level(logging.ERROR):
+        c.run_query(update)
+    time.sleep(0.4)
+
+    assert mock.call_count == 1
+    assert mock.call_args[0] == ('``` Query exceeded budget of 0.05 seconds ```',)
+    assert 'exceeded budget of 0.05 seconds' in caplog.text
+
+
+def test_run_query_abandoned_worker_keeps_its_chat(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    lag_check = mocker.Mock()
+    lag_check.resolve.side_effect = ['default', 'replica']
+    c.set_database_alias('default', lag_check)
+    c.set_chat_id(1)
+    c.set_query_time_budget(0.05)
+    c.set_saved_filter('slow')
+    release = threading.Event()
+    seen = {}
+
+    def slow_filter(update):
+        release.wait(1)
+        seen.update(chat_id=c.chat_id, saved=c.saved_filter, database=c.query_database)
+        c._reply(update, 'late')
+
+    c.get_slow = slow_filter
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    update = Update(1)
+    update.message = Message(1, timezone.now(), chat=Chat(1, 'user'), text='slow')
+
+    c.run_query(update)
+    #  the dispatcher goes on with another chat while the worker still runs
+    c.set_chat_id(2)
+    c.set_saved_filter('other')
+    release.set()
+    time.sleep(0.2)
+
+    assert seen == {'chat_id': 1, 'saved': 'slow', 'database': 'default'}
+    assert lag_check.resolve.call_count == 1
+    assert mock.call_count == 1
+    c.set_chat_id(1)
+    assert c.saved_filter == 'slow'
+
+
+def test_query_database():
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+
+    assert c.query_database == 'default'
+
+    c.set_database_alias('replica')
+    assert c.query_database == 'replica'
+
+    c.set_database_alias('replica', ReplicaLagCheck(5, lag_function=lambda alias: 10))
+    assert c.query_database == 'default'
+
+
+def test_get_initial_queryset_using_alias(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = mocker.MagicMock()
+    c.set_database_alias('replica')
+
+    c._get_initial_queryset()
+
+    c.model.objects.using.assert_called_once_with('replica')
+
+
+@FakeModel.fake_me
+@pytest.mark.django_db(transaction=True)
+def test_run_query_profile(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+    c.set_chat_id(1)
+    c.set_query_mode(BTN_CAPTION_PROFILE_QUERY)
+    c.set_query_period_uom(WEEKS)
+    c.set_query_period_quantity(1)
+    c.set_aggregate_type(COUNT)
+    c.set_query_cache(QueryResultCache('default', 60, 10))
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    explain = mocker.patch('django.db.models.query.QuerySet.explain', return_value='SCAN fake')
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=COUNT)
+    message.chat = chat
+    update.message = message
+
+    c.run_query(update)
+
+    assert explain.called
+    assert mock.call_count == 2
+    assert mock.call_args_list[0][0] == ('``` 0 ```',)
+    profile = mock.call_args_list[1][0][0]
+    assert 'Rows fetched: 1' in profile
+    assert 'DB queries: 1' in profile
+    assert 'COUNT(*)' in profile
+    assert 'SCAN fake' in profile
+
+
+def test_get_mode_show_mode_options_profile(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=BTN_CAPTION_PROFILE_QUERY)
+    message.chat = chat
+    update.message = message
+
+    data = c.get_mode_show_mode_options(update, None)
+
+    assert data == TelegramConversation.STATUS.BUILD_PERIOD
+    assert c.profile_selected
+
+
+def test_get_filters_and_proceed_typed(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+    c.set_chat_id(1)
+
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(
+        1, timezone.now(), chat=chat, text='aggr_property__gte=5, name="a, b=c"',
+    )
+    message.chat = chat
+    update.message = message
+
+    data = c.get_filters_and_proceed(update, None)
+
+    assert data == TelegramConversation.STATUS.BUILD_AGGREGATE_YES_NO
+    assert c.query_filters == [{'aggr_property__gte': 5}, {'name': 'a, b=c'}]
+
+
+def test_get_filters_and_proceed_invalid(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+    c.set_chat_id(1)
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    queryset = mocker.patch(INITIAL_QUERY_SET_METHOD)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='aggr_property=many')
+    message.chat = chat
+    update.message = message
+
+    data = c.get_filters_and_proceed(update, None)
+
+    assert data == TelegramConversation.STATUS.BUILD_FILTERS
+    assert c.query_filters == []
+    assert not queryset.called
+    assert mock.call_args[0][0].startswith('``` Invalid filters: "many" is not valid')
+
+
+def test_show_mode_select_one_shot(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    fake_data = MockSet(
+        MockModel(mock_name='name1', id='id1', name='name1', status='failed',
+                  aggr_property=2, created_at=timezone.now()),
+        MockModel(mock_name='name2', id='id2', name='name2', status='pending',
+                  aggr_property=3, created_at=timezone.now()),
+    )
+    mocker.patch(INITIAL_QUERY_SET_METHOD, return_value=fake_data)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='/test_dev 3d status=failed count')
+    message.chat = chat
+    update.message = message
+
+    data = c.show_mode_select(update, None)
+
+    assert data == ConversationHandler.END
+    assert c.query_period_delta == timedelta(days=3)
+    assert c.query_filters == [{'status': 'failed'}]
+    assert mock.call_args_list[0][0] == ('``` 1 ```',)
+
+
+def test_show_mode_select_one_shot_saved(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.get_avg_execution_24h = mocker.MagicMock()
+
+    mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='/test_dev saved:avg_execution_24h')
+    message.chat = chat
+    update.message = message
+
+    data = c.show_mode_select(update, None)
+
+    assert data == ConversationHandler.END
+    c.get_avg_execution_24h.assert_called_once_with(update)
+
+
+@pytest.mark.parametrize(('text', 'error'), [
+    ('/test_dev saved:unknown', '``` Invalid query: Unknown saved filter "unknown" ```'),
+    ('/test_dev 3d statu=failed', '``` Invalid query: Unknown field "statu" ```'),
+])
+def test_show_mode_select_one_shot_invalid(mocker, text, error):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    queryset = mocker.patch(INITIAL_QUERY_SET_METHOD)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text=text)
+    message.chat = chat
+    update.message = message
+
+    data = c.show_mode_select(update, None)
+
+    assert data == ConversationHandler.END
+    assert not queryset.called
+    assert mock.call_args_list[0][0] == (error,)
+
+
+def test_conversation_handler_inline():
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_ui_mode(UI_MODE_INLINE)
+
+    handler = c.get_conversation_handler()
+
+    assert len(handler.states) == 12
+    mode_handler = handler.states[TelegramConversation.STATUS.MODE_SELECTOR][0]
+    assert isinstance(mode_handler, CallbackQueryHandler)
+    quantity_handler = handler.states[TelegramConversation.STATUS.BUILD_PERIOD_QUANTITY][0]
+    assert isinstance(quantity_handler, MessageHandler)
+
+
+def _callback_update(bot, message, data):
+    update = Update(2)
+    update.callback_query = CallbackQuery(
+        '1', User(1, 'user', False), 'chat', message=message, data=data, bot=bot,
+    )
+    return update
+
+
+def test_inline_flow_edits_one_message(mocker):
+    c = ConvTest(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = FakeModel
+    c.set_ui_mode(UI_MODE_INLINE)
+
+    bot = mocker.MagicMock()
+    chat = Chat(1, 'user')
+    flow_message = Message(42, timezone.now(), chat=chat, bot=bot)
+    reply = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=flow_message)
+    mocker.patch(INITIAL_QUERY_SET_METHOD, return_value=MockSet())
+
+    update = Update(1)
+    update.message = Message(1, timezone.now(), chat=chat, text='/test_dev', bot=bot)
+    c.show_mode_select(update, None)
+
+    assert reply.call_count == 1
+    assert isinstance(reply.call_args[1]['reply_markup'], InlineKeyboardMarkup)
+    assert c.ui_message_id == 42
+
+    c.get_mode_show_mode_options(_callback_update(bot, flow_message, BTN_CAPTION_BUILD_QUERY), None)
+    c.get_period_uom_show_quantity(_callback_update(bot, flow_message, WEEKS), None)
+
+    update = Update(3)
+    update.message = Message(2, timezone.now(), chat=chat, text='2', bot=bot)
+    c.get_quantity_show_yes_no_filters(update, None)
+    c.get_yes_no_filters_and_proceed(_callback_update(bot, flow_message, NO), None)
+    data = c.get_yes_no_aggregate_and_proceed(_callback_update(bot, flow_message, NO), None)
+
+    assert data == ConversationHandler.END
+    assert reply.call_count == 1
+    assert bot.answer_callback_query.call_count == 4
+    edits = bot.edit_message_text.call_args_list
+    assert all(edit[1]['message_id'] == 42 for edit in edits)
+    assert edits[-1][0] == (f'``` {TelegramConversation.EMPTY_RESULT} ```',)
+    assert edits[-1][1]['reply_markup'] is None
+    assert c.ui_message_id is None
+
+
+@pytest.mark.parametrize(('result', 'reply', 'success'), [
+    (CommandResult('xx', 0, 'done', False), '``` Result xx (exit code 0):\ndone ```', True),
+    (CommandResult('xx', 2, 'failed', False), '``` Error xx (exit code 2):\nfailed ```', False),
+    (
+        CommandResult('xx', None, 'partial', True),
+        '``` Timeout xx after 5 seconds:\npartial ```',
+        False,
+    ),
+])
+def test_execute_custom_command_pool(mocker, result, reply, success):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    c.set_job_registry(JobRegistry())
+    pool = CommandPool(workers=1, timeout=5)
+
+    def submit(command, output):
+        output.write(result.output)
+        future = Future()
+        future.set_result(result)
+        return future
+
+    mocker.patch.object(pool, 'submit', side_effect=submit)
+    c.set_command_pool(pool)
+    call_command = mocker.patch(DJANGO_CALL_COMMAND)
+    update, bot = _command_update(mocker)
+    mocker.patch(
+        TELEGRAM_REPLY_METHOD, return_value=Message(42, timezone.now(), chat=Chat(1, 'user')),
+    )
+
+    assert c.execute_custom_command(update, 'xx') is True
+
+    assert _command_result(bot) == reply
+    assert c.job_registry.jobs[0].success is success
+    assert pool.submit.call_args[0][0] == 'xx'
+    assert not call_command.called
+
+
+def test_execute_custom_command_pool_does_not_block(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    c.set_job_registry(JobRegistry())
+    pool = CommandPool(workers=1, timeout=5)
+    future = Future()
+    mocker.patch.object(pool, 'submit', return_value=future)
+    c.set_command_pool(pool)
+    update, bot = _command_update(mocker)
+    mocker.patch(
+        TELEGRAM_REPLY_METHOD, return_value=Message(42, timezone.now(), chat=Chat(1, 'user')),
+    )
+
+    assert c.execute_custom_command(update, 'xx') is True
+    assert not bot.edit_message_text.called
+    assert c.job_registry.jobs[0].status == 'running'
+
+    future.set_exception(OSError('no python'))
+
+    assert _command_result(bot) == '``` Error xx:\nno python ```'
+    assert c.job_registry.jobs[0].status == 'failed'
+
+
+def test_execute_custom_command_streamed(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+
+    def command(name, stdout, stderr):
+        for _i in range(1000):
+            stdout.write('line\n')
+
+    mocker.patch(DJANGO_CALL_COMMAND, side_effect=command)
+    update, bot = _command_update(mocker)
+    progress = Message(42, timezone.now(), chat=Chat(1, 'user'), bot=bot)
+    reply = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=progress)
+    document = mocker.patch(TELEGRAM_REPLY_DOCUMENT_METHOD, return_value=None)
+
+    data = c.execute_custom_command(update, 'xx')
+
+    assert data is True
+    assert reply.call_count == 1
+    assert reply.call_args[0][0] == '``` Running xx ```'
+    edits = bot.edit_message_text.call_args_list
+    assert edits[0][0][0].startswith('``` Running xx:\nline\n')
+    assert all(edit[1]['message_id'] == 42 for edit in edits)
+    assert edits[-1][0][0].startswith('``` Result xx, full output attached:\n... truncated ...')
+    assert document.call_args[1]['filename'] == 'xx.log.gz'
+    assert document.call_args[1]['api_kwargs'] == {'chat_id': 1}
+
+
+def test_execute_custom_command_job(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    registry = JobRegistry()
+    c.set_job_registry(registry)
+    mocker.patch(DJANGO_CALL_COMMAND, return_value=None)
+    update, _bot = _command_update(mocker)
+    mocker.patch(
+        TELEGRAM_REPLY_METHOD, return_value=Message(42, timezone.now(), chat=Chat(1, 'user')),
+    )
+
+    assert c.execute_custom_command(update, 'xx') is True
+    assert [job.status for job in registry.jobs] == ['succeeded']
+
+
+def test_execute_custom_command_job_message_failed(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    registry = JobRegistry()
+    c.set_job_registry(registry)
+    call_command = mocker.patch(DJANGO_CALL_COMMAND)
+    update, _bot = _command_update(mocker)
+    mocker.patch(TELEGRAM_REPLY_METHOD, side_effect=TelegramError('blocked'))
+
+    with pytest.raises(TelegramError):
+        c.execute_custom_command(update, 'xx')
+    assert not call_command.called
+    assert [job.status for job in registry.jobs] == ['failed']
+
+
+def test_execute_custom_command_job_attached(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    registry = JobRegistry()
+    c.set_job_registry(registry)
+    call_command = mocker.patch(DJANGO_CALL_COMMAND)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+    job, _started = registry.start('xx', 2)
+    update, _bot = _command_update(mocker)
+
+    data = c.execute_custom_command(update, 'xx')
+
+    assert data is True
+    assert mock.call_count == 1
+    assert mock.call_args[0][0].endswith('its result will be sent here ```')
+
+    registry.finish(job, True, 'https://t.me/c/1/2')
+
+    assert not call_command.called
+    assert mock.call_args[0] == ('``` xx succeeded, result: https://t.me/c/1/2 ```',)
+    assert mock.call_args[1]['api_kwargs'] == {'chat_id': 1}
+
+
+def test_custom_command_runs_in_background_and_attaches(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.model = MockModel
+    registry = JobRegistry()
+    c.set_job_registry(registry)
+    bot = mocker.MagicMock(defaults=None)
+    bot.edit_message_text.return_value.link = None
+    dispatcher = Dispatcher(bot, Queue(), workers=2)
+    c.set_dispatcher(dispatcher)
+    dispatcher.add_handler(c.get_conversation_handler())
+    ready = threading.Event()
+    threading.Thread(target=dispatcher.start, kwargs={'ready': ready}).start()
+    ready.wait()
+    release = threading.Event()
+    call_command = mocker.patch(
+        DJANGO_CALL_COMMAND, side_effect=lambda *args, **kwargs: release.wait(5),
+    )
+    replies = []
+
+    def reply(text, **kwargs):
+        replies.append((kwargs['api_kwargs']['chat_id'], text))
+        return Message(42, timezone.now(), chat=Chat(1, 'user'))
+
+    mocker.patch(TELEGRAM_REPLY_METHOD, side_effect=reply)
+
+    def process(text, chat_id):
+        entities = []
+        if text.startswith('/'):
+            entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text))]
+        update = Update(1)
+        update.message = Message(
+            1,
+            timezone.now(),
+            chat=Chat(chat_id, 'private'),
+            from_user=User(chat_id, 'user', False),
+            text=text,
+            entities=entities,
+            bot=bot,
+        )
+        dispatcher.process_update(update)
+
+    try:
+        for chat_id in (1, 2):
+            for text in ('/convtestfilterscommands_dev', BTN_CAPTION_CUSTOM_MGMT, 'xx'):
+                process(text, chat_id)
+        #  both launches were handled while the first one is still running
+        assert [job.status for job in registry.jobs] == ['running']
+        assert replies[-2][0] == 2
+        assert replies[-2][1].endswith('its result will be sent here ```')
+        release.set()
+        assert registry.jobs[0].wait(5)
+    finally:
+        release.set()
+        dispatcher.stop()
+
+    assert call_command.call_count == 1
+    assert replies[-1] == (2, '``` xx succeeded ```')
+    assert not c.conversation_handler.conversations
+
+
+def test_execute_custom_command_job_other_instance(mocker):
+    c = ConvTestFiltersCommands(logging.getLogger(), 'created_at', suffix='dev')
+    c.set_chat_id(1)
+    c.set_job_registry(JobRegistry())
+    mocker.patch.object(c.job_registry, 'start', return_value=(None, False))
+    call_command = mocker.patch(DJANGO_CALL_COMMAND)
+    mock = mocker.patch(TELEGRAM_REPLY_METHOD, return_value=None)
+
+    update = Update(1)
+    chat = Chat(1, 'user')
+    message = Message(1, timezone.now(), chat=chat, text='xx')
+    message.chat = chat
+    update.message = message
+
+    assert c.execute_custom_command(update, 'xx') is False
+    assert not call_command.called
+    assert mock.call_args[0] == ('``` xx is already running on another bot instance ```',)
@@ -0,0 +1,109 @@
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+from telegram import User
+from telegram.ext import ExtBot, TypeHandler
+
+from django_telegram.bot.webhook import WebhookUpdater
+
+UPDATE = {
+    'update_id': 10,
+    'message': {
+        'message_id': 1,
+        'date': 1600000000,
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 5, 'is_bot': False, 'first_name': 'user'},
+        'text': '/convtest_dev',
+    },
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def webhook(mocker):
+    mocker.patch.object(ExtBot, 'get_me', return_value=User(123, 'bot', True, username='bot'))
+    set_webhook = mocker.patch.object(ExtBot, 'set_webhook', autospec=True, return_value=True)
+    updater = WebhookUpdater('123:abc', secret_token='s3cret')
+    received = []
+    handled = threading.Event()
+
+    def callback(update, context):
+        received.append(update)
+        handled.set()
+
+    updater.dispatcher.add_handler(TypeHandler(object, callback))
+    port = _free_port()
+    updater.start_webhook(
+        port=port, url_path='hook', webhook_url='https://bot.example.com/hook',
+    )
+    yield f'http://127.0.0.1:{port}/hook', set_webhook, received, handled
+    updater.stop()
+
+
+def _post(url, secret_token):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(UPDATE).encode(),
+        headers={
+            'Content-Type': 'application/json',
+            'X-Telegram-Bot-Api-Secret-Token': secret_token,
+        },
+    )
+    try:
+        return urllib.request.urlopen(request, timeout=5).status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_webhook_registers_secret_token(webhook):
+    _url, set_webhook, _received, _handled = webhook
+
+    assert set_webhook.call_args.kwargs['url'] == 'https://bot.example.com/hook'
+    assert set_webhook.call_args.kwargs['api_kwargs'] == {'secret_token': 's3cret'}
+
+
+#  signature of Bot.set_webhook before 13.13, which has no secret_token argument
+def _set_webhook_13_11(self, url=None, certificate=None, timeout=None, max_connections=40,
+                       allowed_updates=None, api_kwargs=None, ip_address=None,
+                       drop_pending_updates=None):
+    pass  # pragma: no cover
+
+
+@pytest.mark.parametrize(('secret_token', 'api_kwargs'), [
+    (None, None),
+    ('s3cret', {'secret_token': 's3cret'}),
+])
+def test_webhook_set_before_13_13(mocker, secret_token, api_kwargs):
+    mocker.patch.object(ExtBot, 'get_me', return_value=User(123, 'bot', True, username='bot'))
+    set_webhook = mocker.patch.object(ExtBot, 'set_webhook', autospec=_set_webhook_13_11)
+    updater = WebhookUpdater('123:abc', secret_token=secret_token)
+    updater.start_webhook(port=_free_port(), url_path='hook')
+    updater.stop()
+
+    assert set_webhook.call_args.kwargs['api_kwargs'] == api_kwargs
+
+
+def test_webhook_dispatches_posted_update(webhook):
+    url, _set_webhook, received, handled = webhook
+
+    assert _post(url, 's3cret') == 200
+    assert handled.wait(5)
+    assert received[0].update_id == 10
+    assert received[0].message.text == '/convtest_dev'
+
+
+def test_webhook_rejects_wrong_secret_token(webhook):
+    url, _set_webhook, received, handled = webhook
+
+    assert _post(url, 'wrong') == 403
+    assert not handled.wait(0.2)
+    assert received == []
@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from django_telegram.checks import check_lookup_indexes
+from tests.bot.conftest import ConvTestIndexed
+
+CONVERSATION = f'{ConvTestIndexed.__module__}.{ConvTestIndexed.__name__}'
+
+
+def test_check_lookup_indexes_no_models():
+    assert check_lookup_indexes() == []
+
+
+def test_check_lookup_indexes(mocker):
+    mocker.patch.dict(settings.TELEGRAM_BOT, {
+        'CONVERSATIONS': [CONVERSATION],
+    })
+
+    errors = check_lookup_indexes()
+
+    assert [error.id for error in errors] == ['django_telegram.W003', 'django_telegram.W001']
+    assert errors[0].msg.endswith('.status is used for filter but is not indexed.')
+    assert errors[1].msg.endswith('has no field "unknown" used for filter.')
+
+
+def test_check_lookup_indexes_history_lookup(mocker):
+    mocker.patch.dict(settings.TELEGRAM_BOT, {
+        'CONVERSATIONS': [CONVERSATION],
+        'HISTORY_LOOKUP_MODEL_PROPERTY': 'name',
+    })
+
+    errors = check_lookup_indexes()
+
+    assert errors[0].id == 'django_telegram.W002'
@@ -809,3 +809,496 @@ def test_global_config_conversations_not_empty():
     c = TelegramBotConfigurator(mw_config, [MW_DEF])
 
     assert c.run_check() is None
+
+
+def test_query_cache_config_ok():
+    c = TelegramBotConfigurator({
+        'QUERY_CACHE': {
+            'ALIAS': 'default',
+            'TIMEOUT': 60,
+            'MAX_ENTRIES': 100,
+        },
+    }, [])
+
+    assert c._check_query_cache_settings() is None
+
+
+def test_query_cache_config_not_dict():
+    c = TelegramBotConfigurator({'QUERY_CACHE': []}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_query_cache_settings()
+
+    assert '"QUERY_CACHE" object must be a dictionary.' == str(err.value)
+
+
+def test_query_cache_config_wrong_timeout():
+    c = TelegramBotConfigurator({'QUERY_CACHE': {'TIMEOUT': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_query_cache_settings()
+
+    assert '"QUERY_CACHE[TIMEOUT]" must be a positive integer.' == str(err.value)
+
+
+def test_query_time_budget_ok():
+    c = TelegramBotConfigurator({'QUERY_TIME_BUDGET': 2.5}, [])
+
+    assert c._check_query_time_budget() is None
+
+
+def test_query_time_budget_wrong():
+    c = TelegramBotConfigurator({'QUERY_TIME_BUDGET': '10'}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_query_time_budget()
+
+    assert '"QUERY_TIME_BUDGET" must be a positive number of seconds.' == str(err.value)
+
+
+def test_database_settings_ok():
+    c = TelegramBotConfigurator({
+        'DATABASE_ALIAS': 'replica',
+        'DATABASE_MAX_LAG': 30,
+        'DATABASE_LAG_FUNCTION': 'django_telegram.bot.db_routing.postgresql_replica_lag',
+    }, [])
+
+    assert c._check_database_settings() is None
+
+
+def test_database_settings_wrong_alias():
+    c = TelegramBotConfigurator({'DATABASE_ALIAS': ''}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_database_settings()
+
+    assert '"DATABASE_ALIAS" must be a database alias.' == str(err.value)
+
+
+def test_database_settings_wrong_max_lag():
+    c = TelegramBotConfigurator({'DATABASE_MAX_LAG': -1}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_database_settings()
+
+    assert '"DATABASE_MAX_LAG" must be a positive number of seconds.' == str(err.value)
+
+
+def test_database_settings_unknown_lag_function():
+    c = TelegramBotConfigurator({
+        'DATABASE_MAX_LAG': 30,
+        'DATABASE_LAG_FUNCTION': 'unknown',
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_database_settings()
+
+    assert '"DATABASE_LAG_FUNCTION" function could not be found.' == str(err.value)
+
+
+def test_ui_mode_ok():
+    c = TelegramBotConfigurator({'UI_MODE': 'inline'}, [])
+
+    assert c._check_ui_mode() is None
+
+
+def test_ui_mode_wrong():
+    c = TelegramBotConfigurator({'UI_MODE': 'buttons'}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_ui_mode()
+
+    assert '"UI_MODE" must be one of "[\'reply\', \'inline\']"' == str(err.value)
+
+
+def test_command_pool_settings_ok():
+    c = TelegramBotConfigurator({
+        'COMMAND_POOL': {'WORKERS': 2, 'TIMEOUT': 60, 'MEMORY_LIMIT': 512, 'OUTPUT_LIMIT': 1000},
+    }, [])
+
+    assert c._check_command_pool_settings() is None
+
+
+def test_command_pool_settings_not_dict():
+    c = TelegramBotConfigurator({'COMMAND_POOL': True}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_command_pool_settings()
+
+    assert '"COMMAND_POOL" object must be a dictionary.' == str(err.value)
+
+
+def test_command_pool_settings_wrong_timeout():
+    c = TelegramBotConfigurator({'COMMAND_POOL': {'TIMEOUT': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_command_pool_settings()
+
+    assert '"COMMAND_POOL[TIMEOUT]" must be a positive integer.' == str(err.value)
+
+
+def test_command_lock_settings_ok():
+    c = TelegramBotConfigurator({'COMMAND_LOCK': {'ALIAS': 'locks', 'TTL': 600}}, [])
+
+    assert c._check_command_lock_settings() is None
+
+
+def test_command_lock_settings_wrong_ttl():
+    c = TelegramBotConfigurator({'COMMAND_LOCK': {'TTL': '600'}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_command_lock_settings()
+
+    assert '"COMMAND_LOCK[TTL]" must be a positive integer.' == str(err.value)
+
+
+def test_chat_state_settings_ok():
+    c = TelegramBotConfigurator({
+        'CONVERSATION_TIMEOUT': 600,
+        'CHAT_STATE': {'MAX_ENTRIES': 100, 'IDLE_TIMEOUT': 900, 'SWEEP_INTERVAL': 60},
+    }, [])
+
+    assert c._check_chat_state_settings() is None
+
+
+def test_chat_state_settings_wrong_conversation_timeout():
+    c = TelegramBotConfigurator({'CONVERSATION_TIMEOUT': -1}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_chat_state_settings()
+
+    assert '"CONVERSATION_TIMEOUT" must be a positive number of seconds.' == str(err.value)
+
+
+def test_chat_state_settings_not_dict():
+    c = TelegramBotConfigurator({'CHAT_STATE': 100}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_chat_state_settings()
+
+    assert '"CHAT_STATE" object must be a dictionary.' == str(err.value)
+
+
+def test_chat_state_settings_wrong_max_entries():
+    c = TelegramBotConfigurator({'CHAT_STATE': {'MAX_ENTRIES': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_chat_state_settings()
+
+    assert '"CHAT_STATE[MAX_ENTRIES]" must be a positive integer.' == str(err.value)
+
+
+def test_chat_state_settings_idle_timeout_shorter():
+    c = TelegramBotConfigurator({'CONVERSATION_TIMEOUT': 7200}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_chat_state_settings()
+
+    assert str(err.value) == (
+        '"CHAT_STATE[IDLE_TIMEOUT]" must not be shorter than "CONVERSATION_TIMEOUT".'
+    )
+
+
+def test_persistence_settings_ok():
+    c = TelegramBotConfigurator({
+        'PERSISTENCE': {'BACKEND': 'sqlite', 'PATH': '/tmp/state.sqlite3', 'FLUSH_INTERVAL': 5},
+    }, [])
+
+    assert c._check_persistence_settings() is None
+
+
+def test_persistence_settings_custom_backend():
+    c = TelegramBotConfigurator({
+        'PERSISTENCE': {'BACKEND': 'django_telegram.bot.persistence.DjangoStateBackend'},
+    }, [])
+
+    assert c._check_persistence_settings() is None
+
+
+def test_persistence_settings_not_dict():
+    c = TelegramBotConfigurator({'PERSISTENCE': 'sqlite'}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_persistence_settings()
+
+    assert '"PERSISTENCE" object must be a dictionary.' == str(err.value)
+
+
+def test_persistence_settings_wrong_backend():
+    c = TelegramBotConfigurator({'PERSISTENCE': {'BACKEND': 'redis'}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_persistence_settings()
+
+    assert str(err.value) == (
+        '"PERSISTENCE[BACKEND]" must be "sqlite", "django" or the FQDN of a backend class.'
+    )
+
+
+def test_persistence_settings_wrong_path():
+    c = TelegramBotConfigurator({'PERSISTENCE': {'PATH': ''}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_persistence_settings()
+
+    assert '"PERSISTENCE[PATH]" must be a non empty string.' == str(err.value)
+
+
+def test_persistence_settings_wrong_flush_interval():
+    c = TelegramBotConfigurator({'PERSISTENCE': {'FLUSH_INTERVAL': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_persistence_settings()
+
+    assert '"PERSISTENCE[FLUSH_INTERVAL]" must be a positive integer.' == str(err.value)
+
+
+def test_shared_state_settings_ok():
+    c = TelegramBotConfigurator({'SHARED_STATE': {'ALIAS': 'default', 'TIMEOUT': 600}}, [])
+
+    assert c._check_shared_state_settings() is None
+
+
+def test_shared_state_settings_not_dict():
+    c = TelegramBotConfigurator({'SHARED_STATE': 'default'}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_shared_state_settings()
+
+    assert '"SHARED_STATE" object must be a dictionary.' == str(err.value)
+
+
+def test_shared_state_settings_wrong_timeout():
+    c = TelegramBotConfigurator({'SHARED_STATE': {'TIMEOUT': -1}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_shared_state_settings()
+
+    assert '"SHARED_STATE[TIMEOUT]" must be a positive integer.' == str(err.value)
+
+
+def test_shared_state_settings_with_persistence():
+    c = TelegramBotConfigurator({'SHARED_STATE': {}, 'PERSISTENCE': {}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_shared_state_settings()
+
+    assert '"SHARED_STATE" can not be combined with "PERSISTENCE".' == str(err.value)
+
+
+def test_webhook_settings_ok():
+    c = TelegramBotConfigurator({
+        'WEBHOOK': {
+            'URL': 'https://bot.example.com/hook',
+            'LISTEN': '0.0.0.0',
+            'PORT': 8443,
+            'URL_PATH': 'hook',
+            'SECRET_TOKEN': 'some-secret_1',
+            'CERT': '/etc/bot/cert.pem',
+            'KEY': '/etc/bot/key.pem',
+            'MAX_CONNECTIONS': 100,
+        },
+    }, [])
+
+    assert c._check_webhook_settings() is None
+
+
+def test_webhook_settings_not_dict():
+    c = TelegramBotConfigurator({'WEBHOOK': 'https://bot.example.com/hook'}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert '"WEBHOOK" object must be a dictionary.' == str(err.value)
+
+
+def test_webhook_settings_wrong_url():
+    c = TelegramBotConfigurator({'WEBHOOK': {'URL': 'http://bot.example.com/hook'}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert '"WEBHOOK[URL]" must be an https URL.' == str(err.value)
+
+
+def test_webhook_settings_wrong_port():
+    c = TelegramBotConfigurator({
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook', 'PORT': 70000},
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert '"WEBHOOK[PORT]" must be a port number.' == str(err.value)
+
+
+def test_webhook_settings_wrong_max_connections():
+    c = TelegramBotConfigurator({
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook', 'MAX_CONNECTIONS': 101},
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert '"WEBHOOK[MAX_CONNECTIONS]" must be an integer between 1 and 100.' == str(err.value)
+
+
+def test_webhook_settings_wrong_secret_token():
+    c = TelegramBotConfigurator({
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook', 'SECRET_TOKEN': 'not secret!'},
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert str(err.value).startswith('"WEBHOOK[SECRET_TOKEN]" must be 1-256 characters')
+
+
+def test_webhook_settings_key_without_cert():
+    c = TelegramBotConfigurator({
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook', 'KEY': '/etc/bot/key.pem'},
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_webhook_settings()
+
+    assert '"WEBHOOK[KEY]" requires "WEBHOOK[CERT]".' == str(err.value)
+
+
+def test_updater_settings_ok():
+    c = TelegramBotConfigurator({'UPDATER': {'WORKERS': 8}}, [])
+
+    assert c._check_updater_settings() is None
+
+
+def test_updater_settings_wrong_workers():
+    c = TelegramBotConfigurator({'UPDATER': {'WORKERS': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert '"UPDATER[WORKERS]" must be a positive integer.' == str(err.value)
+
+
+def test_updater_settings_tunables_ok():
+    c = TelegramBotConfigurator({
+        'UPDATER': {
+            'WORKERS': 8,
+            'CON_POOL_SIZE': 12,
+            'READ_TIMEOUT': 7.5,
+            'POLL_INTERVAL': 0.5,
+            'TIMEOUT': 30,
+            'DROP_PENDING_UPDATES': True,
+            'ALLOWED_UPDATES': ['message', 'callback_query'],
+        },
+        'UI_MODE': 'inline',
+    }, [])
+
+    assert c._check_updater_settings() is None
+
+
+def test_updater_settings_small_pool():
+    c = TelegramBotConfigurator({'UPDATER': {'WORKERS': 8, 'CON_POOL_SIZE': 11}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert '"UPDATER[CON_POOL_SIZE]" must be at least "UPDATER[WORKERS]" + 4.' == str(
+        err.value,
+    )
+
+
+def test_updater_settings_small_pool_default_workers():
+    c = TelegramBotConfigurator({'UPDATER': {'CON_POOL_SIZE': 4}}, [])
+
+    with pytest.raises(ImproperlyConfigured):
+        c._check_updater_settings()
+
+
+def test_updater_settings_wrong_read_timeout():
+    c = TelegramBotConfigurator({'UPDATER': {'READ_TIMEOUT': 0}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert '"UPDATER[READ_TIMEOUT]" must be a positive number of seconds.' == str(err.value)
+
+
+def test_updater_settings_wrong_drop_pending_updates():
+    c = TelegramBotConfigurator({'UPDATER': {'DROP_PENDING_UPDATES': 'yes'}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert '"UPDATER[DROP_PENDING_UPDATES]" must be a boolean.' == str(err.value)
+
+
+def test_updater_settings_poll_interval_with_webhook():
+    c = TelegramBotConfigurator({
+        'UPDATER': {'POLL_INTERVAL': 1},
+        'WEBHOOK': {'URL': 'https://bot.example.com/hook'},
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert (
+        '"UPDATER[POLL_INTERVAL]" only applies to polling, it can not be combined with "WEBHOOK".'
+    ) == str(err.value)
+
+
+def test_updater_settings_unknown_allowed_update():
+    c = TelegramBotConfigurator({'UPDATER': {'ALLOWED_UPDATES': ['message', 'unknown']}}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert str(err.value).startswith('"UPDATER[ALLOWED_UPDATES]" must be a list of update types')
+
+
+def test_updater_settings_allowed_updates_without_callback_query():
+    c = TelegramBotConfigurator({
+        'UPDATER': {'ALLOWED_UPDATES': ['message']},
+        'UI_MODE': 'inline',
+    }, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_updater_settings()
+
+    assert '"UPDATER[ALLOWED_UPDATES]" must contain "callback_query".' == str(err.value)
+
+
+def test_shutdown_timeout_ok():
+    c = TelegramBotConfigurator({'SHUTDOWN_TIMEOUT': 7.5}, [])
+
+    assert c._check_shutdown_timeout() is None
+
+
+def test_shutdown_timeout_wrong():
+    c = TelegramBotConfigurator({'SHUTDOWN_TIMEOUT': 0}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_shutdown_timeout()
+
+    assert '"SHUTDOWN_TIMEOUT" must be a positive number of seconds.' == str(err.value)
+
+
+def test_metrics_ok():
+    c = TelegramBotConfigurator({'METRICS': {'LISTEN': '0.0.0.0', 'PORT': 9464}}, [])
+
+    assert c._check_metrics_settings() is None
+
+
+@pytest.mark.parametrize(('metrics', 'error'), (
+    ([], '"METRICS" object must be a dictionary.'),
+    ({'LISTEN': ''}, '"METRICS[LISTEN]" must be a non empty string.'),
+    ({'PORT': 0}, '"METRICS[PORT]" must be a port number.'),
+    ({'PORT': '9464'}, '"METRICS[PORT]" must be a port number.'),
+))
+def test_metrics_wrong(metrics, error):
+    c = TelegramBotConfigurator({'METRICS': metrics}, [])
+
+    with pytest.raises(ImproperlyConfigured) as err:
+        c._check_metrics_settings()
+
+    assert error == str(err.value)